@@ -1,13 +1,35 @@
 from flask import Flask, jsonify
-from app.utils.db import db
-import logging
+from app.utils.db import DATABASE_URL, configure_engine, db, engine_options, remember_writes, replica_binds, replica_binds_in
+from app.utils.logger import init_logging
+from app.utils.metrics import init_metrics
+import os
 
-def create_app():
+def create_app(config=None):
+    """
+    Create the Flask application.
+
+    Arguments:
+        config (dict, optional): Settings that take precedence over the environment.
+    """
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///movie_app.db'
+    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Signs login tokens; set SECRET_KEY so tokens survive restarts and work across workers
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY') or os.urandom(32).hex()
+    app.config.update(config or {})
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+    app.config.setdefault('SQLALCHEMY_BINDS', replica_binds())
+    init_logging(app.config)
 
     db.init_app(app)
+    # Replicas are only read through read_replica and own no tables, so create_all skips them.
+    for key in replica_binds_in(app.config['SQLALCHEMY_BINDS']):
+        db.metadatas.pop(key, None)
+    with app.app_context():
+        for engine in db.engines.values():
+            configure_engine(engine)
+        init_metrics(app, db.engines)
+    app.after_request(remember_writes)
 
     # Import routes
     from app.routes.api_routes import api_bp
@@ -25,7 +47,6 @@ def create_app():
     def root():
         return jsonify({"message": "Welcome to our movie app! Created by Callie, Vishnu, and Farouk."}), 200
 
-    logging.basicConfig(level=logging.INFO)
     app.logger.info('Application startup')
 
     return app
\ No newline at end of file
@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+from app.utils.db import db
+
+# Watchlist-facing column names mapped to the OMDb response fields they come from.
+OMDB_FIELDS = {
+    'title': 'Title',
+    'year': 'Year',
+    'rated': 'Rated',
+    'runtime': 'Runtime',
+    'plot': 'Plot',
+    'genre': 'Genre',
+    'imdb_rating': 'imdbRating',
+    'type': 'Type',
+}
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class Movie(db.Model):
+    """
+    Represents a movie or show in the local catalog, shared by every watchlist.
+
+    Attributes:
+        imdb_id (str): The IMDb ID of the movie or show (primary key).
+        title (str): The title of the movie or show.
+        year (str, optional): The release year of the movie or show.
+        rated (str, optional): The rating of the movie or show.
+        runtime (str, optional): The runtime of the movie or show.
+        plot (str, optional): The plot summary of the movie or show.
+        genre (str, optional): The genre of the movie or show.
+        imdb_rating (str, optional): The IMDb rating of the movie or show.
+        type (str, optional): The type of the entry (e.g., "movie", "series").
+        updated_at (datetime): When the entry was last fetched from OMDb.
+    """
+    imdb_id = db.Column(db.String(20), primary_key=True)
+    title = db.Column(db.String(200), nullable=False)
+    year = db.Column(db.String(16))  # e.g. "2010", or "2008–2013" for series
+    rated = db.Column(db.String(10))
+    runtime = db.Column(db.String(20))
+    plot = db.Column(db.Text)
+    genre = db.Column(db.String(255))
+    imdb_rating = db.Column(db.String(10))
+    type = db.Column(db.String(20))
+    updated_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+
+    @staticmethod
+    def values_from_omdb(data):
+        """Map an OMDb response to catalog column values, e.g. for bulk inserts."""
+        values = {column: data.get(field) for column, field in OMDB_FIELDS.items()}
+        values['imdb_id'] = data.get('imdbID')
+        values['updated_at'] = utcnow()
+        return values
+
+    @classmethod
+    def from_omdb(cls, data):
+        """Build a catalog entry from an OMDb response."""
+        return cls(**cls.values_from_omdb(data))
+
+    def update_from_omdb(self, data):
+        """Overwrite the catalog fields with a fresh OMDb response."""
+        for column, value in self.values_from_omdb(data).items():
+            if column != 'imdb_id':
+                setattr(self, column, value)
+
+    def to_omdb(self):
+        """Return the catalog fields under their OMDb names, e.g. for the search index."""
+        data = {field: getattr(self, column) for column, field in OMDB_FIELDS.items()}
+        data['imdbID'] = self.imdb_id
+        return data
@@ -5,6 +5,6 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     salt = db.Column(db.String(64), nullable=False)
-    hashed_password = db.Column(db.String(128), nullable=False)
+    hashed_password = db.Column(db.String(255), nullable=False)  # "pbkdf2_<algorithm>$<iterations>$<hex digest>"
 
 from app.utils.db import db
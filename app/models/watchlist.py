@@ -1,32 +1,47 @@
 from app.utils.db import db
+from app.models.movie import Movie
+
+def _movie_field(name):
+    """Expose a catalog column on the watchlist entry that references it."""
+    return property(lambda self: getattr(self.movie, name) if self.movie is not None else None)
 
 class Watchlist(db.Model):
     """
     Represents a watchlist entry in the movie app.
 
+    Movie details live once in the `Movie` catalog; each entry only stores who is
+    watching what and in which state. The catalog row is joined in when entries are
+    loaded, and its fields are readable directly on the entry (e.g. `entry.title`).
+
     Attributes:
         id (int): The primary key of the watchlist entry.
         user_id (int): The ID of the user who owns the watchlist entry.
-        title (str): The title of the movie or show.
-        imdb_id (str): The IMDb ID of the movie or show.
-        year (str, optional): The release year of the movie or show.
-        rated (str, optional): The rating of the movie or show.
-        runtime (str, optional): The runtime of the movie or show.
-        plot (str, optional): The plot summary of the movie or show.
-        genre (str, optional): The genre of the movie or show.
-        imdb_rating (str, optional): The IMDb rating of the movie or show.
-        type (str, optional): The type of the entry (e.g., "movie", "series").
+        imdb_id (str): The IMDb ID of the movie or show, referencing the catalog.
         watching_state (str, optional): The watching state of the entry (e.g., "To Watch", "Watched", "Watch Next").
+        movie (Movie): The catalog entry for the movie or show.
+
+    A user can hold each movie only once: (user_id, imdb_id) is a unique index, which
+    also serves every per-entry lookup. (user_id, watching_state) is indexed for
+    state filters and (user_id, id) for paging through a user's entries in id order.
     """
+    __table_args__ = (
+        db.Index('ix_watchlist_user_imdb', 'user_id', 'imdb_id', unique=True),
+        db.Index('ix_watchlist_user_state', 'user_id', 'watching_state'),
+        db.Index('ix_watchlist_user_id', 'user_id', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    title = db.Column(db.String(200), nullable=False)
-    imdb_id = db.Column(db.String(20), nullable=False)
-    year = db.Column(db.String(4))
-    rated = db.Column(db.String(10))
-    runtime = db.Column(db.String(20))
-    plot = db.Column(db.Text)
-    genre = db.Column(db.String(100))
-    imdb_rating = db.Column(db.String(10))
-    type = db.Column(db.String(20))
+    imdb_id = db.Column(db.String(20), db.ForeignKey('movie.imdb_id'), nullable=False)
     watching_state = db.Column(db.String(20))  # e.g., "To Watch", "Watched", "Watch Next"
+
+    movie = db.relationship(Movie, lazy='joined')
+
+    title = _movie_field('title')
+    year = _movie_field('year')
+    rated = _movie_field('rated')
+    runtime = _movie_field('runtime')
+    plot = _movie_field('plot')
+    genre = _movie_field('genre')
+    imdb_rating = _movie_field('imdb_rating')
+    type = _movie_field('type')
@@ -1,6 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 import requests
 from app.utils.logger import logger
+from app.utils.metrics import metrics
+from app.utils.omdb import async_client, client
 import os
 
 api_bp = Blueprint('api', __name__)
@@ -9,6 +11,43 @@ api_bp = Blueprint('api', __name__)
 def health_check():
     """
     Health check route to verify the app is running.
+
+    Also reports the OMDb circuit breaker so load balancers can see when searches
+    are failing fast or served from stale data. The app itself stays healthy (200)
+    while OMDb is down, since accounts and watchlists keep working.
     """
     logger.info("Health check")
-    return jsonify({"status": "App is running!"}), 200
+    breaker = client.breaker.stats() if client.breaker is not None else None
+    return jsonify({"status": "App is running!", "omdb": breaker}), 200
+
+@api_bp.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """
+    Route to report OMDb response cache counters (hits, misses, evictions) for sizing,
+    how many requests were coalesced into an identical in-flight request by the
+    sync and async clients, and how titles were resolved by the title index.
+    """
+    stats = client.stats()
+    flights = {"singleflight": stats["singleflight"], "async_singleflight": async_client.stats(),
+               "titles": stats["titles"]}
+    if stats["cache"] is None:
+        return jsonify(dict(flights, enabled=False)), 200
+    return jsonify(dict(stats["cache"], enabled=True, **flights)), 200
+
+@api_bp.route('/rate-limit', methods=['GET'])
+def rate_limit():
+    """
+    Route to report the remaining OMDb request budget, which all workers share,
+    and how many requests this worker was granted or refused per priority class.
+    """
+    if client.limiter is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify(dict(client.limiter.stats(), enabled=True)), 200
+
+@api_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Route to expose this worker's request latencies and counts, in-flight requests,
+    and OMDb and SQL timings in the Prometheus text format.
+    """
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
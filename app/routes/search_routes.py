@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from app.utils.logger import logger
 import requests
 
@@ -6,13 +6,21 @@ from app.utils.omdb import (
     fetch_movie_by_title,
     fetch_movie_by_id,
     search_movies_by_keyword,
-    fetch_random_movie,
-    fetch_top_rated_movies,
+    sample_random_movie,
+    top_rated_movies,
+    LOCAL_SEARCH_FIRST,
 )
-from app.utils.omdb import random_titles
 
 search_bp = Blueprint("search", __name__)
 
+def parse_flag(value):
+    """Parse a boolean query string parameter."""
+    return value.lower() in ("1", "true", "yes")
+
+def forward(response):
+    """Send an OMDb body to the client as OMDb sent it, without decoding and re-encoding it."""
+    return Response(response.body, status=200, content_type=response.content_type)
+
 @search_bp.route('/search-by-title', methods=['GET'])
 def search_by_title():
     title = request.args.get("title")
@@ -20,9 +28,9 @@ def search_by_title():
     plot = request.args.get("plot")
 
     try:
-        data = fetch_movie_by_title(title, year, plot)
-        logger.info(data)
-        return jsonify(data), 200
+        data = fetch_movie_by_title(title, year, plot, raw=True)
+        logger.info("Searched by title", extra={"title": title, "response_bytes": len(data.body)})
+        return forward(data)
     except ValueError as e:
         logger.error(str(e))
         return jsonify({"error": str(e)}), 400
@@ -36,9 +44,9 @@ def search_by_id():
     plot = request.args.get("plot")
 
     try:
-        data = fetch_movie_by_id(movie_id, plot)
-        logger.info(data)
-        return jsonify(data), 200
+        data = fetch_movie_by_id(movie_id, plot, raw=True)
+        logger.info("Searched by ID", extra={"imdb_id": movie_id, "response_bytes": len(data.body)})
+        return forward(data)
     except ValueError as e:
         logger.error(str(e))
         return jsonify({"error": str(e)}), 400
@@ -51,10 +59,11 @@ def search_by_keyword_route():
     year = request.args.get("year", type=int)
     content_type = request.args.get("content_type")
     page = request.args.get("page", type=int) or 1
+    local_first = request.args.get("local_first", default=LOCAL_SEARCH_FIRST, type=parse_flag)
 
     try:
-        data = search_movies_by_keyword(keyword, year, content_type, page)
-        logger.info(data)
+        data = search_movies_by_keyword(keyword, year, content_type, page, local_first)
+        logger.info("Searched by keyword", extra={"keyword": keyword, "page": page, "results": len(data)})
         return jsonify(data), 200
     except ValueError as e:
         logger.error(str(e))
@@ -68,8 +77,8 @@ def search_random_movie_route():
     plot = request.args.get("plot")
 
     try:
-        data = fetch_random_movie(random_titles, plot)
-        return jsonify(data), 200
+        data = sample_random_movie(plot, raw=True)
+        return forward(data)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except requests.RequestException:
@@ -77,23 +86,13 @@ def search_random_movie_route():
 
 @search_bp.route('/top-rated-movies', methods=['GET'])
 def top_rated_movies_route():
-    top_movies = [
-        "The Shawshank Redemption",
-        "The Godfather",
-        "The Dark Knight",
-        "Pulp Fiction",
-        "Schindler's List",
-    ]
-
     try:
-        data = fetch_top_rated_movies(top_movies)
-        logger.info(data)
+        data = top_rated_movies.get()
+        logger.info("Got top rated movies", extra={"results": len(data)})
         return jsonify(data), 200
     except ValueError as e:
         logger.error(str(e))
         return jsonify({"error": str(e)}), 400
-    except requests.RequestException:
+    except (requests.RequestException, TimeoutError):
         logger.error("Failed to fetch data from OMDB API")
         return jsonify({"error": "Failed to fetch data from OMDB API"}), 500
-
-
@@ -2,14 +2,26 @@
 from flask import Blueprint, request, jsonify
 from app.utils.logger import logger
 from app.models.user import User
-from app.utils.db import db
+from app.utils.db import db, read_replica
 from app.utils.hashing import hash_password
 from app.utils.hashing import verify_password
+from app.utils.hashing import needs_rehash
+from app.utils.hashing import HashingBusyError
+from app.utils.auth import AUTH_TOKEN_MAX_AGE, issue_token
 user_bp = Blueprint('user', __name__)
 # Configure logger
 
 user_bp = Blueprint('user', __name__)
 
+@user_bp.errorhandler(HashingBusyError)
+def hashing_busy(e):
+    """
+    Answer 503 when the password hashing pool is saturated, so clients back off
+    instead of tying up more request threads.
+    """
+    logger.warning(f'Password hashing busy: {e}')
+    return jsonify({'error': 'Server is busy, please retry shortly'}), 503, {'Retry-After': '1'}
+
 @user_bp.route('/create-account', methods=['POST'])
 def create_account():
     """
@@ -60,14 +72,20 @@ def login():
     if not username or not password:
         return jsonify({'error': 'Username and password are required'}), 400
 
-    # Retrieve user from database
-    user = User.query.filter_by(username=username).first()
+    # Retrieve user from a read replica, or the primary if the account was just created or changed
+    with read_replica(username):
+        user = User.query.filter_by(username=username).first()
     if not user:
         return jsonify({'error': 'Invalid username or password'}), 401
 
     # Verify the password
     if verify_password(user.salt, user.hashed_password, password):
-        return jsonify({'message': 'Login successful'}), 200
+        # Upgrade hashes made with older parameters while the password is at hand
+        if needs_rehash(user.hashed_password):
+            user.salt, user.hashed_password = hash_password(password)
+            db.session.commit()
+            logger.info(f'Rehashed password for {username}')
+        return jsonify({'message': 'Login successful', 'token': issue_token(user), 'expires_in': AUTH_TOKEN_MAX_AGE}), 200
     else:
         return jsonify({'error': 'Invalid username or password'}), 401
 
@@ -1,17 +1,30 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 import requests
 import os
 from app.utils.logger import logger
-from app.models.user import User
+from app.utils.user_lookup import resolve_user_id
+from app.utils.auth import AuthError, authenticated_username
+from app.utils.export_utils import EXPORT_FORMATS, export_chunks
 from app.utils.watchlist_utils import (
     add_movie_to_watchlist,
     delete_movie_from_watchlist,
     update_movie_from_watchlist,
-    get_user_watchlist
+    get_user_watchlist_page,
+    iter_watchlist_entries,
+    parse_watchlist_fields,
+    WATCHLIST_FIELDS,
+    bulk_add_movies_to_watchlist,
+    bulk_update_movies_from_watchlist,
+    bulk_delete_movies_from_watchlist
 )
 
 watchlist_bp = Blueprint('watchlist', __name__)
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# Plot text is the bulk of each entry, so it is only returned when asked for.
+DEFAULT_FIELDS = [field for field in WATCHLIST_FIELDS if field != 'Plot']
+
 @watchlist_bp.route('/add-to-watchlist', methods=['POST'])
 def add_to_watchlist():
     """
@@ -26,6 +39,8 @@ def add_to_watchlist():
 
     Raises:
         400 error if invalid input
+        401 error if the bearer token is invalid or expired (or missing when required)
+        403 error if the bearer token belongs to another user
         404 error if username not found
         500 error if unexcepted error occurred
     """
@@ -33,7 +48,7 @@ def add_to_watchlist():
     
     try:
         data = request.get_json()
-        username = data.get('username')
+        username = authenticated_username(data.get('username'))
         imdb_id = data.get('imdb_id')
 
         #check if valid input
@@ -41,8 +56,7 @@ def add_to_watchlist():
             return jsonify({'error': 'Username and imdb_id required'}), 400
 
         #check if user exists
-        user = User.query.filter_by(username=username).first()
-        if not user:
+        if not resolve_user_id(username):
             return jsonify({'error': 'User not found'}), 404
 
         #add movie to watchlist 
@@ -50,6 +64,10 @@ def add_to_watchlist():
         logger.info(f"Movie {imdb_id} added to {username}'s watchlist")
         return jsonify({"message": f"Movie added to {username}'s watchlist"}), 201
         
+    #Handle missing, invalid or foreign tokens
+    except AuthError as e:
+        return jsonify({'error': str(e)}), e.status_code
+
     #Handle unexpected errors
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
@@ -70,6 +88,8 @@ def delete_from_watchlist():
 
     Raises:
         400 error if invalid input
+        401 error if the bearer token is invalid or expired (or missing when required)
+        403 error if the bearer token belongs to another user
         404 error if username not found
         500 error if unexcepted error occurred
     """
@@ -77,7 +97,7 @@ def delete_from_watchlist():
     
     try:
         data = request.get_json()
-        username = data.get('username')
+        username = authenticated_username(data.get('username'))
         imdb_id = data.get('imdb_id')
 
         #check if valid input
@@ -85,8 +105,7 @@ def delete_from_watchlist():
             return jsonify({'error': 'Username and imdb_id required'}), 400
 
         #check if user exists
-        user = User.query.filter_by(username=username).first()
-        if not user:
+        if not resolve_user_id(username):
             return jsonify({'error': 'User not found'}), 404
 
         #delete movie to watchlist 
@@ -94,6 +113,10 @@ def delete_from_watchlist():
         logger.info(f"Movie {imdb_id} deleted from {username}'s watchlist")
         return jsonify({"message": f"Movie deleted from {username}'s watchlist"}), 200
         
+    #Handle missing, invalid or foreign tokens
+    except AuthError as e:
+        return jsonify({'error': str(e)}), e.status_code
+
     #Handle unexpected errors
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
@@ -114,6 +137,8 @@ def update_watchlist():
 
     Raises:
         400 error if invalid input
+        401 error if the bearer token is invalid or expired (or missing when required)
+        403 error if the bearer token belongs to another user
         404 error if username not found
         404 error if watching state not 'To Watch' or 'Watched' or 'Watch Next'
         500 error if unexcepted error occurred
@@ -122,7 +147,7 @@ def update_watchlist():
     
     try:
         data = request.get_json()
-        username = data.get('username')
+        username = authenticated_username(data.get('username'))
         imdb_id = data.get('imdb_id')
         watching_state = data.get('watching_state')
 
@@ -131,8 +156,7 @@ def update_watchlist():
             return jsonify({'error': 'Username, imdb_id, and watching_state required'}), 400
 
         #check if user exists
-        user = User.query.filter_by(username=username).first()
-        if not user:
+        if not resolve_user_id(username):
             return jsonify({'error': 'User not found'}), 404
         
         #check if watching state is not 'To Watch' or 'Watched' or 'Watch Next'
@@ -144,6 +168,10 @@ def update_watchlist():
         logger.info(f"Movie {imdb_id} updated from {username}'s watchlist")
         return jsonify({"message": f"Movie updated from {username}'s watchlist"}), 200
         
+    #Handle missing, invalid or foreign tokens
+    except AuthError as e:
+        return jsonify({'error': str(e)}), e.status_code
+
     #Handle unexpected errors
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
@@ -152,42 +180,279 @@ def update_watchlist():
 @watchlist_bp.route('/get-watchlist', methods=['GET'])
 def get_watchlist():    
     """
-    Route to get a watchlist for a user.
+    Route to get a watchlist for a user, one page at a time.
     
-    Expects JSON Input:
+    Expects JSON Input (or query string):
         - username(str): username of user
+
+    Optional Query Parameters:
+        - limit(int): entries per page, 1 to 500 (default 100)
+        - cursor(int): next_cursor from the previous page
+        - watching_state(str): only entries in this watching state
+        - type(str): only entries of this type, e.g. 'movie' or 'series'
+        - fields(str): comma-separated fields to return; all but Plot by default
      
     Returns:
-        JSON response indicating the success of getting user watchlist.
+        JSON response with the page of the user watchlist and the cursor of the next page.
 
     Raises:
         400 error if invalid input
+        401 error if the bearer token is invalid or expired (or missing when required)
+        403 error if the bearer token belongs to another user
         404 error if username not found
         500 error if unexcepted error occurred
     """
     logger.info("Getting watchlist")
     
     try:
-        data = request.get_json()
-        username = data.get('username')
+        data = request.get_json(silent=True) or {}
+        username = authenticated_username(data.get('username') or request.args.get('username'))
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        cursor = request.args.get('cursor', type=int)
+        fields = request.args.get('fields')
 
     #check if valid input
         if not username :
             return jsonify({'error': 'Username required'}), 400
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+        try:
+            fields = parse_watchlist_fields(fields.split(',')) if fields else DEFAULT_FIELDS
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
     #check if user exists
-        user = User.query.filter_by(username=username).first()
-        if not user:
+        if not resolve_user_id(username):
             return jsonify({'error': 'User not found'}), 404
         
     #Get user watchlist
-        user_watchlist = get_user_watchlist(username)
+        user_watchlist, next_cursor = get_user_watchlist_page(
+            username,
+            fields=fields,
+            watching_state=request.args.get('watching_state'),
+            content_type=request.args.get('type'),
+            after=cursor,
+            limit=limit,
+        )
         logger.info(f"Got {username}'s watchlist")
-        return jsonify({"message": f"{username}'s watchlist", "watchlist": user_watchlist}), 200
+        return jsonify({"message": f"{username}'s watchlist", "watchlist": user_watchlist, "next_cursor": next_cursor}), 200
+
 
+    #Handle missing, invalid or foreign tokens
+    except AuthError as e:
+        return jsonify({'error': str(e)}), e.status_code
+
+    #Handle unexpected errors
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+
+@watchlist_bp.route('/export-watchlist', methods=['GET'])
+def export_watchlist():
+    """
+    Route to stream a user's whole watchlist for data exports and sync jobs.
+
+    Entries are read from the database in batches and written as they arrive, so
+    memory use does not grow with the size of the watchlist.
+
+    Expects Query Parameters (or JSON Input):
+        - username(str): username of user
+        - format(str, optional): 'ndjson' (default) or 'csv'
+        - fields(str, optional): comma-separated fields to export; all by default
+
+    Returns:
+        Streaming NDJSON or CSV response with one line per watchlist entry.
+
+    Raises:
+        400 error if invalid input
+        401 error if the bearer token is invalid or expired (or missing when required)
+        403 error if the bearer token belongs to another user
+        404 error if username not found
+        500 error if unexcepted error occurred
+    """
+    logger.info("Exporting watchlist")
+
+    try:
+        data = request.get_json(silent=True) or {}
+        username = authenticated_username(data.get('username') or request.args.get('username'))
+        export_format = request.args.get('format', 'ndjson')
+        fields = request.args.get('fields')
+
+        #check if valid input
+        if not username:
+            return jsonify({'error': 'Username required'}), 400
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"Format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+        try:
+            fields = parse_watchlist_fields(fields.split(',')) if fields else list(WATCHLIST_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        #check if user exists
+        if not resolve_user_id(username):
+            return jsonify({'error': 'User not found'}), 404
+
+        entries = iter_watchlist_entries(username, fields=fields)
+        return Response(
+            stream_with_context(export_chunks(entries, export_format, fields)),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename="{username}-watchlist.{export_format}"'},
+        )
+
+    #Handle missing, invalid or foreign tokens
+    except AuthError as e:
+        return jsonify({'error': str(e)}), e.status_code
+
+    #Handle unexpected errors
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+@watchlist_bp.route('/bulk-add-to-watchlist', methods=['POST'])
+def bulk_add_to_watchlist():
+    """
+    Route to add many movies to a user's watchlist at once.
+
+    Expects JSON Input:
+        - username(str): username of user
+        - imdb_ids(list): IMDb IDs of movies
+
+    Returns:
+        JSON response with the status of every movie ('added', 'already in watchlist', 'not found' or 'failed').
+
+    Raises:
+        400 error if invalid input
+        401 error if the bearer token is invalid or expired (or missing when required)
+        403 error if the bearer token belongs to another user
+        404 error if username not found
+        500 error if unexcepted error occurred
+    """
+    logger.info("Bulk adding to watchlist")
+
+    try:
+        data = request.get_json()
+        username = authenticated_username(data.get('username'))
+        imdb_ids = data.get('imdb_ids')
+
+        #check if valid input
+        if not username or not isinstance(imdb_ids, list) or not imdb_ids:
+            return jsonify({'error': 'Username and a list of imdb_ids required'}), 400
+
+        #check if user exists
+        if not resolve_user_id(username):
+            return jsonify({'error': 'User not found'}), 404
+
+        results = bulk_add_movies_to_watchlist(username=username, imdb_ids=imdb_ids)
+        return jsonify({"message": f"Processed {len(results)} movies for {username}'s watchlist", "results": results}), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    #Handle missing, invalid or foreign tokens
+    except AuthError as e:
+        return jsonify({'error': str(e)}), e.status_code
+
+    #Handle unexpected errors
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+@watchlist_bp.route('/bulk-update-watchlist', methods=['PUT'])
+def bulk_update_watchlist():
+    """
+    Route to update the watching state of many movies in a user's watchlist at once.
+
+    Expects JSON Input:
+        - username(str): username of user
+        - updates(list): objects with imdb_id(str) and watching_state(str), where watching state is either 'To Watch' or 'Watched' or 'Watch Next'
+
+    Returns:
+        JSON response with the status of every update ('updated', 'deleted', 'not found' or 'invalid state').
+
+    Raises:
+        400 error if invalid input
+        401 error if the bearer token is invalid or expired (or missing when required)
+        403 error if the bearer token belongs to another user
+        404 error if username not found
+        500 error if unexcepted error occurred
+    """
+    logger.info("Bulk updating watchlist")
+
+    try:
+        data = request.get_json()
+        username = authenticated_username(data.get('username'))
+        updates = data.get('updates')
+
+        #check if valid input
+        if not username or not isinstance(updates, list) or not updates \
+                or not all(isinstance(item, dict) for item in updates):
+            return jsonify({'error': 'Username and a list of updates required'}), 400
+
+        #check if user exists
+        if not resolve_user_id(username):
+            return jsonify({'error': 'User not found'}), 404
+
+        results = bulk_update_movies_from_watchlist(username=username, updates=updates)
+        return jsonify({"message": f"Processed {len(results)} updates for {username}'s watchlist", "results": results}), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    #Handle missing, invalid or foreign tokens
+    except AuthError as e:
+        return jsonify({'error': str(e)}), e.status_code
+
+    #Handle unexpected errors
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+@watchlist_bp.route('/bulk-delete-from-watchlist', methods=['DELETE'])
+def bulk_delete_from_watchlist():
+    """
+    Route to delete many movies from a user's watchlist at once.
+
+    Expects JSON Input:
+        - username(str): username of user
+        - imdb_ids(list): IMDb IDs of movies
+
+    Returns:
+        JSON response with the status of every movie ('deleted' or 'not found').
+
+    Raises:
+        400 error if invalid input
+        401 error if the bearer token is invalid or expired (or missing when required)
+        403 error if the bearer token belongs to another user
+        404 error if username not found
+        500 error if unexcepted error occurred
+    """
+    logger.info("Bulk deleting from watchlist")
+
+    try:
+        data = request.get_json()
+        username = authenticated_username(data.get('username'))
+        imdb_ids = data.get('imdb_ids')
+
+        #check if valid input
+        if not username or not isinstance(imdb_ids, list) or not imdb_ids:
+            return jsonify({'error': 'Username and a list of imdb_ids required'}), 400
+
+        #check if user exists
+        if not resolve_user_id(username):
+            return jsonify({'error': 'User not found'}), 404
+
+        results = bulk_delete_movies_from_watchlist(username=username, imdb_ids=imdb_ids)
+        return jsonify({"message": f"Processed {len(results)} movies for {username}'s watchlist", "results": results}), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    #Handle missing, invalid or foreign tokens
+    except AuthError as e:
+        return jsonify({'error': str(e)}), e.status_code
 
     #Handle unexpected errors
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
         return jsonify({"error": "An unexpected error occurred"}), 500
-    
@@ -0,0 +1,73 @@
+# Description: Signed, expiring bearer tokens issued at login and checked on the watchlist routes.
+import os
+from flask import current_app, g, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+AUTH_TOKEN_MAX_AGE = int(os.getenv("AUTH_TOKEN_MAX_AGE", "3600"))
+REQUIRE_AUTH_TOKEN = os.getenv("REQUIRE_AUTH_TOKEN", "false").lower() in ("1", "true", "yes")
+
+class AuthError(Exception):
+    """Raised when a request's bearer token is missing, invalid or for another user."""
+
+    def __init__(self, message, status_code=401):
+        super().__init__(message)
+        self.status_code = status_code
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt="auth-token")
+
+def issue_token(user):
+    """
+    Issue a signed token for a user that has just proven their password.
+
+    Returns:
+        str: The token, valid for AUTH_TOKEN_MAX_AGE seconds.
+    """
+    return _serializer().dumps({"uid": user.id, "usr": user.username})
+
+def verify_token(token):
+    """
+    Check a token's signature and age. This is a single HMAC, with no database or password hashing.
+
+    Returns:
+        dict: The token payload with the user's id ('uid') and username ('usr').
+
+    Raises:
+        AuthError: If the token is expired or was not signed by us.
+    """
+    try:
+        return _serializer().loads(token, max_age=AUTH_TOKEN_MAX_AGE)
+    except SignatureExpired:
+        raise AuthError("Token expired")
+    except BadSignature:
+        raise AuthError("Invalid token")
+
+def authenticated_username(username=None):
+    """
+    Get the username a request acts for.
+
+    With an `Authorization: Bearer <token>` header the username comes from the
+    verified token, and its user id is remembered for the request so no user query
+    is needed. Without one, the given username is used unless REQUIRE_AUTH_TOKEN is set.
+
+    Arguments:
+        username (str, optional): The username sent in the request body.
+
+    Raises:
+        AuthError: If the token is invalid, required but missing, or for another user.
+    """
+    header = request.headers.get("Authorization", "")
+    if not header:
+        if REQUIRE_AUTH_TOKEN:
+            raise AuthError("Authorization token required")
+        return username
+
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise AuthError("Authorization header must be 'Bearer <token>'")
+
+    payload = verify_token(token.strip())
+    if username and username != payload["usr"]:
+        raise AuthError("Token does not belong to this user", status_code=403)
+    g.setdefault("user_ids", {})[payload["usr"]] = payload["uid"]
+    return payload["usr"]
@@ -0,0 +1,244 @@
+# Description: Process-local caches used in front of the OMDb API.
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from app.utils.logger import logger
+
+
+class TTLCache:
+    """
+    A thread-safe, size-bounded cache with per-entry expiry and LRU eviction.
+
+    Attributes:
+        maxsize (int): The maximum number of entries kept before the least recently used is evicted.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that found no live entry.
+        evictions (int): Number of entries dropped to stay within maxsize.
+        expirations (int): Number of entries dropped because their TTL ran out.
+    """
+
+    def __init__(self, maxsize=1024, clock=time.monotonic):
+        self.maxsize = maxsize
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """
+        Look up a key.
+
+        Returns:
+            tuple: (True, value) on a hit, (False, None) on a miss or expired entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value, ttl):
+        """Store a value for ttl seconds, evicting the least recently used entries if full."""
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, self._clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        """Remove a key if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Return the cache counters as a dict."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class RefreshingValue:
+    """
+    A single precomputed value that is served from memory and reloaded in a
+    background thread once it is older than its refresh interval.
+
+    Only the very first call waits for the loader; afterwards callers always get
+    the last good value while at most one refresh runs.
+
+    Attributes:
+        loader (callable): Computes a fresh value.
+        interval (float or callable): Seconds a value stays fresh, or a function of the value returning them.
+        retry_interval (float): Seconds to wait before retrying after a failed refresh.
+    """
+
+    def __init__(self, loader, interval, retry_interval=30.0, clock=time.monotonic):
+        self.loader = loader
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self._clock = clock
+        self._value = None
+        self._loaded = False
+        self._refresh_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self):
+        """Return the current value, loading it synchronously on first use."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._store(self.loader())
+            return self._value
+
+        if self._clock() >= self._refresh_at:
+            with self._lock:
+                start = not self._refreshing
+                self._refreshing = True
+            if start:
+                threading.Thread(target=self._refresh, daemon=True).start()
+        return self._value
+
+    def _store(self, value):
+        interval = self.interval(value) if callable(self.interval) else self.interval
+        self._value = value
+        self._refresh_at = self._clock() + interval
+        self._loaded = True
+
+    def _refresh(self):
+        try:
+            self._store(self.loader())
+        except Exception as e:
+            logger.warning(f"Background refresh failed: {e}")
+            self._refresh_at = self._clock() + self.retry_interval
+        finally:
+            self._refreshing = False
+
+    def invalidate(self):
+        """Drop the value so the next call reloads it synchronously."""
+        with self._lock:
+            self._value = None
+            self._loaded = False
+
+
+class RefreshingPool:
+    """
+    Precomputed values for a fixed list of items, kept per key (such as a query
+    option), sampled at random from memory and reloaded in a background thread as
+    they expire.
+
+    A key's pool is filled in the background on its first sample, which returns None
+    until values are available. Items keep their last good value when reloading
+    them fails, and are retried after retry_interval.
+
+    Attributes:
+        loader (callable): loader(key, items) returns one value per item, or None or an exception for failures.
+        items (list): The items whose values make up each key's pool.
+        keys (tuple): The keys pools are kept for; other keys are never pooled.
+        ttl (float): Seconds a value stays fresh.
+        retry_interval (float): Seconds to wait before reloading items that failed.
+    """
+
+    def __init__(self, loader, items, keys, ttl, retry_interval=30.0, clock=time.monotonic):
+        self.loader = loader
+        self.items = items
+        self.keys = keys
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._samples = {}
+        self._refresh_at = {}
+        self._refreshing = set()
+
+    def sample(self, key=None):
+        """
+        Return a random value from the key's pool, starting a background reload if
+        any of its values have expired.
+
+        Returns:
+            The value, or None if the key is not pooled or its pool is still empty.
+        """
+        if key not in self.keys:
+            return None
+        if self._clock() >= self._refresh_at.get(key, 0.0):
+            self.refresh(key)
+        values = self._samples.get(key)
+        return random.choice(values) if values else None
+
+    def refresh(self, key):
+        """Reload the key's missing and expired values in a background thread, unless one is already running."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(key,), daemon=True).start()
+
+    def _refresh(self, key):
+        try:
+            now = self._clock()
+            entries = dict(self._entries.get(key, {}))
+            due = [item for item in self.items if item not in entries or entries[item][1] <= now]
+            values = self.loader(key, due) if due else []
+            for item, value in zip(due, values):
+                if value is not None and not isinstance(value, Exception):
+                    entries[item] = (value, now + self.ttl)
+                elif item in entries:
+                    entries[item] = (entries[item][0], now + self.retry_interval)
+            expiries = [expires_at for _, expires_at in entries.values()]
+            if len(entries) < len(self.items):
+                expiries.append(now + self.retry_interval)
+            self._entries[key] = entries
+            self._samples[key] = tuple(value for value, _ in entries.values())
+            self._refresh_at[key] = min(expiries)
+        except Exception as e:
+            logger.warning(f"Background refresh failed: {e}")
+            self._refresh_at[key] = self._clock() + self.retry_interval
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self):
+        """Return the number of pooled values per key."""
+        return {str(key): len(self._samples.get(key, ())) for key in self.keys}
+
+    def clear(self):
+        """Drop every pooled value; the next sample of each key starts filling it again."""
+        with self._lock:
+            self._entries.clear()
+            self._samples.clear()
+            self._refresh_at.clear()
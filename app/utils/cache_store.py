@@ -0,0 +1,127 @@
+# Description: Persistent OMDb response cache shared by all worker processes on a host.
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_DB = os.path.join(os.path.dirname(__file__), "..", "..", "instance", "omdb_cache.db")
+
+
+class SQLiteCacheStore:
+    """
+    A key/value store of raw OMDb JSON payloads with expiry timestamps, kept in a
+    WAL-mode SQLite file so that concurrent workers can read while one writes.
+
+    Each thread of each process gets its own connection.
+
+    Attributes:
+        path (str): The SQLite database file.
+        busy_timeout (float): Seconds to wait for a write lock before giving up.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_DB, busy_timeout=5.0):
+        self.path = os.path.abspath(path)
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        """Return this thread's connection, opening it (and the schema) on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS omdb_cache ("
+                " key TEXT PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_omdb_cache_expires_at ON omdb_cache (expires_at)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        """
+        Look up a live entry.
+
+        Returns:
+            tuple: (payload, expires_at) or None if the key is missing or expired.
+        """
+        row = self._connection().execute(
+            "SELECT payload, expires_at FROM omdb_cache WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return row
+
+    def get_stale(self, key):
+        """
+        Look up an entry whether or not it has expired; rows are kept until purged.
+
+        Returns:
+            str: The payload, or None if the key was never stored or has been purged.
+        """
+        row = self._connection().execute("SELECT payload FROM omdb_cache WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def payloads(self):
+        """Yield the payload of every stored entry, expired or not."""
+        for (payload,) in self._connection().execute("SELECT payload FROM omdb_cache"):
+            yield payload
+
+    def set(self, key, payload, ttl):
+        """Store a raw JSON payload for ttl seconds."""
+        if ttl <= 0:
+            return
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO omdb_cache (key, payload, expires_at, created_at) VALUES (?, ?, ?, ?)",
+            (key, payload, now + ttl, now),
+        )
+
+    def purge(self, expired_only=True):
+        """
+        Delete entries from the store.
+
+        Arguments:
+            expired_only (bool): Only delete entries whose expiry has passed.
+
+        Returns:
+            int: The number of deleted entries.
+        """
+        conn = self._connection()
+        if expired_only:
+            cursor = conn.execute("DELETE FROM omdb_cache WHERE expires_at <= ?", (time.time(),))
+        else:
+            cursor = conn.execute("DELETE FROM omdb_cache")
+        return cursor.rowcount
+
+    def stats(self):
+        """Return the number of live and expired entries and the payload size on disk."""
+        live, expired, payload_bytes = self._connection().execute(
+            "SELECT"
+            " COALESCE(SUM(expires_at > :now), 0),"
+            " COALESCE(SUM(expires_at <= :now), 0),"
+            " COALESCE(SUM(LENGTH(payload)), 0)"
+            " FROM omdb_cache",
+            {"now": time.time()},
+        ).fetchone()
+        return {"path": self.path, "live": live, "expired": expired, "payload_bytes": payload_bytes}
+
+    def entries(self, limit=20):
+        """Return the most recently stored keys with their remaining TTL in seconds."""
+        now = time.time()
+        rows = self._connection().execute(
+            "SELECT key, expires_at FROM omdb_cache ORDER BY created_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [(key, round(expires_at - now, 1)) for key, expires_at in rows]
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,141 @@
+# Description: Circuit breaker that stops calling an upstream service while it is failing.
+import threading
+import time
+from collections import deque
+
+import requests
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling the upstream service while the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    A thread-safe circuit breaker driven by the error rate and latency of recent calls.
+
+    Closed: calls go through and their outcomes are kept in a rolling window. Once
+    the window holds at least `min_calls` outcomes and the share of failed or slow
+    calls reaches `failure_rate`, the breaker opens.
+    Open: calls are refused for `open_seconds`, then the breaker turns half-open.
+    Half-open: up to `half_open_calls` trial calls go through at a time. A good trial
+    closes the breaker with an empty window; a bad one opens it again.
+
+    Attributes:
+        window (int): Number of recent call outcomes considered.
+        min_calls (int): Outcomes needed before the breaker may open.
+        failure_rate (float): Share of failed or slow calls that opens the breaker.
+        slow_call_seconds (float): Calls taking longer than this count as failures.
+        open_seconds (float): Seconds to refuse calls before trying again.
+        half_open_calls (int): Concurrent trial calls allowed while half-open.
+    """
+
+    def __init__(self, window=20, min_calls=10, failure_rate=0.5, slow_call_seconds=5.0,
+                 open_seconds=30.0, half_open_calls=1, clock=time.monotonic):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trials = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        """The current state, turning an expired open breaker half-open."""
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._trials = 0
+        return self._state
+
+    def allow(self):
+        """
+        Ask whether a call may go to the upstream service now.
+
+        Every allowed call must be followed by record_success or record_failure.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def cancel(self):
+        """Give back an allowed call that was never made."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trials = max(self._trials - 1, 0)
+
+    def record_success(self, duration):
+        """Record a call that returned after duration seconds; slow calls count as failures."""
+        self._record(duration <= self.slow_call_seconds)
+
+    def record_failure(self):
+        """Record a call that failed."""
+        self._record(False)
+
+    def _record(self, ok):
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                self._trials = max(self._trials - 1, 0)
+                if ok:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            if state == OPEN:
+                return
+            self._outcomes.append(ok)
+            if len(self._outcomes) >= self.min_calls and self._failure_share() >= self.failure_rate:
+                self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+        self.times_opened += 1
+
+    def _failure_share(self):
+        return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+
+    def reset(self):
+        """Close the breaker and forget recent outcomes."""
+        with self._lock:
+            self._state = CLOSED
+            self._outcomes.clear()
+            self._trials = 0
+
+    def stats(self):
+        """Return the state and counters as a dict."""
+        with self._lock:
+            state = self._current_state()
+            return {
+                "state": state,
+                "failure_rate": round(self._failure_share(), 4),
+                "calls_in_window": len(self._outcomes),
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+                "retry_in": round(max(self._opened_at + self.open_seconds - self._clock(), 0.0), 1)
+                if state == OPEN else 0.0,
+            }
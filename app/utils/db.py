@@ -1,3 +1,237 @@
+import itertools
+import math
+import os
+import time
+from contextlib import contextmanager
+
+from flask import g, has_app_context, has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+
+from app.utils.cache import TTLCache
+
+
+def database_url(url):
+    """Return a database URL usable by SQLAlchemy; hosting providers often hand out postgres:// URLs."""
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+# Relative SQLite paths are resolved against the Flask instance folder.
+DATABASE_URL = database_url(os.getenv("DATABASE_URL", "sqlite:///movie_app.db"))
+
+# Applied to every new SQLite connection; an empty value leaves SQLite's default.
+# WAL lets readers run alongside the writer, NORMAL only syncs at checkpoints in WAL
+# mode, and the busy timeout makes writers queue for the lock instead of failing.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT", "5000"),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+}
+
+# Connection pool of each worker process. Recycling and pre-ping keep a server
+# database's idle-connection timeouts and failovers from surfacing as request errors.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+
+# Read replicas, as comma-separated URLs; they are registered as the binds replica_0, replica_1, ...
+DATABASE_REPLICA_URLS = [database_url(url.strip()) for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+                         if url.strip()]
+REPLICA_BIND_PREFIX = "replica_"
+
+# After a request writes, its users' reads stay on the primary for this many seconds,
+# which should exceed the replication lag. The client is told so in a cookie, so the
+# window holds when its next request lands on another worker or host.
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+STICKY_COOKIE = "db_primary_until"
+
+# username -> True while the user's reads stay on the primary, in this process.
+recent_writers = TTLCache(maxsize=int(os.getenv("REPLICA_STICKY_USERS", "4096")))
+
+_round_robin = itertools.count()
+
+
+class RoutingSession(Session):
+    """
+    A session that sends the queries of a read_replica block to a replica engine.
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary, and mark
+    the request as having written.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            if self._flushing or getattr(clause, "is_dml", False):
+                g.db_wrote = True
+            elif g.get("db_replica") is not None:
+                return g.db_replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _track_flushed_users(session, flush_context):
+    # Writes to a user row, e.g. a new account or password, keep that user's reads on the primary.
+    for instance in itertools.chain(session.new, session.dirty, session.deleted):
+        username = getattr(instance, "username", None)
+        if isinstance(username, str):
+            track_user(username)
+
+
+def engine_options(url=DATABASE_URL):
+    """
+    Return the SQLAlchemy engine options for a database URL.
+
+    In-memory SQLite databases live in a single shared connection, so they get no pool options.
+
+    Arguments:
+        url (str): The database URL.
+
+    Returns:
+        dict: Keyword arguments for create_engine, as SQLALCHEMY_ENGINE_OPTIONS.
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def configure_engine(engine, pragmas=None):
+    """
+    Set the SQLite pragmas on every connection the engine opens. Other databases are left alone.
+
+    Arguments:
+        engine (Engine): The SQLAlchemy engine.
+        pragmas (dict, optional): Pragma name -> value; defaults to SQLITE_PRAGMAS.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = {name: value for name, value in (pragmas or SQLITE_PRAGMAS).items() if value not in (None, "")}
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def insert_ignoring_conflicts(model):
+    """
+    Return an INSERT into a model's table that skips rows clashing with its primary key
+    or a unique index instead of failing, as ON CONFLICT DO NOTHING.
+
+    Arguments:
+        model: The model class.
+
+    Raises:
+        NotImplementedError: If the database is neither SQLite nor PostgreSQL.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        return sqlite.insert(model).on_conflict_do_nothing()
+    raise NotImplementedError(f"No INSERT ... ON CONFLICT for {dialect}")
+
+
+def replica_binds(urls=None):
+    """
+    Return the Flask-SQLAlchemy binds of the read replicas.
+
+    Arguments:
+        urls (list, optional): Replica URLs; defaults to DATABASE_REPLICA_URLS.
+
+    Returns:
+        dict: Bind key -> engine options including the URL, as SQLALCHEMY_BINDS.
+    """
+    urls = DATABASE_REPLICA_URLS if urls is None else urls
+    return {f"{REPLICA_BIND_PREFIX}{n}": dict(engine_options(url), url=url) for n, url in enumerate(urls)}
+
+
+def replica_binds_in(binds):
+    """Return the bind keys of the read replicas among a SQLALCHEMY_BINDS mapping."""
+    return [key for key in binds if isinstance(key, str) and key.startswith(REPLICA_BIND_PREFIX)]
+
+
+def track_user(username):
+    """Note that the current request acts for username, so that its writes make the user sticky."""
+    if has_app_context():
+        g.setdefault("db_users", set()).add(username)
+
+
+def _sticky(username):
+    """Return True if username, or the client of the current request, wrote within the sticky window."""
+    if username and recent_writers.get(username)[0]:
+        return True
+    if has_request_context():
+        try:
+            return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+    return False
+
+
+def _replica():
+    """Return this request's replica engine, picked round-robin on first use, or None without replicas."""
+    if "db_replica_engine" not in g:
+        engines = db.engines
+        replicas = [engines[key] for key in replica_binds_in(engines)]
+        g.db_replica_engine = replicas[next(_round_robin) % len(replicas)] if replicas else None
+    return g.db_replica_engine
+
+
+@contextmanager
+def read_replica(username=None):
+    """
+    Send the queries made in the block to a read replica.
+
+    The block must only read. Its queries stay on the primary when there are no
+    replicas, outside of an app context, or when username or the client wrote
+    within REPLICA_STICKY_SECONDS.
+
+    Arguments:
+        username (str, optional): The user whose data is read.
+    """
+    if not has_app_context():
+        yield
+        return
+    if username:
+        track_user(username)
+    previous = g.get("db_replica")
+    g.db_replica = None if _sticky(username) else _replica()
+    try:
+        yield
+    finally:
+        g.db_replica = previous
+
 
-db = SQLAlchemy()
+def remember_writes(response):
+    """
+    after_request hook that keeps the reads of a request's users and client on the
+    primary for REPLICA_STICKY_SECONDS after the request wrote.
+    """
+    if g.pop("db_wrote", False) and REPLICA_STICKY_SECONDS > 0 and _replica() is not None:
+        for username in g.get("db_users", ()):
+            recent_writers.set(username, True, REPLICA_STICKY_SECONDS)
+        response.set_cookie(STICKY_COOKIE, f"{time.time() + REPLICA_STICKY_SECONDS:.3f}",
+                            max_age=math.ceil(REPLICA_STICKY_SECONDS), httponly=True, samesite="Lax")
+    return response
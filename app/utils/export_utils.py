@@ -0,0 +1,49 @@
+# Description: Serialize streamed watchlist entries as NDJSON or CSV.
+import csv
+import io
+import json
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def export_chunks(entries, export_format, fieldnames, lines_per_chunk=100):
+    """
+    Serialize entries lazily, a few lines per chunk.
+
+    Arguments:
+        entries (iterable): Watchlist entry dicts, e.g. from iter_watchlist_entries.
+        export_format (str): "ndjson" or "csv".
+        fieldnames (list): The entry keys, used as the CSV header.
+        lines_per_chunk (int): Entries serialized into each yielded string.
+
+    Yields:
+        str: Serialized lines; the CSV header comes first.
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Format must be one of: {', '.join(EXPORT_FORMATS)}")
+
+    buffer = io.StringIO()
+    writer = None
+    if export_format == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+        writer.writeheader()
+
+    count = 0
+    for entry in entries:
+        if writer is not None:
+            writer.writerow(entry)
+        else:
+            buffer.write(json.dumps(entry))
+            buffer.write("\n")
+        count += 1
+        if count % lines_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
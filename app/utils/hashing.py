@@ -1,20 +1,126 @@
 # Description: Hashing utility functions for password hashing and verification.
 import hashlib
+import hmac
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+HASH_ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", "sha256")
+HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "100000"))
+
+# Parameters of hashes stored before they recorded their own.
+LEGACY_ALGORITHM = "sha256"
+LEGACY_ITERATIONS = 100000
+
+class HashingBusyError(Exception):
+    """Raised when the hashing executor is saturated and cannot take more work in time."""
+
+class HashingExecutor:
+    """
+    Runs PBKDF2 on a small dedicated thread pool instead of the request threads.
+
+    hashlib releases the GIL while hashing, so the pool uses up to `workers` cores.
+    At most `queue_size` hashes may be running or waiting; beyond that callers are
+    rejected immediately. Each caller is a request thread blocked on its hash, so
+    queue_size must stay below the request threads for a login flood not to tie up
+    all of them (see default_queue_size).
+
+    Attributes:
+        workers (int): Number of hashing threads.
+        queue_size (int): Maximum number of hashes running or queued.
+        timeout (float): Seconds a caller waits for its hash before giving up.
+    """
+
+    def __init__(self, workers, queue_size, timeout):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hashing")
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, fn, *args):
+        """
+        Run fn(*args) on the hashing pool and wait for its result.
+
+        Raises:
+            HashingBusyError: If the queue is full or the result is not ready within the timeout.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusyError("Too many password hashes in progress")
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise HashingBusyError("Timed out waiting for password hash")
+
+def default_queue_size(request_threads):
+    """
+    Return how many hashes may be in flight so that one request thread stays free.
+
+    Arguments:
+        request_threads (int): Threads serving requests in one process, i.e. WEB_THREADS.
+
+    Returns:
+        int: One less than request_threads, and at least 1.
+    """
+    return max(1, request_threads - 1)
+
+hashing_executor = HashingExecutor(
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1))),
+    queue_size=int(os.getenv("PASSWORD_HASH_QUEUE_SIZE")
+                   or default_queue_size(int(os.getenv("WEB_THREADS", "4")))),
+    timeout=float(os.getenv("PASSWORD_HASH_TIMEOUT", "10")),
+)
+
+def _parse_hash(hashed):
+    """Split a stored hash into (algorithm, iterations, hex digest)."""
+    if "$" not in hashed:
+        return LEGACY_ALGORITHM, LEGACY_ITERATIONS, hashed
+    scheme, iterations, digest = hashed.split("$", 2)
+    return scheme[len("pbkdf2_"):], int(iterations), digest
+
+def _pbkdf2(algorithm, password, salt, iterations):
+    return hashlib.pbkdf2_hmac(algorithm, password.encode(), salt, iterations)
 
 def hash_password(password):
     """
     Hash a password with a randomly generated salt.
     Returns the salt and hashed password as hex strings.
+
+    The hash records its parameters as "pbkdf2_<algorithm>$<iterations>$<hex digest>"
+    so they can be raised later without invalidating stored passwords.
     """
     salt = os.urandom(16)
-    hashed = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, 100000)
-    return salt.hex(), hashed.hex()
+    hashed = hashing_executor.run(_pbkdf2, HASH_ALGORITHM, password, salt, HASH_ITERATIONS)
+    return salt.hex(), f"pbkdf2_{HASH_ALGORITHM}${HASH_ITERATIONS}${hashed.hex()}"
 
 def verify_password(salt_hex, hashed_hex, password_attempt):
     """
-    Verify a password attempt against the stored salt and hashed password.
+    Verify a password attempt against the stored salt and hashed password, in constant time.
+    Hashes stored before parameters were recorded are checked as SHA-256 with 100,000 iterations.
     """
+    algorithm, iterations, digest = _parse_hash(hashed_hex)
     salt = bytes.fromhex(salt_hex)
-    hashed_attempt = hashlib.pbkdf2_hmac('sha256', password_attempt.encode(), salt, 100000)
-    return hashed_attempt.hex() == hashed_hex
+    hashed_attempt = hashing_executor.run(_pbkdf2, algorithm, password_attempt, salt, iterations)
+    return hmac.compare_digest(hashed_attempt.hex(), digest)
+
+def needs_rehash(hashed_hex):
+    """Return True if a stored hash was made with other parameters than the configured ones."""
+    algorithm, iterations, _ = _parse_hash(hashed_hex)
+    return "$" not in hashed_hex or algorithm != HASH_ALGORITHM or iterations != HASH_ITERATIONS
@@ -1,6 +1,237 @@
+# Description: Application logging: plain text or JSON lines, written by a background thread and sampled per route.
+import atexit
+import json
 import logging
+import os
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
 
+from flask import has_request_context, request
+
+from app.utils.metrics import metrics
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_ASYNC = os.getenv("LOG_ASYNC", "false").lower() in ("1", "true", "yes")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_MAX_LENGTH = int(os.getenv("LOG_MAX_LENGTH", "1000"))
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+# The format logging.basicConfig uses, which the app used before.
+TEXT_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field.
+_RECORD_ATTRIBUTES = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "route", "method", "taskName"}
+
+# Key in the WSGI environ holding whether the INFO records of a request are kept.
+_SAMPLED_KEY = "movie_app.log_sampled"
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def parse_sample_rates(value):
+    """
+    Parse per-route sample rates, e.g. "/api/health=0,/search/search-by-id=0.1".
+
+    Arguments:
+        value (str): Comma-separated route=rate pairs, routes written as in the route decorators.
+
+    Returns:
+        dict: Route rule -> share of requests whose INFO records are kept, from 0 to 1.
+
+    Raises:
+        ValueError: If a pair has no rate or the rate is not a number between 0 and 1.
+    """
+    rates = {}
+    for pair in filter(None, (part.strip() for part in value.split(","))):
+        route, separator, rate = pair.rpartition("=")
+        if not separator or not route.strip():
+            raise ValueError(f"Invalid log sample rate: {pair!r}")
+        rate = float(rate)
+        if not 0 <= rate <= 1:
+            raise ValueError(f"Log sample rate must be between 0 and 1: {pair!r}")
+        rates[route.strip()] = rate
+    return rates
+
+
+def truncate(text, max_length):
+    """Shorten text to max_length characters, saying how long it was; 0 keeps it whole."""
+    if max_length and len(text) > max_length:
+        return f"{text[:max_length]}... [{len(text)} chars]"
+    return text
+
+
+def extra_fields(record):
+    """Return the fields passed to a logging call with extra=, in the order they were given."""
+    return {key: value for key, value in record.__dict__.items() if key not in _RECORD_ATTRIBUTES}
+
+
+class RequestFilter(logging.Filter):
+    """
+    Tag records logged while handling a request with its method and route, and keep
+    the DEBUG and INFO records of only a sample of the requests to some routes.
+
+    The decision is made once per request, so a sampled request keeps all of its
+    records. Warnings and errors are always kept.
+
+    Attributes:
+        sample_rates (dict): Route rule -> share of requests whose records are kept.
+    """
+
+    def __init__(self, sample_rates=None):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+
+    def filter(self, record):
+        if not has_request_context():
+            return True
+        current = request._get_current_object()
+        route = current.url_rule.rule if current.url_rule is not None else None
+        record.method = current.method
+        record.route = route
+        if record.levelno >= logging.WARNING or route not in self.sample_rates:
+            return True
+        sampled = current.environ.get(_SAMPLED_KEY)
+        if sampled is None:
+            sampled = current.environ[_SAMPLED_KEY] = random.random() < self.sample_rates[route]
+        return sampled
+
+
+class TextFormatter(logging.Formatter):
+    """The plain text format, with extra fields appended as key=value and long messages truncated."""
+
+    def __init__(self, max_length=LOG_MAX_LENGTH):
+        super().__init__(TEXT_FORMAT)
+        self.max_length = max_length
+
+    def formatMessage(self, record):
+        # format() sets record.message again for every handler, so shortening it here is safe.
+        record.message = truncate(record.message, self.max_length)
+        line = super().formatMessage(record)
+        fields = extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message, the method and route of
+    the request if any, the extra fields, and the traceback if any. Long messages and
+    string fields are truncated.
+    """
+
+    def __init__(self, max_length=LOG_MAX_LENGTH):
+        super().__init__()
+        self.max_length = max_length
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": truncate(record.getMessage(), self.max_length),
+        }
+        if getattr(record, "route", None) is not None:
+            entry["method"] = record.method
+            entry["route"] = record.route
+        for key, value in extra_fields(record).items():
+            entry[key] = truncate(value, self.max_length) if isinstance(value, str) else value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class BackgroundQueueHandler(QueueHandler):
+    """
+    Put records on a bounded queue for a QueueListener thread to format and write.
+
+    The caller only renders the message and the traceback if any; truncation, JSON
+    encoding and the write happen on the listener thread. When the queue is full the
+    record is dropped and counted, rather than making the request wait for the writer.
+
+    Attributes:
+        dropped (int): Records dropped because the queue was full.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # A copy, so that other handlers of the record still see the original.
+        record = logging.makeLogRecord(record.__dict__)
+        # Rendered now, since the arguments may change before the listener gets to them.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.inc("log_records_dropped_total")
+
+
+class BackgroundListener(QueueListener):
+    """A QueueListener whose stop() waits for room in a full queue instead of failing."""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+_installed = {"handler": None, "listener": None}
+
+
+def stop_logging():
+    """Remove the handler installed by init_logging, writing out the records still queued."""
+    if _installed["handler"] is not None:
+        logging.getLogger().removeHandler(_installed["handler"])
+    if _installed["listener"] is not None:
+        _installed["listener"].stop()
+    _installed["handler"] = _installed["listener"] = None
+
+
+atexit.register(stop_logging)
+
+
+def init_logging(config):
+    """
+    Configure the root logger from the LOG_* settings, replacing the handler of a previous call.
+
+    Arguments:
+        config (dict): Settings that take precedence over the environment, e.g. app.config.
+
+    Returns:
+        logging.Handler: The handler added to the root logger.
+    """
+    max_length = int(config.get("LOG_MAX_LENGTH", LOG_MAX_LENGTH))
+    log_format = config.get("LOG_FORMAT", LOG_FORMAT)
+    if log_format not in ("text", "json"):
+        raise ValueError(f"LOG_FORMAT must be 'text' or 'json', not {log_format!r}")
+    stream = logging.StreamHandler()
+    stream.setFormatter(JSONFormatter(max_length) if log_format == "json" else TextFormatter(max_length))
+
+    stop_logging()
+    if config.get("LOG_ASYNC", LOG_ASYNC):
+        handler = BackgroundQueueHandler(queue.Queue(int(config.get("LOG_QUEUE_SIZE", LOG_QUEUE_SIZE))))
+        _installed["listener"] = BackgroundListener(handler.queue, stream)
+        _installed["listener"].start()
+    else:
+        handler = stream
+    sample_rates = config.get("LOG_SAMPLE_RATES", LOG_SAMPLE_RATES)
+    handler.addFilter(RequestFilter(parse_sample_rates(sample_rates) if isinstance(sample_rates, str) else sample_rates))
+    _installed["handler"] = handler
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(config.get("LOG_LEVEL", LOG_LEVEL))
+    return handler
@@ -0,0 +1,263 @@
+# Description: Request, OMDb and SQL timings aggregated per thread and rendered in the Prometheus text format.
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request
+from sqlalchemy import event
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Upper bounds in seconds, like the Prometheus client defaults.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+SQL_OPERATIONS = ("select", "insert", "update", "delete")
+
+
+class _Shard:
+    """The series recorded by one thread: (name, label values) -> value, or bucket counts plus sum for histograms."""
+
+    __slots__ = ("thread", "values", "histograms")
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.values = {}
+        self.histograms = {}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """
+    A registry of counters, gauges and histograms that records without locks.
+
+    Each thread writes to its own shard, so recording is a few dict and list
+    operations with no lock and no contention between threads. Shards are only
+    merged when the metrics are rendered. The shards of threads that ended are
+    folded into one, so short-lived threads do not pile up.
+
+    Counts are per process: with several workers, each reports its own.
+
+    Attributes:
+        buckets (tuple): Upper bounds of the histogram buckets, in seconds.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = _Shard(None)
+        self._definitions = {}
+
+    def define(self, name, kind, help_text, labels=()):
+        """
+        Declare a metric before recording it.
+
+        Arguments:
+            name (str): The metric name.
+            kind (str): COUNTER, GAUGE or HISTOGRAM.
+            help_text (str): The HELP line.
+            labels (tuple): Label names; values are passed in the same order when recording.
+        """
+        self._definitions[name] = (kind, help_text, tuple(labels))
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def inc(self, name, labels=(), amount=1):
+        """Add amount to a counter, or to a gauge (negative to decrease it)."""
+        values = self._shard().values
+        key = (name, labels)
+        values[key] = values.get(key, 0) + amount
+
+    def observe(self, name, labels, seconds):
+        """Record a duration in a histogram."""
+        histograms = self._shard().histograms
+        key = (name, labels)
+        series = histograms.get(key)
+        if series is None:
+            # One count per bucket, one for +Inf, then the sum.
+            series = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, seconds)] += 1
+        series[-1] += seconds
+
+    def _collect(self):
+        """Merge every shard into (values, histograms), retiring the shards of finished threads."""
+        with self._lock:
+            live = []
+            for shard in self._shards:
+                if shard.thread.is_alive():
+                    live.append(shard)
+                else:
+                    self._merge_into(self._retired.values, self._retired.histograms,
+                                     shard.values.copy(), shard.histograms.copy())
+            self._shards = live
+            values, histograms = {}, {}
+            self._merge_into(values, histograms, self._retired.values.copy(), self._retired.histograms.copy())
+        for shard in live:
+            # dict.copy() is atomic, so a shard can be read while its thread keeps recording.
+            self._merge_into(values, histograms, shard.values.copy(), shard.histograms.copy())
+        return values, histograms
+
+    @staticmethod
+    def _merge_into(values, histograms, more_values, more_histograms):
+        for key, value in more_values.items():
+            values[key] = values.get(key, 0) + value
+        for key, series in more_histograms.items():
+            total = histograms.get(key)
+            if total is None:
+                histograms[key] = list(series)
+            else:
+                for i, count in enumerate(series):
+                    total[i] += count
+
+    def value(self, name, labels=()):
+        """Return the current total of a counter or gauge series."""
+        return self._collect()[0].get((name, labels), 0)
+
+    def histogram(self, name, labels):
+        """Return (count, sum) of a histogram series."""
+        series = self._collect()[1].get((name, labels))
+        return (sum(series[:-1]), series[-1]) if series else (0, 0.0)
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        values, histograms = self._collect()
+        lines = []
+        for name, (kind, help_text, label_names) in self._definitions.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == HISTOGRAM:
+                for (series_name, labels), series in sorted(histograms.items()):
+                    if series_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(self.buckets + ("+Inf",), series):
+                        cumulative += count
+                        le = f'le="{bound}"'
+                        lines.append(f"{name}_bucket{_format_labels(label_names, labels, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(label_names, labels)} {series[-1]!r}")
+                    lines.append(f"{name}_count{_format_labels(label_names, labels)} {cumulative}")
+            else:
+                for (series_name, labels), value in sorted(values.items()):
+                    if series_name == name:
+                        lines.append(f"{name}{_format_labels(label_names, labels)} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        """Forget every recorded value; the definitions are kept."""
+        with self._lock:
+            for shard in self._shards:
+                shard.values.clear()
+                shard.histograms.clear()
+            self._retired = _Shard(None)
+
+
+metrics = Metrics()
+metrics.define("http_requests_total", COUNTER, "HTTP requests handled, by route and status.",
+               ("method", "route", "status"))
+metrics.define("http_requests_in_flight", GAUGE, "HTTP requests being handled.")
+metrics.define("http_request_duration_seconds", HISTOGRAM, "Time to handle an HTTP request, by route.",
+               ("method", "route"))
+metrics.define("omdb_request_duration_seconds", HISTOGRAM,
+               "Time of OMDb upstream requests, retries included, by client and outcome.", ("client", "outcome"))
+metrics.define("db_query_duration_seconds", HISTOGRAM, "Time of SQL statements, by database and operation.",
+               ("database", "operation"))
+metrics.define("log_records_dropped_total", COUNTER, "Log records dropped because the background log queue was full.")
+
+
+# Each access through the request and g proxies costs about a microsecond, so the
+# hooks resolve them once.
+
+def _start_request():
+    g._get_current_object().metrics_started = time.perf_counter()
+    metrics.inc("http_requests_in_flight", (), 1)
+
+
+def _record_status(response):
+    g._get_current_object().metrics_status = response.status_code
+    return response
+
+
+def _finish_request(error=None):
+    app_globals = g._get_current_object()
+    started = app_globals.pop("metrics_started", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    current = request._get_current_object()
+    # Unmatched paths share one label, so scanners cannot blow up the number of series.
+    route = current.url_rule.rule if current.url_rule is not None else "<unmatched>"
+    status = app_globals.pop("metrics_status", 500 if error is not None else 200)
+    metrics.inc("http_requests_in_flight", (), -1)
+    metrics.observe("http_request_duration_seconds", (current.method, route), duration)
+    metrics.inc("http_requests_total", (current.method, route, str(status)))
+
+
+def instrument_engine(engine, database):
+    """
+    Time every SQL statement run by an engine.
+
+    Arguments:
+        engine (Engine): The SQLAlchemy engine.
+        database (str): The value of the database label, e.g. "primary".
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "metrics_started", None)
+        if started is None:
+            return
+        words = statement.split(None, 1)
+        operation = words[0].lower() if words else ""
+        metrics.observe("db_query_duration_seconds",
+                        (database, operation if operation in SQL_OPERATIONS else "other"),
+                        time.perf_counter() - started)
+
+
+def init_metrics(app, engines):
+    """
+    Record the latency and status of every request to app, and time the SQL of its engines.
+    Does nothing when the METRICS_ENABLED setting is off.
+
+    Arguments:
+        app (Flask): The application.
+        engines (dict): Bind key -> engine, as in db.engines; the default bind is labelled "primary".
+    """
+    if not app.config.get("METRICS_ENABLED", METRICS_ENABLED):
+        return
+    app.before_request(_start_request)
+    app.after_request(_record_status)
+    app.teardown_request(_finish_request)
+    for key, engine in engines.items():
+        instrument_engine(engine, key or "primary")
@@ -1,85 +1,936 @@
+import asyncio
+import json
+import random
 import requests
 import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import aiohttp
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 from typing import Literal, Optional
+from urllib3.util.retry import Retry
+
+from app.utils.cache import RefreshingPool, RefreshingValue, TTLCache
+from app.utils.cache_store import DEFAULT_CACHE_DB, SQLiteCacheStore
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.utils.logger import logger
+from app.utils.metrics import metrics
+from app.utils.rate_limiter import (
+    BACKGROUND,
+    DEFAULT_RATE_LIMIT_DB,
+    INTERACTIVE,
+    RateLimitedError,
+    SQLiteTokenBucket,
+)
+from app.utils.search_index import DEFAULT_SEARCH_DB, MovieSearchIndex
+from app.utils.singleflight import SingleFlight
+from app.utils.title_index import TitleIndex
 
 load_dotenv()
 
 OMDB_API_KEY = os.getenv("OMDB_API_KEY")   # Replace with your key for standalone tests
-BASEURL = f"http://www.omdbapi.com/?apikey={OMDB_API_KEY}&"
+BASEURL = os.getenv("OMDB_BASE_URL", "http://www.omdbapi.com/")
+
+# Upstream statuses that are retried with backoff before the error is surfaced.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+JSON_CONTENT_TYPE = "application/json; charset=utf-8"
 
 PlotType = Literal["short", "full"]
 ContentType = Literal["movie", "series", "episode"]
 
-def fetch_movie_by_title(title: str, year: Optional[int] = None, plot: Optional[PlotType] = None):
-    """Fetch a movie by its title."""
+
+def cache_key(query):
+    """
+    Build a normalized cache key for an OMDb query.
+
+    Titles, IMDb IDs and keywords are case-folded with whitespace collapsed, and a
+    missing plot type on title/ID lookups is treated as OMDb's default "short".
+    The API key is not part of the key.
+    """
+    normalized = {}
+    for name, value in query.items():
+        if name == "apikey":
+            continue
+        if name in ("t", "i", "s"):
+            normalized[name] = " ".join(str(value).split()).casefold()
+        else:
+            normalized[name] = str(value).strip().lower()
+    if "s" not in normalized:
+        normalized.setdefault("plot", "short")
+    return "&".join(f"{name}={normalized[name]}" for name in sorted(normalized))
+
+
+def is_upstream_failure(error):
+    """
+    Return True if an error means OMDb is unhealthy, as opposed to OMDb rejecting
+    this particular query with a 4xx status other than 429.
+    """
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return True
+
+
+class RawResponse:
+    """
+    An OMDb response body kept as the bytes OMDb sent, so that it can be cached and
+    forwarded to clients without decoding and re-encoding it. The body is decoded
+    at most once, on the first call to json().
+
+    Attributes:
+        body (bytes): The JSON body.
+        content_type (str): The media type to send the body with.
+    """
+
+    __slots__ = ("body", "content_type", "_data")
+
+    def __init__(self, body, content_type=JSON_CONTENT_TYPE):
+        self.body = body.encode() if isinstance(body, str) else body
+        self.content_type = content_type
+        self._data = None
+
+    def json(self):
+        """
+        Return the decoded body. The result is shared by every caller and must not be mutated.
+
+        Raises:
+            requests.exceptions.InvalidJSONError: If the body is not valid JSON. Unlike
+                requests.JSONDecodeError it is not a ValueError, which routes report as a bad request.
+        """
+        if self._data is None:
+            try:
+                self._data = json.loads(self.body)
+            except ValueError as e:
+                raise requests.exceptions.InvalidJSONError(f"OMDb sent a body that is not JSON: {e}") from e
+        return self._data
+
+    def __repr__(self):
+        return f"<RawResponse {len(self.body)} bytes>"
+
+
+class OMDbClient:
+    """
+    Shared HTTP client for the OMDb API.
+
+    Holds one keep-alive connection pool per worker process, applies connect/read
+    timeouts to every request and retries idempotent failures with backoff.
+
+    Attributes:
+        api_key (str): The OMDb API key sent with every request.
+        base_url (str): The OMDb endpoint.
+        pool_size (int): Maximum number of pooled connections to OMDb.
+        timeout (tuple): The (connect, read) timeout in seconds.
+        max_retries (int): Number of retries for connection errors and 429/5xx responses.
+        backoff_factor (float): Backoff factor between retries.
+        cache (TTLCache, optional): Response cache keyed by normalized query.
+        cache_ttl (float): Seconds to keep successful responses.
+        negative_ttl (float): Seconds to keep `Response: "False"` responses.
+        error_ttl (float): Seconds to keep request errors.
+        store (SQLiteCacheStore, optional): Persistent cache shared by all workers on the host.
+        fanout_workers (int): Threads used to send independent requests concurrently.
+        breaker (CircuitBreaker, optional): Stops sending requests while OMDb is failing or slow.
+        stale_ttl (float): Seconds to keep the last known response for stale fallbacks.
+        stale (TTLCache, optional): Last known responses, kept after they expire from the cache.
+        stale_served (int): Number of stale responses returned instead of an error.
+        limiter (SQLiteTokenBucket, optional): Request budget for the API key, shared by all workers.
+        index (MovieSearchIndex, optional): Full-text index fed with every movie OMDb returns.
+        titles (TitleIndex, optional): Trigram index of known titles, fed with every movie OMDb returns.
+    """
+
+    def __init__(self, api_key, base_url=BASEURL, pool_size=10, connect_timeout=3.05,
+                 read_timeout=10.0, max_retries=2, backoff_factor=0.3, cache=None,
+                 cache_ttl=3600.0, negative_ttl=300.0, error_ttl=10.0, store=None,
+                 fanout_workers=None, breaker=None, stale_ttl=86400.0, limiter=None, index=None,
+                 titles=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.negative_ttl = negative_ttl
+        self.error_ttl = error_ttl
+        self.store = store
+        self.fanout_workers = fanout_workers or pool_size
+        self.breaker = breaker
+        self.stale_ttl = stale_ttl
+        self.stale = TTLCache(maxsize=cache.maxsize) if cache is not None and stale_ttl > 0 else None
+        self.stale_served = 0
+        self.limiter = limiter
+        self.index = index
+        self.titles = titles
+        self.flights = SingleFlight()
+        self._session = None
+        self._pid = None
+        self._executor = None
+        self._executor_pid = None
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a client from the OMDB_* environment variables.
+
+        The shared cache store is only enabled when OMDB_CACHE_DB is set; use
+        OMDB_CACHE_DB=default for instance/omdb_cache.db. OMDB_BREAKER_* configure
+        the circuit breaker. The rate limiter is only enabled when OMDB_RATE_LIMIT_PER_SECOND
+        or OMDB_DAILY_LIMIT is set, and the search index when OMDB_SEARCH_INDEX is set
+        (OMDB_SEARCH_INDEX=default for instance/movie_search.db). TITLE_MATCH_THRESHOLD
+        sets how similar a misspelled title must be to a known one to be resolved, and
+        TITLE_INDEX_SIZE how many known titles each process keeps.
+        """
+        store_path = os.getenv("OMDB_CACHE_DB")
+        if store_path == "default":
+            store_path = DEFAULT_CACHE_DB
+        index_path = os.getenv("OMDB_SEARCH_INDEX")
+        if index_path == "default":
+            index_path = DEFAULT_SEARCH_DB
+        rate = float(os.getenv("OMDB_RATE_LIMIT_PER_SECOND", "0"))
+        daily_limit = int(os.getenv("OMDB_DAILY_LIMIT", "0"))
+        limiter = None
+        if rate > 0 or daily_limit > 0:
+            limiter = SQLiteTokenBucket(
+                os.getenv("OMDB_RATE_LIMIT_DB") or DEFAULT_RATE_LIMIT_DB,
+                rate=rate,
+                burst=int(os.getenv("OMDB_RATE_LIMIT_BURST", "10")),
+                daily_limit=daily_limit,
+                background_reserve=float(os.getenv("OMDB_RATE_LIMIT_BACKGROUND_RESERVE", "0.5")),
+                max_wait=float(os.getenv("OMDB_RATE_LIMIT_MAX_WAIT", "1")),
+            )
+        return cls(
+            api_key=OMDB_API_KEY,
+            base_url=BASEURL,
+            pool_size=int(os.getenv("OMDB_POOL_SIZE", "10")),
+            connect_timeout=float(os.getenv("OMDB_CONNECT_TIMEOUT", "3.05")),
+            read_timeout=float(os.getenv("OMDB_READ_TIMEOUT", "10")),
+            max_retries=int(os.getenv("OMDB_MAX_RETRIES", "2")),
+            backoff_factor=float(os.getenv("OMDB_BACKOFF_FACTOR", "0.3")),
+            cache=TTLCache(maxsize=int(os.getenv("OMDB_CACHE_SIZE", "1024"))),
+            cache_ttl=float(os.getenv("OMDB_CACHE_TTL", "3600")),
+            negative_ttl=float(os.getenv("OMDB_CACHE_NEGATIVE_TTL", "300")),
+            error_ttl=float(os.getenv("OMDB_CACHE_ERROR_TTL", "10")),
+            store=SQLiteCacheStore(store_path) if store_path else None,
+            fanout_workers=int(os.getenv("OMDB_FANOUT_WORKERS", "0")) or None,
+            breaker=CircuitBreaker(
+                window=int(os.getenv("OMDB_BREAKER_WINDOW", "20")),
+                min_calls=int(os.getenv("OMDB_BREAKER_MIN_CALLS", "10")),
+                failure_rate=float(os.getenv("OMDB_BREAKER_FAILURE_RATE", "0.5")),
+                slow_call_seconds=float(os.getenv("OMDB_BREAKER_SLOW_CALL", "5")),
+                open_seconds=float(os.getenv("OMDB_BREAKER_OPEN_SECONDS", "30")),
+                half_open_calls=int(os.getenv("OMDB_BREAKER_HALF_OPEN_CALLS", "1")),
+            ),
+            stale_ttl=float(os.getenv("OMDB_CACHE_STALE_TTL", "86400")),
+            limiter=limiter,
+            index=MovieSearchIndex(index_path) if index_path else None,
+            titles=TitleIndex(threshold=float(os.getenv("TITLE_MATCH_THRESHOLD", "0.85")),
+                              maxsize=int(os.getenv("TITLE_INDEX_SIZE", "10000"))),
+        )
+
+    @property
+    def session(self):
+        """
+        The pooled session for the current process.
+
+        Sessions are created lazily and re-created after a fork so that
+        worker processes never share sockets with their parent.
+        """
+        if self._session is None or self._pid != os.getpid():
+            retry = Retry(
+                total=self.max_retries,
+                backoff_factor=self.backoff_factor,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset(["GET"]),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size,
+                                  max_retries=retry, pool_block=False)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+            self._pid = os.getpid()
+        return self._session
+
+    @property
+    def executor(self):
+        """The bounded thread pool for concurrent requests in the current process."""
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.fanout_workers,
+                                                thread_name_prefix="omdb-fanout")
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def get_many(self, queries, timeout=None, allow_stale=False, priority=INTERACTIVE, raw=False):
+        """
+        Send several queries concurrently.
+
+        Queries beyond the pool size wait for a free worker, so the timeout applies to
+        each query from when a worker starts it, not to the whole batch: a large batch
+        takes as many rounds as it needs.
+
+        Arguments:
+            queries (list): Parameter dicts, one per request.
+            timeout (float, optional): Seconds to wait for each query; defaults to the read timeout.
+            allow_stale (bool): Fall back to stale responses, as in get().
+            priority (str): Rate limiter priority class, as in get().
+            raw (bool): Return RawResponse objects, as get_raw() does, instead of decoded bodies.
+
+        Returns:
+            list: One entry per query in the original order; the decoded body (or RawResponse),
+                or the exception raised for that query (TimeoutError if it did not finish in time).
+        """
+        timeout = self.timeout[1] if timeout is None else timeout
+        get = self.get_raw if raw else self.get
+        started = [None] * len(queries)
+
+        def run(index, params):
+            started[index] = time.monotonic()
+            return get(allow_stale, priority, **params)
+
+        futures = [self.executor.submit(run, index, params) for index, params in enumerate(queries)]
+        pending, expired = set(range(len(futures))), set()
+        while pending:
+            now = time.monotonic()
+            expired.update(index for index in pending
+                           if started[index] is not None and now - started[index] >= timeout)
+            pending -= expired
+            deadlines = [started[index] + timeout for index in pending if started[index] is not None]
+            # Wake up when the first running query is due, or when one finishes and frees a worker.
+            wait([futures[index] for index in pending], timeout=min(deadlines, default=now + timeout) - now,
+                 return_when=FIRST_COMPLETED)
+            pending = {index for index in pending if not futures[index].done()}
+        results = []
+        for index, future in enumerate(futures):
+            if index in expired and not future.done():
+                results.append(TimeoutError("OMDb request timed out"))
+            elif future.exception() is not None:
+                results.append(future.exception())
+            else:
+                results.append(future.result())
+        return results
+
+    def get(self, allow_stale=False, priority=INTERACTIVE, **params):
+        """
+        Send a GET request to OMDb and return the decoded JSON body.
+
+        Takes the same arguments and raises the same errors as get_raw(). Cached
+        bodies are decoded once and shared between callers, so they must not be mutated.
+        """
+        return self.get_raw(allow_stale, priority, **params).json()
+
+    def get_raw(self, allow_stale=False, priority=INTERACTIVE, **params):
+        """
+        Send a GET request to OMDb and return the body as OMDb sent it.
+
+        Responses are served from the cache when possible, without decoding them, and
+        concurrent callers asking for the same normalized query share a single upstream request.
+
+        Arguments:
+            allow_stale (bool): If the request fails or the circuit breaker is open, return
+                the last known response for the query instead, however old.
+            priority (str): INTERACTIVE for user-facing requests, BACKGROUND for refreshes and
+                prefetches, which may not use the budget reserved for interactive ones.
+            **params: OMDb query parameters. Parameters set to None are dropped.
+
+        Returns:
+            RawResponse: The response body and its content type.
+
+        Raises:
+            requests.RequestException: If the request fails, OMDb returns an error status or
+                a body that is not JSON (CircuitOpenError if the breaker is open, RateLimitedError
+                if the key's budget is used up), and no stale response was allowed or found.
+        """
+        query = {key: value for key, value in params.items() if value is not None}
+        key = cache_key(query)
+        try:
+            hit, response = self._lookup(key)
+            if hit:
+                return response
+            return self.flights.do(key, lambda: self._fetch(key, query, priority))
+        except requests.RequestException:
+            if allow_stale:
+                hit, response = self._lookup_stale(key)
+                if hit:
+                    return response
+            raise
+
+    def _fetch(self, key, query, priority=INTERACTIVE):
+        """Request a query from OMDb and remember the response or error under its key."""
+        self._check_breaker()
+        if self.limiter is not None:
+            self._acquire_budget(priority)
+        started = time.monotonic()
+        try:
+            response = self._request(query)
+            # Decode once here, so that a body that is not JSON fails like an error status.
+            response.json()
+        except Exception as e:
+            self._record_outcome(started, e)
+            if isinstance(e, requests.RequestException) and self.cache is not None:
+                self.cache.set(key, e, self.error_ttl)
+            raise
+        self._record_outcome(started)
+        self._remember(key, response)
+        return response
+
+    def _check_breaker(self):
+        """
+        Raises:
+            CircuitOpenError: If the circuit breaker refuses to let a request through.
+        """
+        if self.breaker is not None and not self.breaker.allow():
+            raise CircuitOpenError("OMDb circuit breaker is open")
+
+    def _acquire_budget(self, priority):
+        """
+        Take a request token, giving back the breaker's permission if none is left.
+        The limiter fails open: if its database cannot be used, the request is sent anyway.
+
+        Raises:
+            RateLimitedError: If the key has no budget left for this priority.
+        """
+        try:
+            self.limiter.acquire(priority)
+        except RateLimitedError:
+            if self.breaker is not None:
+                self.breaker.cancel()
+            raise
+        except sqlite3.Error as e:
+            logger.warning(f"OMDb rate limiter failed: {e}")
+
+    def _record_outcome(self, started, error=None, client="sync"):
+        """Feed a finished upstream request into the request metrics and the circuit breaker."""
+        duration = time.monotonic() - started
+        metrics.observe("omdb_request_duration_seconds", (client, "ok" if error is None else "error"), duration)
+        if self.breaker is None:
+            return
+        if error is not None and is_upstream_failure(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success(duration)
+
+    def _lookup_stale(self, key):
+        """
+        Find the last known response for a key, however old, in memory or the shared store.
+
+        Returns:
+            tuple: (True, RawResponse) if one was found, (False, None) otherwise.
+        """
+        found, response = False, None
+        if self.stale is not None:
+            found, response = self.stale.get(key)
+        if not found and self.store is not None:
+            try:
+                payload = self.store.get_stale(key)
+            except sqlite3.Error as e:
+                logger.warning(f"OMDb cache store read failed: {e}")
+                payload = None
+            if payload is not None:
+                found, response = True, RawResponse(payload)
+        if found:
+            self.stale_served += 1
+            logger.warning(f"Serving stale OMDb response for {key}")
+        return found, response
+
+    def _lookup(self, key):
+        """
+        Look a normalized key up in the process cache, then in the shared store.
+
+        Returns:
+            tuple: (True, RawResponse) on a hit, (False, None) otherwise.
+
+        Raises:
+            requests.RequestException: If a recent request for the key failed.
+        """
+        if self.cache is not None:
+            hit, cached = self.cache.get(key)
+            if hit:
+                if isinstance(cached, requests.RequestException):
+                    raise cached
+                return True, cached
+
+        if self.store is not None:
+            try:
+                stored = self.store.get(key)
+            except sqlite3.Error as e:
+                logger.warning(f"OMDb cache store read failed: {e}")
+                stored = None
+            if stored is not None:
+                payload, expires_at = stored
+                response = RawResponse(payload)
+                if self.cache is not None:
+                    self.cache.set(key, response, expires_at - time.time())
+                return True, response
+        return False, None
+
+    def _remember(self, key, response):
+        """Store a fresh OMDb response in the process cache and the shared store, and index its movies."""
+        data = response.json()
+        ttl = self.negative_ttl if data.get("Response") == "False" else self.cache_ttl
+        if self.cache is not None:
+            self.cache.set(key, response, ttl)
+        if self.stale is not None:
+            self.stale.set(key, response, self.stale_ttl)
+        if self.store is not None:
+            try:
+                self.store.set(key, response.body, ttl)
+            except sqlite3.Error as e:
+                logger.warning(f"OMDb cache store write failed: {e}")
+        if self.index is not None:
+            try:
+                self.index.add_response(data)
+            except sqlite3.Error as e:
+                logger.warning(f"Movie search index write failed: {e}")
+        if self.titles is not None:
+            self.titles.add_response(data)
+
+    def _request(self, query):
+        """Send the query to OMDb over the pooled session and return the undecoded body."""
+        response = self.session.get(self.base_url, params=dict(query, apikey=self.api_key),
+                                    timeout=self.timeout)
+        response.raise_for_status()
+        return RawResponse(response.content)
+
+    def stats(self):
+        """Return the cache, request coalescing and circuit breaker counters."""
+        return {
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "singleflight": self.flights.stats(),
+            "breaker": self.breaker.stats() if self.breaker is not None else None,
+            "stale_served": self.stale_served,
+            "rate_limit": self.limiter.stats() if self.limiter is not None else None,
+            "titles": self.titles.stats() if self.titles is not None else None,
+        }
+
+    def close(self):
+        """Close the pooled connections and the fan-out thread pool."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class AsyncOMDbClient:
+    """
+    asyncio counterpart of OMDbClient, used to fan large batches of lookups out
+    (see run_many) without a thread per request.
+
+    Requests run over an aiohttp connection pool on one long-lived event loop per
+    worker process, in a background thread, so connections are reused across calls;
+    up to `pool_size` upstream requests can be in flight per process.
+
+    Settings, the response cache and the shared store are those of the sync client,
+    so both paths fill and serve the same entries.
+
+    Attributes:
+        client (OMDbClient): The sync client whose settings, cache and store are used.
+        pool_size (int): Maximum number of concurrent connections to OMDb.
+        leaders (int): Number of upstream requests sent.
+        coalesced (int): Number of callers that waited on another caller's request.
+    """
+
+    def __init__(self, client, pool_size=100):
+        self.client = client
+        self.pool_size = pool_size
+        self.leaders = 0
+        self.coalesced = 0
+        self._loop = None
+        self._pid = None
+        self._http = None
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, client):
+        """Build an async client sharing the given sync client, sized by OMDB_ASYNC_POOL_SIZE."""
+        return cls(client, pool_size=int(os.getenv("OMDB_ASYNC_POOL_SIZE", "100")))
+
+    @property
+    def loop(self):
+        """
+        The event loop running this process's requests.
+
+        The loop and its thread are started lazily and re-created after a fork.
+        """
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="omdb-async", daemon=True).start()
+                self._loop = loop
+                self._pid = os.getpid()
+                self._http = None
+                self._flights = {}
+            return self._loop
+
+    @property
+    def http(self):
+        """The pooled aiohttp session; only used from the request loop."""
+        if self._http is None:
+            connect_timeout, read_timeout = self.client.timeout
+            self._http = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout),
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+            )
+        return self._http
+
+    async def get(self, allow_stale=False, priority=INTERACTIVE, **params):
+        """
+        Send a GET request to OMDb and return the decoded JSON body.
+
+        Takes the same arguments and raises the same errors as get_raw().
+        """
+        return (await self.get_raw(allow_stale, priority, **params)).json()
+
+    async def get_raw(self, allow_stale=False, priority=INTERACTIVE, **params):
+        """
+        Send a GET request to OMDb and return the body as OMDb sent it.
+
+        Behaves like OMDbClient.get_raw: cached responses and errors are served first,
+        concurrent async callers asking for the same normalized query share one request,
+        and the sync client's circuit breaker and stale fallback apply.
+
+        Arguments:
+            allow_stale (bool): Return the last known response if the request fails or the breaker is open.
+            priority (str): Rate limiter priority class, as in OMDbClient.get.
+            **params: OMDb query parameters. Parameters set to None are dropped.
+
+        Returns:
+            RawResponse: The response body and its content type.
+
+        Raises:
+            requests.RequestException: If the request fails or OMDb returns an error status or a body that is not JSON.
+        """
+        query = {key: value for key, value in params.items() if value is not None}
+        key = cache_key(query)
+        try:
+            hit, response = await self._read(self.client._lookup, key)
+            if hit:
+                return response
+            future = asyncio.run_coroutine_threadsafe(self._coalesce(key, query, priority), self.loop)
+            return await asyncio.wrap_future(future)
+        except requests.RequestException:
+            if allow_stale:
+                hit, response = await self._read(self.client._lookup_stale, key)
+                if hit:
+                    return response
+            raise
+
+    async def _read(self, lookup, key):
+        """
+        Look up a cached response, reading the shared store in a worker thread.
+
+        Arguments:
+            lookup (callable): OMDbClient._lookup or OMDbClient._lookup_stale.
+            key (str): The cache key.
+
+        Returns:
+            tuple: (hit, response), as returned by lookup.
+        """
+        if self.client.store is not None:
+            # A cache miss falls through to a SQLite read, which must not stall every lookup on the loop.
+            return await asyncio.to_thread(lookup, key)
+        return lookup(key)
+
+    async def get_many(self, queries, timeout=None, allow_stale=False, priority=INTERACTIVE, raw=False):
+        """
+        Send several queries concurrently.
+
+        At most `pool_size` queries run at once. Like OMDbClient.get_many, the timeout
+        applies to each query from when it starts, not to the whole batch.
+
+        Arguments:
+            queries (list): Parameter dicts, one per request.
+            timeout (float, optional): Seconds to wait for each query; defaults to the read timeout.
+            allow_stale (bool): Fall back to stale responses, as in get().
+            priority (str): Rate limiter priority class, as in get().
+            raw (bool): Return RawResponse objects, as get_raw() does, instead of decoded bodies.
+
+        Returns:
+            list: One entry per query in the original order; the decoded body (or RawResponse),
+                or the exception raised for that query (TimeoutError if it did not finish in time).
+        """
+        timeout = self.client.timeout[1] if timeout is None else timeout
+        get = self.get_raw if raw else self.get
+        slots = asyncio.Semaphore(self.pool_size)
+
+        async def run(params):
+            async with slots:
+                try:
+                    return await asyncio.wait_for(get(allow_stale, priority, **params), timeout)
+                except asyncio.TimeoutError:
+                    raise TimeoutError("OMDb request timed out") from None
+
+        return list(await asyncio.gather(*(run(params) for params in queries), return_exceptions=True))
+
+    def run_many(self, queries, **kwargs):
+        """
+        Run get_many() on the request loop and wait for it, for callers outside the loop.
+
+        Takes the same arguments and returns the same list as get_many().
+        """
+        if not queries:
+            return []
+        return asyncio.run_coroutine_threadsafe(self.get_many(queries, **kwargs), self.loop).result()
+
+    async def _coalesce(self, key, query, priority):
+        """Join the in-flight request for a key, or start it. Runs on the request loop."""
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, query, priority))
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._flights.pop(key, None)
+                                   if self._flights.get(key) is done else None)
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+        # A caller that gives up must not cancel the request for everyone else.
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key, query, priority):
+        """Request a query from OMDb and remember the response or error under its key."""
+        self.client._check_breaker()
+        if self.client.limiter is not None:
+            try:
+                await self.client.limiter.acquire_async(priority)
+            except RateLimitedError:
+                if self.client.breaker is not None:
+                    self.client.breaker.cancel()
+                raise
+            except sqlite3.Error as e:
+                logger.warning(f"OMDb rate limiter failed: {e}")
+        started = time.monotonic()
+        try:
+            response = await self._request(query)
+            # Decode once here, so that a body that is not JSON fails like an error status.
+            response.json()
+        except Exception as e:
+            self.client._record_outcome(started, e, client="async")
+            if isinstance(e, requests.RequestException) and self.client.cache is not None:
+                self.client.cache.set(key, e, self.client.error_ttl)
+            raise
+        self.client._record_outcome(started, client="async")
+        if self.client.store is not None or self.client.index is not None:
+            # The shared store and the search index are SQLite writes; keep them off the request loop.
+            await asyncio.to_thread(self.client._remember, key, response)
+        else:
+            self.client._remember(key, response)
+        return response
+
+    async def _request(self, query):
+        """
+        Send the query to OMDb, retrying like the sync client's urllib3 policy.
+
+        aiohttp errors are raised as their requests equivalents so that callers and the
+        error cache handle both clients the same way.
+        """
+        # Like requests, leave out the key when it is not configured.
+        params = {name: value for name, value in dict(query, apikey=self.client.api_key).items()
+                  if value is not None}
+        for attempt in range(self.client.max_retries + 1):
+            retry = attempt < self.client.max_retries
+            try:
+                status, body = await self._send(params)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if retry:
+                    await self._backoff(attempt)
+                    continue
+                if isinstance(e, asyncio.TimeoutError):
+                    raise requests.Timeout(str(e)) from e
+                raise requests.ConnectionError(str(e)) from e
+            if status in RETRY_STATUSES and retry:
+                await self._backoff(attempt)
+                continue
+            if status >= 400:
+                response = requests.Response()
+                response.status_code = status
+                raise requests.HTTPError(f"{status} Error for url: {self.client.base_url}", response=response)
+            return RawResponse(body)
+
+    async def _send(self, params):
+        """Send one GET over the pool and return (status, undecoded body or None on error statuses)."""
+        async with self.http.get(self.client.base_url, params=params) as response:
+            if response.status >= 400:
+                return response.status, None
+            return response.status, await response.read()
+
+    async def _backoff(self, attempt):
+        # Same schedule as urllib3: retry at once, then backoff_factor * 2 ** attempt.
+        if attempt:
+            await asyncio.sleep(self.client.backoff_factor * (2 ** attempt))
+
+    def stats(self):
+        """Return the request coalescing counters."""
+        return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._flights)}
+
+    def close(self):
+        """Close the pooled connections and stop the request loop."""
+        loop = self._loop
+        if loop is None or self._pid != os.getpid():
+            return
+        if self._http is not None:
+            asyncio.run_coroutine_threadsafe(self._http.close(), loop).result(timeout=5)
+            self._http = None
+        loop.call_soon_threadsafe(loop.stop)
+        self._loop = None
+
+
+client = OMDbClient.from_env()
+async_client = AsyncOMDbClient.from_env(client)
+
+# Local-first keyword searches fall back to OMDb below this many local matches.
+LOCAL_SEARCH_MIN_HITS = int(os.getenv("LOCAL_SEARCH_MIN_HITS", "10"))
+# Whether /search/search-by-keyword answers from the local index by default.
+LOCAL_SEARCH_FIRST = os.getenv("LOCAL_SEARCH_FIRST", "false").lower() in ("1", "true", "yes")
+
+def resolve_title(title: str, year: Optional[int] = None):
+    """
+    Resolve a possibly misspelled title against the titles OMDb has returned before.
+
+    Returns:
+        dict: The OMDb query for the movie: {"i": IMDb ID} when the match has a known ID,
+            otherwise {"t": title, "y": year} with the corrected title if one matched.
+    """
+    match = client.titles.lookup(title, year) if client.titles is not None else None
+    if match is not None and match["imdb_id"]:
+        return {"i": match["imdb_id"]}
+    return {"t": match["title"] if match is not None else title, "y": year or None}
+
+def fetch_movie_by_title(title: str, year: Optional[int] = None, plot: Optional[PlotType] = None,
+                         allow_stale: bool = True, priority: str = INTERACTIVE, raw: bool = False):
+    """
+    Fetch a movie by its title, falling back to a stale copy while OMDb is unavailable.
+
+    Titles that match a known movie, exactly or through a typo, are looked up by IMDb ID.
+    With raw, the undecoded RawResponse is returned for forwarding as is.
+    """
     if not title:
         raise ValueError("Missing 'title' parameter.")
 
-    year_param = f"&y={year}" if year else ""
-    plot_param = f"&plot={plot}" if plot else ""
-    api_url = f"{BASEURL}t={title}{year_param}{plot_param}"
+    get = client.get_raw if raw else client.get
+    return get(allow_stale=allow_stale, priority=priority, plot=plot or None, **resolve_title(title, year))
 
-    response = requests.get(api_url)
-    response.raise_for_status()
-    return response.json()
-
-def fetch_movie_by_id(movie_id: str, plot: Optional[PlotType] = None):
-    """Fetch a movie by its IMDb ID."""
+def fetch_movie_by_id(movie_id: str, plot: Optional[PlotType] = None, allow_stale: bool = True,
+                      priority: str = INTERACTIVE, raw: bool = False):
+    """
+    Fetch a movie by its IMDb ID, falling back to a stale copy while OMDb is unavailable.
+    With raw, the undecoded RawResponse is returned for forwarding as is.
+    """
     if not movie_id:
         raise ValueError("Missing 'id' parameter.")
 
-    plot_param = f"&plot={plot}" if plot else ""
-    api_url = f"{BASEURL}i={movie_id}{plot_param}"
+    get = client.get_raw if raw else client.get
+    return get(allow_stale=allow_stale, priority=priority, i=movie_id, plot=plot or None)
+
+def fetch_movies_by_ids(movie_ids: list, plot: Optional[PlotType] = None, timeout: Optional[float] = None):
+    """
+    Fetch several movies by IMDb ID concurrently, falling back to stale copies while OMDb is unavailable.
 
-    response = requests.get(api_url)
-    response.raise_for_status()
-    return response.json()
+    Returns:
+        list: One entry per ID in the original order; the OMDb response, or the
+            exception raised for that ID.
+    """
+    if not movie_ids:
+        return []
 
-def search_movies_by_keyword(keyword: str, year: Optional[int] = None, content_type: Optional[ContentType] = None, page: int = 1):
-    """Search movies by a keyword."""
+    # Batches can be large (bulk imports), so they go over the async client's connection
+    # pool rather than the sync client's threads.
+    return async_client.run_many([{"i": movie_id, "plot": plot or None} for movie_id in movie_ids],
+                                 timeout=timeout, allow_stale=True)
+
+def search_movies_by_keyword(keyword: str, year: Optional[int] = None, content_type: Optional[ContentType] = None, page: int = 1,
+                             local_first: bool = False):
+    """
+    Search movies by a keyword.
+
+    With local_first, the local search index answers instead of OMDb when it has at
+    least LOCAL_SEARCH_MIN_HITS matches and a result on the requested page.
+    """
     if not keyword:
         raise ValueError("Missing 'keyword' parameter.")
     if page < 1 or page > 100:
         raise ValueError("'page' parameter must be between 1 and 100.")
 
-    year_param = f"&y={year}" if year else ""
-    content_type_param = f"&type={content_type}" if content_type else ""
-    page_param = f"&page={page}"
-    api_url = f"{BASEURL}s={keyword}{year_param}{content_type_param}{page_param}"
-
-    response = requests.get(api_url)
-    response.raise_for_status()
-    return response.json().get("Search", [])
+    if local_first and client.index is not None:
+        try:
+            results, total = client.index.search(keyword, year, content_type, page)
+        except sqlite3.Error as e:
+            logger.warning(f"Movie search index read failed: {e}")
+        else:
+            if results and total >= LOCAL_SEARCH_MIN_HITS:
+                return results
 
-def fetch_random_movie(random_titles: list, plot: Optional[PlotType] = None):
-    """Fetch a random movie."""
-    import random
+    data = client.get(s=keyword, y=year or None, type=content_type or None, page=page)
+    return data.get("Search", [])
 
+def fetch_random_movie(random_titles: list, plot: Optional[PlotType] = None, raw: bool = False):
+    """Fetch a random movie, as an undecoded RawResponse with raw."""
     if not random_titles:
         raise ValueError("No random titles available.")
 
     title = random.choice(random_titles)
-    plot_param = f"&plot={plot}" if plot else ""
-    api_url = f"{BASEURL}t={title}{plot_param}"
+    get = client.get_raw if raw else client.get
+    return get(t=title, plot=plot or None)
 
-    response = requests.get(api_url)
-    response.raise_for_status()
-    return response.json()
+def sample_random_movie(plot: Optional[PlotType] = None, raw: bool = False):
+    """
+    Return a random movie from the precomputed pool, without waiting on OMDb.
 
-def fetch_top_rated_movies(top_movies: list):
-    """Fetch a predefined list of top-rated movies."""
+    While the pool for this plot type is first being filled, one movie is fetched live instead.
+    With raw, the undecoded RawResponse is returned for forwarding as is.
+    """
+    movie = random_movies.sample(plot or None)
+    if movie is None:
+        return fetch_random_movie(random_titles, plot, raw)
+    return movie if raw else movie.json()
+
+def fetch_top_rated_movies(top_movies: list, timeout: Optional[float] = None, priority: str = INTERACTIVE):
+    """
+    Fetch a predefined list of top-rated movies concurrently.
+
+    Titles that fail or do not answer within the timeout are left out; the others
+    keep their original order. The first error is raised only if every title failed.
+    """
     if not top_movies:
         raise ValueError("No top-rated movies available.")
 
     results = []
-    for title in top_movies:
-        api_url = f"{BASEURL}t={title}"
-        response = requests.get(api_url)
-        if response.status_code == 200:
-            results.append(response.json())
+    errors = []
+    for data in client.get_many([{"t": title} for title in top_movies], timeout=timeout, priority=priority):
+        if isinstance(data, Exception):
+            errors.append(data)
+        else:
+            results.append(data)
+    if not results:
+        # Nothing to serve: fail, so that a refresh keeps the previous list instead of caching none.
+        raise errors[0]
+    for error in errors:
+        logger.warning(f"Skipped top-rated movie: {error}")
     return results
 
+top_rated_titles = [
+    "The Shawshank Redemption",
+    "The Godfather",
+    "The Dark Knight",
+    "Pulp Fiction",
+    "Schindler's List",
+]
+
+TOP_RATED_REFRESH_INTERVAL = float(os.getenv("OMDB_TOP_RATED_REFRESH", "3600"))
+
+# The assembled top-rated list, served from memory. Partial lists are refreshed
+# again after a short retry interval rather than kept for the full refresh interval.
+top_rated_movies = RefreshingValue(
+    lambda: fetch_top_rated_movies(top_rated_titles, priority=BACKGROUND),
+    interval=lambda movies: TOP_RATED_REFRESH_INTERVAL if len(movies) == len(top_rated_titles) else 30.0,
+)
+
 random_titles = [
     "Inception",
     "Avatar",
@@ -156,4 +1007,39 @@ random_titles = [
     "The Departed",
     "The Revenant",
     "Mad Max: Fury Road"
-]
\ No newline at end of file
+]
+def load_random_movies(plot, titles):
+    """Fetch the random-movie pool for one plot type; titles OMDb does not know are left out."""
+    results = client.get_many([{"t": title, "plot": plot} for title in titles],
+                              allow_stale=True, priority=BACKGROUND, raw=True)
+    return [None if isinstance(result, RawResponse) and result.json().get("Response") == "False" else result
+            for result in results]
+
+RANDOM_POOL_TTL = float(os.getenv("RANDOM_POOL_TTL", "3600"))
+
+# Fully fetched random_titles, one pool per plot type, sampled by /search/search-random-movie.
+random_movies = RefreshingPool(load_random_movies, random_titles, keys=(None, "short", "full"),
+                               ttl=RANDOM_POOL_TTL)
+
+def known_titles():
+    """
+    Yield (title, imdb_id, year) for the titles the title index starts with: the
+    random and top-rated titles, and every movie in the shared cache and search index.
+    """
+    for title in random_titles + top_rated_titles:
+        yield title, None, None
+    try:
+        if client.store is not None:
+            for payload in client.store.payloads():
+                data = json.loads(payload)
+                if data.get("Response") != "False":
+                    for movie in data.get("Search") or [data]:
+                        if movie.get("Title"):
+                            yield movie["Title"], movie.get("imdbID"), movie.get("Year")
+        if client.index is not None:
+            yield from client.index.titles()
+    except sqlite3.Error as e:
+        logger.warning(f"Could not seed the title index: {e}")
+
+if client.titles is not None:
+    client.titles.seed = known_titles
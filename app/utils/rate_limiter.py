@@ -0,0 +1,211 @@
+# Description: Token-bucket rate limiter for the OMDb API key, shared by all worker processes on a host.
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+DEFAULT_RATE_LIMIT_DB = os.path.join(os.path.dirname(__file__), "..", "..", "instance", "omdb_rate_limit.db")
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+
+class RateLimitedError(requests.RequestException):
+    """
+    Raised instead of calling OMDb when the key has no budget left for the caller's priority.
+
+    Attributes:
+        retry_after (float): Seconds until a token is expected to be available, or None
+            if the daily quota is used up.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SQLiteTokenBucket:
+    """
+    A token bucket with a daily quota, kept in a WAL-mode SQLite file so that every
+    worker process draws from the same budget.
+
+    Tokens refill at `rate` per second up to `burst`; each request takes one token
+    and one unit of the daily quota. Background requests may not take the last
+    `background_reserve` share of either, so user-facing requests keep working when
+    refreshes and prefetches are busy.
+
+    Each thread of each process gets its own connection.
+
+    Attributes:
+        path (str): The SQLite database file.
+        rate (float): Tokens added per second; 0 disables the burst limit.
+        burst (int): Maximum number of tokens in the bucket.
+        daily_limit (int): Requests allowed per UTC day; 0 disables the daily limit.
+        background_reserve (float): Share of the bucket and of the daily quota kept for interactive requests.
+        max_wait (float): Seconds a caller may wait for a token before giving up.
+        busy_timeout (float): Seconds to wait for the database lock.
+    """
+
+    def __init__(self, path=DEFAULT_RATE_LIMIT_DB, rate=1.0, burst=10, daily_limit=0,
+                 background_reserve=0.5, max_wait=1.0, busy_timeout=5.0, clock=time.time):
+        self.path = os.path.abspath(path)
+        self.rate = rate
+        self.burst = burst
+        self.daily_limit = daily_limit
+        self.background_reserve = background_reserve
+        self.max_wait = max_wait
+        self.busy_timeout = busy_timeout
+        self._clock = clock
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        self.granted = dict.fromkeys(PRIORITIES, 0)
+        self.rejected = dict.fromkeys(PRIORITIES, 0)
+
+    def _connection(self):
+        """Return this thread's connection, opening it (and the schema) on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS token_bucket ("
+                " id INTEGER PRIMARY KEY CHECK (id = 1),"
+                " tokens REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " day TEXT NOT NULL,"
+                " day_used INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO token_bucket (id, tokens, updated_at, day, day_used) VALUES (1, ?, ?, ?, 0)",
+                (self.burst, self._clock(), self._today()),
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _today(self):
+        return datetime.fromtimestamp(self._clock(), timezone.utc).date().isoformat()
+
+    def _floors(self, priority):
+        """Return the tokens and daily requests that must be left over after a request of this priority."""
+        if priority == BACKGROUND:
+            return self.burst * self.background_reserve, self.daily_limit * self.background_reserve
+        return 0.0, 0
+
+    def try_acquire(self, priority=INTERACTIVE):
+        """
+        Take one token if the budget allows it for this priority.
+
+        Returns:
+            tuple: (True, 0.0) if a token was taken, otherwise (False, seconds until one
+                should be available), with None as the wait when the daily quota is used up.
+        """
+        token_floor, day_floor = self._floors(priority)
+        now = self._clock()
+        today = self._today()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, updated_at, day, day_used = conn.execute(
+                "SELECT tokens, updated_at, day, day_used FROM token_bucket WHERE id = 1"
+            ).fetchone()
+            if self.rate > 0:
+                tokens = min(self.burst, tokens + max(now - updated_at, 0.0) * self.rate)
+            if day != today:
+                day, day_used = today, 0
+
+            if self.daily_limit and day_used + 1 > self.daily_limit - day_floor:
+                granted, wait = False, None
+            elif self.rate > 0 and tokens - 1 < token_floor:
+                granted, wait = False, (token_floor + 1 - tokens) / self.rate
+            else:
+                granted, wait = True, 0.0
+                tokens -= 1
+                day_used += 1
+
+            conn.execute(
+                "UPDATE token_bucket SET tokens = ?, updated_at = ?, day = ?, day_used = ? WHERE id = 1",
+                (tokens, now, day, day_used),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return granted, wait
+
+    def acquire(self, priority=INTERACTIVE):
+        """
+        Take one token, waiting up to max_wait seconds for the bucket to refill.
+
+        Raises:
+            RateLimitedError: If no token became available in time.
+        """
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            granted, wait = self.try_acquire(priority)
+            if granted:
+                self._count(self.granted, priority)
+                return
+            if wait is None or time.monotonic() + wait > deadline:
+                self._count(self.rejected, priority)
+                raise RateLimitedError(f"OMDb request budget exhausted for {priority} requests", wait)
+            time.sleep(wait)
+
+    async def acquire_async(self, priority=INTERACTIVE):
+        """
+        Like acquire, but waits without blocking the event loop.
+
+        Raises:
+            RateLimitedError: If no token became available in time.
+        """
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            granted, wait = await asyncio.to_thread(self.try_acquire, priority)
+            if granted:
+                self._count(self.granted, priority)
+                return
+            if wait is None or time.monotonic() + wait > deadline:
+                self._count(self.rejected, priority)
+                raise RateLimitedError(f"OMDb request budget exhausted for {priority} requests", wait)
+            await asyncio.sleep(wait)
+
+    def _count(self, counters, priority):
+        with self._counter_lock:
+            counters[priority] += 1
+
+    def stats(self):
+        """Return the remaining budget and this process's grant/reject counters."""
+        now = self._clock()
+        tokens, updated_at, day, day_used = self._connection().execute(
+            "SELECT tokens, updated_at, day, day_used FROM token_bucket WHERE id = 1"
+        ).fetchone()
+        if self.rate > 0:
+            tokens = min(self.burst, tokens + max(now - updated_at, 0.0) * self.rate)
+        if day != self._today():
+            day_used = 0
+        with self._counter_lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "tokens": round(tokens, 2),
+                "daily_limit": self.daily_limit,
+                "daily_used": day_used,
+                "daily_remaining": self.daily_limit - day_used if self.daily_limit else None,
+                "background_reserve": self.background_reserve,
+                "granted": dict(self.granted),
+                "rejected": dict(self.rejected),
+            }
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,212 @@
+# Description: Local full-text index of the movies seen through OMDb, for keyword searches without a round trip.
+import os
+import re
+import sqlite3
+import threading
+
+DEFAULT_SEARCH_DB = os.path.join(os.path.dirname(__file__), "..", "..", "instance", "movie_search.db")
+
+# Relative weight of title, plot and genre matches in the BM25 ranking.
+BM25_WEIGHTS = (10.0, 1.0, 2.0)
+
+# Matches are only counted up to this many, which is as far as OMDb pages go; all of them are ranked.
+MAX_COUNTED_MATCHES = 1000
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def match_expression(keyword):
+    """
+    Turn a free-text keyword into an FTS5 query: every word must match a whole word,
+    like OMDb searches, except that a trailing * makes the last word a prefix.
+    Words are quoted so that FTS5 operators in user input are taken literally.
+
+    Returns:
+        str: The MATCH expression, or None if the keyword has no words.
+    """
+    words = _WORD.findall(keyword)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    if keyword.rstrip().endswith("*"):
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+class MovieSearchIndex:
+    """
+    An FTS5 index of movie titles, plots and genres in a SQLite file shared by all
+    workers on a host.
+
+    Movies are stored in a plain table keyed by IMDb ID; an external-content FTS5
+    table kept in sync by triggers indexes their text. Search results that carry no
+    plot or genre never overwrite ones that do.
+
+    Each thread of each process gets its own connection.
+
+    Attributes:
+        path (str): The SQLite database file.
+        busy_timeout (float): Seconds to wait for a write lock before giving up.
+    """
+
+    def __init__(self, path=DEFAULT_SEARCH_DB, busy_timeout=5.0):
+        self.path = os.path.abspath(path)
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        """Return this thread's connection, opening it (and the schema) on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS movies ("
+                " rowid INTEGER PRIMARY KEY,"
+                " imdb_id TEXT NOT NULL UNIQUE,"
+                " title TEXT NOT NULL,"
+                " year TEXT, type TEXT, poster TEXT, plot TEXT, genre TEXT);"
+                "CREATE VIRTUAL TABLE IF NOT EXISTS movie_fts USING fts5("
+                " title, plot, genre, content='movies', content_rowid='rowid',"
+                " tokenize='unicode61 remove_diacritics 2', prefix='2 3 4');"
+                "CREATE TRIGGER IF NOT EXISTS movies_ai AFTER INSERT ON movies BEGIN"
+                " INSERT INTO movie_fts (rowid, title, plot, genre) VALUES (new.rowid, new.title, new.plot, new.genre);"
+                " END;"
+                "CREATE TRIGGER IF NOT EXISTS movies_ad AFTER DELETE ON movies BEGIN"
+                " INSERT INTO movie_fts (movie_fts, rowid, title, plot, genre)"
+                " VALUES ('delete', old.rowid, old.title, old.plot, old.genre);"
+                " END;"
+                "CREATE TRIGGER IF NOT EXISTS movies_au AFTER UPDATE ON movies BEGIN"
+                " INSERT INTO movie_fts (movie_fts, rowid, title, plot, genre)"
+                " VALUES ('delete', old.rowid, old.title, old.plot, old.genre);"
+                " INSERT INTO movie_fts (rowid, title, plot, genre) VALUES (new.rowid, new.title, new.plot, new.genre);"
+                " END;"
+            )
+            # Rank by weighted BM25 inside FTS5, which is cheaper than calling bm25() per row.
+            conn.execute("INSERT INTO movie_fts (movie_fts, rank) VALUES ('rank', ?)",
+                         ("bm25({}, {}, {})".format(*BM25_WEIGHTS),))
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def add_many(self, movies):
+        """
+        Insert or update movies from OMDb responses or search results in one transaction.
+
+        Arguments:
+            movies (iterable): Dicts with OMDb field names; entries without imdbID or Title are skipped.
+
+        Returns:
+            int: The number of movies written.
+        """
+        rows = [
+            (movie["imdbID"], movie["Title"], movie.get("Year"), movie.get("Type"),
+             movie.get("Poster"), movie.get("Plot"), movie.get("Genre"))
+            for movie in movies
+            if movie.get("imdbID") and movie.get("Title")
+        ]
+        if not rows:
+            return 0
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO movies (imdb_id, title, year, type, poster, plot, genre)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (imdb_id) DO UPDATE SET"
+                " title = excluded.title,"
+                " year = COALESCE(excluded.year, movies.year),"
+                " type = COALESCE(excluded.type, movies.type),"
+                " poster = COALESCE(excluded.poster, movies.poster),"
+                " plot = COALESCE(excluded.plot, movies.plot),"
+                " genre = COALESCE(excluded.genre, movies.genre)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def add_response(self, data):
+        """Index the movies in an OMDb response: a single movie, or the results of an s= search."""
+        if data.get("Response") == "False":
+            return 0
+        return self.add_many(data.get("Search") or [data])
+
+    def search(self, keyword, year=None, content_type=None, page=1, page_size=10):
+        """
+        Search titles, plots and genres, best BM25 match first.
+
+        Arguments:
+            keyword (str): Free-text search; every word must match, the last one as a prefix if it ends with *.
+            year (int, optional): Only movies released that year (series starting that year).
+            content_type (str, optional): Only movies, series or episodes.
+            page (int): 1-based page number.
+            page_size (int): Results per page.
+
+        Returns:
+            tuple: (results, total) where results are dicts shaped like OMDb search results
+                and total is the number of matches across all pages, counted up to MAX_COUNTED_MATCHES.
+        """
+        expression = match_expression(keyword or "")
+        if expression is None:
+            return [], 0
+
+        params = {"match": expression, "limit": page_size, "offset": (page - 1) * page_size,
+                  "cap": MAX_COUNTED_MATCHES}
+        if year or content_type:
+            # Filters live on the movies table, so join before limiting.
+            where = ["movie_fts MATCH :match"]
+            if year:
+                where.append("movies.year LIKE :year")
+                params["year"] = f"{year}%"
+            if content_type:
+                where.append("movies.type = :type")
+                params["type"] = content_type
+            matches = ("SELECT movie_fts.rowid, movie_fts.rank FROM movie_fts"
+                       " JOIN movies ON movies.rowid = movie_fts.rowid WHERE " + " AND ".join(where))
+        else:
+            matches = "SELECT rowid, rank FROM movie_fts WHERE movie_fts MATCH :match"
+
+        conn = self._connection()
+        total = conn.execute(f"SELECT COUNT(*) FROM ({matches} LIMIT :cap)", params).fetchone()[0]
+        if not total:
+            return [], 0
+        # Every match is ranked, so the best one is never cut off; FTS5 keeps only the
+        # best offset + limit while sorting. Only the rows of the requested page are
+        # joined back to the movies table.
+        rows = conn.execute(
+            "SELECT movies.title, movies.year, movies.imdb_id, movies.type, movies.poster"
+            f" FROM ({matches} ORDER BY rank LIMIT :limit OFFSET :offset) AS page"
+            " JOIN movies ON movies.rowid = page.rowid"
+            " ORDER BY page.rank",
+            params,
+        ).fetchall()
+        results = [{"Title": title, "Year": year, "imdbID": imdb_id, "Type": type_, "Poster": poster}
+                   for title, year, imdb_id, type_, poster in rows]
+        return results, total
+
+    def titles(self):
+        """Yield (title, imdb_id, year) for every indexed movie."""
+        yield from self._connection().execute("SELECT title, imdb_id, year FROM movies")
+
+    def stats(self):
+        """Return the number of indexed movies and the database path."""
+        count = self._connection().execute("SELECT COUNT(*) FROM movies").fetchone()[0]
+        return {"path": self.path, "movies": count}
+
+    def clear(self):
+        """Remove every movie from the index."""
+        conn = self._connection()
+        conn.execute("DELETE FROM movies")
+        conn.execute("INSERT INTO movie_fts (movie_fts) VALUES ('rebuild')")
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,68 @@
+# Description: Request coalescing so concurrent callers share one upstream call per key.
+import threading
+
+
+class _Call:
+    """An in-flight call and the outcome its waiters will share."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls with the same key.
+
+    The first caller for a key runs the function; callers arriving while it is in
+    flight wait for it and receive the same result or exception.
+
+    Attributes:
+        leaders (int): Number of calls that actually ran the function.
+        coalesced (int): Number of calls that shared an in-flight call instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Run fn() once for all concurrent callers with the same key.
+
+        Raises:
+            Exception: Whatever fn() raised, re-raised in every caller that shared the call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        """Return the coalescing counters as a dict."""
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
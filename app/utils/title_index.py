@@ -0,0 +1,285 @@
+# Description: In-memory trigram index that resolves misspelled movie titles to known movies.
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_LEADING_ARTICLE = re.compile(r"^(the|a|an) (?=.)")
+# Numbers and roman numerals up to 399, which tell sequels apart: "Shrek 2", "Frozen II".
+_NUMBER_WORD = re.compile(r"^(\d+|(?=[ivxlc])c{0,3}(xc|xl|l?x{0,3})(ix|iv|v?i{0,3}))$")
+
+# Known words a misspelled query word may stand for.
+SIMILAR_WORDS = 3
+
+
+def normalize_title(title):
+    """Lowercase a title, strip accents, punctuation and a leading article, and collapse whitespace."""
+    decomposed = unicodedata.normalize("NFKD", title or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _LEADING_ARTICLE.sub("", _NON_WORD.sub(" ", stripped.lower()).strip())
+
+
+def trigrams(name):
+    """
+    Return the trigrams of a normalized title. Each word is padded like in
+    PostgreSQL's pg_trgm, so word starts weigh more than word ends.
+    """
+    grams = set()
+    for word in name.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def number_words(name):
+    """Return the numbers and roman numerals in a normalized title."""
+    return frozenset(word for word in name.split() if _NUMBER_WORD.match(word))
+
+
+def dice(grams, other):
+    """Return the Dice coefficient of two trigram sets."""
+    return 2 * len(grams & other) / (len(grams) + len(other))
+
+
+def _probe(postings, grams, threshold):
+    """
+    Return the items with at least one of the postings a match above threshold must share.
+
+    Dice >= t with an item of any size needs at least t*|q|/(2-t) shared trigrams, so
+    every match shares one of the |q| - that + 1 rarest query trigrams.
+    """
+    required = max(math.ceil(threshold * len(grams) / (2 - threshold)), 1)
+    rarest = sorted(grams, key=lambda gram: len(postings.get(gram, ())))
+    return {item for gram in rarest[:len(grams) - required + 1] for item in postings.get(gram, ())}
+
+
+class _Entry:
+    __slots__ = ("title", "name", "imdb_id", "year", "grams", "numbers")
+
+    def __init__(self, title, name, imdb_id, year):
+        self.title = title
+        self.name = name
+        self.imdb_id = imdb_id
+        self.year = year
+        self.grams = trigrams(name)
+        self.numbers = number_words(name)
+
+
+class TitleIndex:
+    """
+    A thread-safe trigram index of known movie titles.
+
+    Titles are compared by the Dice coefficient of their trigram sets. Scanning the
+    trigram postings of whole titles is slow when titles share common words, so
+    candidates come from words instead: each query word is matched, exactly or to
+    its SIMILAR_WORDS closest spellings, against the vocabulary of known titles,
+    and only the titles containing the rarest of those words are scored. A title
+    that matches only thanks to words missing from the query can therefore be missed.
+
+    A fuzzy match must have the same numbers and roman numerals as the query, so a
+    sequel is never taken for a typo of the original ("Toy Story 3", "Frozen II").
+    When a title belongs to several movies and no year tells them apart, the match
+    has no IMDb ID, and OMDb picks the movie as it would for the title alone.
+
+    At most `maxsize` titles are kept; beyond that the least recently added or
+    matched title is evicted, with the words only it used.
+
+    The seed is loaded on the first lookup, which other lookups wait for.
+
+    Attributes:
+        threshold (float): Minimum similarity of two titles, from 0 to 1, for a fuzzy match.
+        word_threshold (float): Minimum similarity of a query word to a known word.
+        maxsize (int): Maximum number of titles kept.
+        seed (callable, optional): Returns (title, imdb_id, year) tuples to load on first use.
+        evictions (int): Number of titles evicted to stay within maxsize.
+    """
+
+    def __init__(self, threshold=0.85, word_threshold=0.5, maxsize=10000, seed=None):
+        self.threshold = threshold
+        self.word_threshold = word_threshold
+        self.maxsize = maxsize
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._seed_lock = threading.Lock()
+        self._seeded = False
+        # Entries in eviction order, least recently added or matched first.
+        self._entries = OrderedDict()
+        self._by_name = {}
+        # Word -> entries and trigram -> words, as dicts so entries can be removed in O(1).
+        self._by_word = {}
+        self._word_grams = {}
+        self._word_postings = {}
+        self.exact_matches = 0
+        self.fuzzy_matches = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _ensure_seeded(self):
+        if self._seeded or self.seed is None:
+            return
+        with self._seed_lock:
+            if self._seeded:
+                return
+            # Published only once loaded, so that no lookup sees a partial index.
+            for title, imdb_id, year in self.seed():
+                self.add(title, imdb_id, year)
+            self._seeded = True
+
+    def add(self, title, imdb_id=None, year=None):
+        """
+        Add a title, or give a known title its IMDb ID and year.
+
+        Returns:
+            bool: True if the index changed.
+        """
+        name = normalize_title(title)
+        if not name:
+            return False
+        with self._lock:
+            for entry in self._by_name.get(name, ()):
+                if entry.imdb_id == imdb_id:
+                    self._entries.move_to_end(entry)
+                    if year and entry.year != year:
+                        entry.year = year
+                        return True
+                    return False
+                if entry.imdb_id is None and imdb_id:
+                    self._entries.move_to_end(entry)
+                    entry.title, entry.imdb_id, entry.year = title, imdb_id, year or entry.year
+                    return True
+            entry = _Entry(title, name, imdb_id, year)
+            self._entries[entry] = None
+            self._by_name.setdefault(name, []).append(entry)
+            for word in set(name.split()):
+                if word not in self._by_word:
+                    self._by_word[word] = {}
+                    self._word_grams[word] = trigrams(word)
+                    for gram in self._word_grams[word]:
+                        self._word_postings.setdefault(gram, {})[word] = None
+                self._by_word[word][entry] = None
+            while len(self._entries) > self.maxsize:
+                self._evict(next(iter(self._entries)))
+            return True
+
+    def _evict(self, entry):
+        """Remove an entry, and the words no other entry uses. Called with the lock held."""
+        del self._entries[entry]
+        same_name = self._by_name[entry.name]
+        same_name.remove(entry)
+        if not same_name:
+            del self._by_name[entry.name]
+        for word in set(entry.name.split()):
+            del self._by_word[word][entry]
+            if not self._by_word[word]:
+                del self._by_word[word]
+                for gram in self._word_grams.pop(word):
+                    del self._word_postings[gram][word]
+                    if not self._word_postings[gram]:
+                        del self._word_postings[gram]
+        self.evictions += 1
+
+    def add_response(self, data):
+        """Add the movies in an OMDb response: a single movie, or the results of an s= search."""
+        if data.get("Response") == "False":
+            return 0
+        return sum(self.add(movie["Title"], movie.get("imdbID"), movie.get("Year"))
+                   for movie in data.get("Search") or [data] if movie.get("Title"))
+
+    def lookup(self, title, year=None):
+        """
+        Find the known movie a title most likely refers to.
+
+        Arguments:
+            title (str): The title as typed by the user.
+            year (int, optional): Only consider movies released that year (series starting that year).
+
+        Returns:
+            dict: {"title", "imdb_id", "year", "score"} for the best match, with imdb_id None
+                when only the title is known or it is shared by several movies, or None if
+                no title is similar enough.
+        """
+        self._ensure_seeded()
+        name = normalize_title(title)
+        if not name:
+            return None
+        with self._lock:
+            return self._lookup(name, year)
+
+    def _lookup(self, name, year):
+        """lookup() for a normalized title. Called with the lock held."""
+        def eligible(entry):
+            return not year or (entry.year or "").startswith(str(year))
+
+        if any(eligible(entry) for entry in self._by_name.get(name, ())):
+            self.exact_matches += 1
+            return self._match(name, eligible, 1.0)
+
+        rarest = None
+        for word in set(name.split()):
+            if word in self._by_word:
+                similar = [word]
+            else:
+                word_grams = trigrams(word)
+                scored = ((dice(word_grams, self._word_grams[known]), known)
+                          for known in _probe(self._word_postings, word_grams, self.word_threshold))
+                similar = [known for score, known in heapq.nlargest(SIMILAR_WORDS, scored)
+                           if score >= self.word_threshold]
+            if similar:
+                count = sum(len(self._by_word[known]) for known in similar)
+                if rarest is None or count < rarest[0]:
+                    rarest = (count, similar)
+        candidates = {entry for known in rarest[1] for entry in self._by_word[known]} if rarest else ()
+
+        grams, numbers = trigrams(name), number_words(name)
+        best, best_rank = None, None
+        for entry in candidates:
+            if not eligible(entry) or entry.numbers != numbers:
+                continue
+            score = dice(grams, entry.grams)
+            # Among equally similar titles, prefer one whose IMDb ID is known.
+            rank = (score, entry.imdb_id is not None)
+            if score >= self.threshold and (best_rank is None or rank > best_rank):
+                best, best_rank = entry, rank
+        if best is None:
+            self.misses += 1
+            return None
+        self.fuzzy_matches += 1
+        return self._match(best.name, eligible, round(best_rank[0], 4))
+
+    def _match(self, name, eligible, score):
+        """Describe the movie with a normalized title, without an IMDb ID unless exactly one is known."""
+        entries = [entry for entry in self._by_name[name] if eligible(entry)]
+        for entry in entries:
+            self._entries.move_to_end(entry)
+        if len({entry.imdb_id for entry in entries if entry.imdb_id}) > 1:
+            return {"title": entries[0].title, "imdb_id": None, "year": None, "score": score}
+        entry = max(entries, key=lambda entry: entry.imdb_id is not None)
+        return {"title": entry.title, "imdb_id": entry.imdb_id, "year": entry.year, "score": score}
+
+    def stats(self):
+        """Return the index size and lookup counters as a dict."""
+        return {
+            "titles": len(self._entries),
+            "words": len(self._by_word),
+            "exact_matches": self.exact_matches,
+            "fuzzy_matches": self.fuzzy_matches,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def clear(self):
+        """Remove every title and reset the counters; the seed is loaded again on the next lookup."""
+        with self._lock:
+            self._entries = OrderedDict()
+            self._by_name = {}
+            self._by_word = {}
+            self._word_grams = {}
+            self._word_postings = {}
+            self._seeded = False
+            self.exact_matches = self.fuzzy_matches = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,57 @@
+# Description: Resolve usernames to user IDs once per request, backed by a short-lived shared cache.
+import os
+from flask import g, has_app_context
+from sqlalchemy import event, inspect
+
+from app.models.user import User
+from app.utils.cache import TTLCache
+from app.utils.db import read_replica
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+
+# username -> user id, shared by all requests in the process. Only existing users are cached.
+user_id_cache = TTLCache(maxsize=int(os.getenv("USER_CACHE_SIZE", "4096")))
+
+def resolve_user_id(username):
+    """
+    Get the ID of a user by username.
+
+    The result is memoized for the rest of the current request and cached across
+    requests for USER_CACHE_TTL seconds, so a request resolves each username with
+    at most one query, which goes to a read replica unless the user just wrote.
+
+    Arguments:
+        username (str): The username of user.
+
+    Returns:
+        int: The user's ID, or None if the user does not exist.
+    """
+    memo = g.setdefault("user_ids", {}) if has_app_context() else {}
+    if username in memo:
+        return memo[username]
+
+    hit, user_id = user_id_cache.get(username)
+    if not hit:
+        with read_replica(username):
+            user = User.query.filter_by(username=username).first()
+        user_id = user.id if user else None
+        if user_id is not None:
+            user_id_cache.set(username, user_id, USER_CACHE_TTL)
+
+    memo[username] = user_id
+    return user_id
+
+def invalidate_user(username):
+    """Forget a cached username, e.g. after the user was renamed or deleted."""
+    user_id_cache.delete(username)
+    if has_app_context():
+        g.setdefault("user_ids", {}).pop(username, None)
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, user):
+    invalidate_user(user.username)
+
+@event.listens_for(User, "after_update")
+def _invalidate_renamed_user(mapper, connection, user):
+    for username in inspect(user).attrs.username.history.deleted or []:
+        invalidate_user(username)
@@ -1,9 +1,58 @@
+from app.models.movie import Movie
 from app.models.user import User
 from app.models.watchlist import Watchlist
-from app.utils.omdb import fetch_movie_by_id
-from app.utils.db import db
+from app.utils.omdb import fetch_movie_by_id, fetch_movies_by_ids
+from app.utils.db import db, insert_ignoring_conflicts, read_replica
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
 from app.utils.logger import logger
+from app.utils.user_lookup import resolve_user_id
 
+WATCHING_STATES = ["To Watch", "Watched", "Watch Next"]
+
+# Output field of get_user_watchlist -> the column it is read from.
+WATCHLIST_FIELDS = {
+    'imdbID': Watchlist.imdb_id,
+    'Title': Movie.title,
+    'Year': Movie.year,
+    'Rated': Movie.rated,
+    'Runtime': Movie.runtime,
+    'Plot': Movie.plot,
+    'Genre': Movie.genre,
+    'imdbRating': Movie.imdb_rating,
+    'Type': Movie.type,
+    'Watching State': Watchlist.watching_state,
+}
+_FIELD_ALIASES = {key.replace(' ', '').lower(): key for key in WATCHLIST_FIELDS}
+
+# Maximum number of items accepted by one bulk call, and IDs per IN (...) clause.
+MAX_BULK_ITEMS = 1000
+IN_CLAUSE_CHUNK = 500
+
+
+def get_or_create_movie(imdb_id):
+    """
+    Gets a movie from the local catalog, fetching it from OMDb on first use.
+
+    Arguments:
+        imdb_id (str): The IMDb of the movie.
+
+    Returns:
+        Movie: The catalog entry, or None if OMDb does not know the movie.
+    """
+    movie = Movie.query.filter_by(imdb_id=imdb_id).first()
+    if movie:
+        return movie
+
+    data = fetch_movie_by_id(imdb_id)
+    if not data or data.get('Response') == 'False':
+        return None
+
+    # Another request may catalog the same movie meanwhile; the insert then does
+    # nothing and its row is read back.
+    values = Movie.values_from_omdb(data)
+    db.session.execute(insert_ignoring_conflicts(Movie), [values])
+    return Movie.query.filter_by(imdb_id=values['imdb_id']).first()
 
 def add_movie_to_watchlist(username, imdb_id):
     """
@@ -19,37 +68,34 @@ def add_movie_to_watchlist(username, imdb_id):
         ValueError: If user and movie already exists.
     """
 
-    user = User.query.filter_by(username=username).first()
-    if not user:
+    user_id = resolve_user_id(username)
+    if not user_id:
         raise ValueError("User not found")
     
-    movie = fetch_movie_by_id(imdb_id)
+    movie = get_or_create_movie(imdb_id)
     if not movie:
         raise ValueError("Movie not found")
+    title = movie.title
 
-    existing_entry = Watchlist.query.filter_by(user_id=user.id, imdb_id=imdb_id).first()
-    if existing_entry:
-        raise ValueError(f"Movie '{movie.get('Title')}' is already in {username}'s watchlist.")
-
-    
     watchlist = Watchlist(
-        user_id = user.id,
-        title = movie.get('Title'),
-        imdb_id=movie.get('imdbID'),
-        year=movie.get('Year'),
-        rated=movie.get('Rated'),
-        runtime=movie.get('Runtime'),
-        plot=movie.get('Plot'),
-        genre=movie.get('Genre'),
-        imdb_rating=movie.get('imdbRating'),
-        type=movie.get('Type'),
+        user_id = user_id,
+        imdb_id=movie.imdb_id,
         watching_state="To Watch" 
     )
+    watchlist.movie = movie
 
+    # The unique (user_id, imdb_id) index detects duplicates atomically; the lookup
+    # only runs on failure to tell a duplicate apart from other integrity errors.
     db.session.add(watchlist)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        if Watchlist.query.filter_by(user_id=user_id, imdb_id=imdb_id).first():
+            raise ValueError(f"Movie '{title}' is already in {username}'s watchlist.")
+        raise
 
-    logger.info(f"Added movie '{movie.get('Title')}' to {username}'s watchlist successfully.")
+    logger.info(f"Added movie '{title}' to {username}'s watchlist successfully.")
 
 def delete_movie_from_watchlist(username, imdb_id):
     """
@@ -63,11 +109,11 @@ def delete_movie_from_watchlist(username, imdb_id):
         ValueError: If user is not found.
         ValueError: If watchlist entry is not found.
     """
-    user = User.query.filter_by(username=username).first()
-    if not user:
+    user_id = resolve_user_id(username)
+    if not user_id:
         raise ValueError("User not found")
 
-    watchlist_entry = Watchlist.query.filter_by(user_id=user.id, imdb_id=imdb_id).first()
+    watchlist_entry = Watchlist.query.filter_by(user_id=user_id, imdb_id=imdb_id).first()
     if not watchlist_entry:
         raise ValueError("Watchlist entry not found")
 
@@ -91,11 +137,11 @@ def update_movie_from_watchlist(username, imdb_id, new_state):
         ValueError: If watchlist entry is not found.
         ValueError: If watch state is not 'To Watch' or 'Watched' or 'Watch Next'.
     """
-    user = User.query.filter_by(username=username).first()
-    if not user:
+    user_id = resolve_user_id(username)
+    if not user_id:
         raise ValueError("User not found")
 
-    watchlist_entry = Watchlist.query.filter_by(user_id=user.id, imdb_id=imdb_id).first()
+    watchlist_entry = Watchlist.query.filter_by(user_id=user_id, imdb_id=imdb_id).first()
     if not watchlist_entry:
         raise ValueError("Watchlist entry not found")
     
@@ -103,58 +149,324 @@ def update_movie_from_watchlist(username, imdb_id, new_state):
         raise ValueError("New state must be 'To Watch' or 'Watched' or 'Watch Next'")
     
     if new_state == "Watched":
-        delete_movie_from_watchlist(username, imdb_id)
+        # The entry is already loaded; delete it here so the update commits once.
+        db.session.delete(watchlist_entry)
+        logger.info(f"Deleted movie '{watchlist_entry.title}' from {username}'s watchlist successfully.")
  
     if new_state == "Watch Next":
-        movie = fetch_movie_by_id(imdb_id)
-        watchlist_entry.user_id = user.id
-        watchlist_entry.title = movie.get('Title')
-        watchlist_entry.imdb_id=movie.get('imdbID')
-        watchlist_entry.year=movie.get('Year')
-        watchlist_entry.rated=movie.get('Rated')
-        watchlist_entry.runtime=movie.get('Runtime')
-        watchlist_entry.plot=movie.get('Plot')
-        watchlist_entry.genre=movie.get('Genre')
-        watchlist_entry.imdb_rating=movie.get('imdbRating')
-        watchlist_entry.type=movie.get('Type')
         watchlist_entry.watching_state="Watch Next" 
     
     db.session.commit()
     logger.info(f"Updated '{watchlist_entry.title}' for {username}")
 
-def get_user_watchlist (username):
+def get_user_watchlist (username, fields=None):
     """
     Gets all movies for a user 
 
     Arguments:
         username (str): The username of user.
+        fields (list, optional): Output fields to include (see WATCHLIST_FIELDS); all when omitted.
 
     Raises:
         ValueError: If user is not found.
         ValueError: If user has no movies.
     """
-    user = User.query.filter_by(username=username).first()
-    if not user:
+    user_watchlist_data, _ = get_user_watchlist_page(username, fields=fields)
+    if not user_watchlist_data:
+        raise ValueError(f"No movies found in watchlist for {username}")
+    return user_watchlist_data
+
+def parse_watchlist_fields(fields):
+    """
+    Resolves requested field names to WATCHLIST_FIELDS keys.
+
+    Names are matched case-insensitively, ignoring spaces and underscores, so 'Title',
+    'title' and 'watching_state' are all accepted.
+
+    Arguments:
+        fields (list): The requested field names.
+
+    Raises:
+        ValueError: If a field name is unknown.
+    """
+    resolved = []
+    for name in fields:
+        key = _FIELD_ALIASES.get(name.replace(' ', '').replace('_', '').lower())
+        if key is None:
+            raise ValueError(f"Unknown field '{name}'. Valid fields: {', '.join(WATCHLIST_FIELDS)}")
+        if key not in resolved:
+            resolved.append(key)
+    return resolved
+
+def _watchlist_query(keys, user_id=None, watching_state=None, content_type=None):
+    """
+    Builds a query selecting the entry id and the columns behind the given output keys.
+
+    The movie catalog is joined only when one of its columns or the type filter is used.
+    """
+    columns = [WATCHLIST_FIELDS[key] for key in keys]
+    query = db.session.query(Watchlist.id, *columns)
+    if user_id is not None:
+        query = query.filter(Watchlist.user_id == user_id)
+    if content_type or any(column.class_ is Movie for column in columns):
+        query = query.join(Movie, Movie.imdb_id == Watchlist.imdb_id)
+    if watching_state:
+        query = query.filter(Watchlist.watching_state == watching_state)
+    if content_type:
+        query = query.filter(Movie.type == content_type)
+    return query
+
+def iter_watchlist_entries(username=None, fields=None, batch_size=500):
+    """
+    Streams watchlist entries in id order without loading them all into memory.
+
+    Rows are fetched from the database in batches of batch_size through a streaming cursor.
+
+    Arguments:
+        username (str, optional): Only stream this user's entries; every user's when omitted,
+            in which case each entry also carries its 'username'.
+        fields (list, optional): Output fields to include (see WATCHLIST_FIELDS); all when omitted.
+        batch_size (int): Rows fetched per round trip.
+
+    Yields:
+        dict: One watchlist entry.
+
+    Raises:
+        ValueError: If user is not found.
+    """
+    keys = parse_watchlist_fields(fields) if fields else list(WATCHLIST_FIELDS)
+    if username is not None:
+        user_id = resolve_user_id(username)
+        if not user_id:
+            raise ValueError("User not found")
+        query = _watchlist_query(keys, user_id=user_id)
+    else:
+        query = _watchlist_query(keys).add_columns(User.username).join(User, User.id == Watchlist.user_id)
+        keys = keys + ['username']
+
+    query = query.order_by(Watchlist.id).execution_options(stream_results=True).yield_per(batch_size)
+    for row in query:
+        yield dict(zip(keys, row[1:]))
+
+def get_user_watchlist_page(username, fields=None, watching_state=None, content_type=None, after=None, limit=None):
+    """
+    Gets one page of a user's watchlist, ordered by entry id.
+
+    Only the requested columns are loaded, and the movie catalog is joined in only
+    when one of its columns is needed.
+
+    The page is read from a read replica unless the user wrote within the sticky window.
+
+    Arguments:
+        username (str): The username of user.
+        fields (list, optional): Output fields to include (see WATCHLIST_FIELDS); all when omitted.
+        watching_state (str, optional): Only include entries in this watching state.
+        content_type (str, optional): Only include entries of this type (e.g., "movie", "series").
+        after (int, optional): Cursor; only include entries with a larger id.
+        limit (int, optional): Maximum number of entries; all when omitted.
+
+    Returns:
+        tuple: The list of entries, empty if none match, and the cursor for the next page (None on the last page).
+
+    Raises:
+        ValueError: If user is not found.
+    """
+    with read_replica(username):
+        user_id = resolve_user_id(username)
+        if not user_id:
+            raise ValueError("User not found")
+
+        keys = parse_watchlist_fields(fields) if fields else list(WATCHLIST_FIELDS)
+        query = _watchlist_query(keys, user_id=user_id, watching_state=watching_state, content_type=content_type)
+        if after is not None:
+            query = query.filter(Watchlist.id > after)
+        query = query.order_by(Watchlist.id)
+        if limit is not None:
+            query = query.limit(limit + 1)
+
+        rows = query.all()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][0]
+
+    user_watchlist_data = [dict(zip(keys, row[1:])) for row in rows]
+    return user_watchlist_data, next_cursor
+
+def _chunks(items, size=IN_CLAUSE_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _existing_imdb_ids(user_id, imdb_ids):
+    """Return which of the IMDb IDs are already in the user's watchlist, one IN (...) query per chunk."""
+    existing = set()
+    for chunk in _chunks(imdb_ids):
+        rows = db.session.query(Watchlist.imdb_id).filter(
+            Watchlist.user_id == user_id, Watchlist.imdb_id.in_(chunk))
+        existing.update(imdb_id for (imdb_id,) in rows)
+    return existing
+
+def _catalogued_imdb_ids(imdb_ids):
+    """Return the subset of imdb_ids already in the movie catalog."""
+    catalogued = set()
+    for chunk in _chunks(imdb_ids):
+        catalogued.update(imdb_id for (imdb_id,) in
+                          db.session.query(Movie.imdb_id).filter(Movie.imdb_id.in_(chunk)))
+    return catalogued
+
+def _validate_bulk_items(items):
+    if not items:
+        raise ValueError("No items given")
+    if len(items) > MAX_BULK_ITEMS:
+        raise ValueError(f"At most {MAX_BULK_ITEMS} items can be processed at once")
+
+def _validate_imdb_ids(imdb_ids):
+    _validate_bulk_items(imdb_ids)
+    if not all(isinstance(imdb_id, str) and imdb_id for imdb_id in imdb_ids):
+        raise ValueError("Every imdb_id must be a non-empty string")
+
+def bulk_add_movies_to_watchlist(username, imdb_ids):
+    """
+    Adds many movies to user's watchlist with a single commit.
+
+    Movies missing from the catalog are fetched from OMDb concurrently, duplicates are
+    found with one IN (...) query and new rows are bulk inserted. Rows that another
+    request inserted in the meantime are skipped, not treated as errors.
+
+    Arguments:
+        username (str): The username of user.
+        imdb_ids (list): The IMDb IDs of the movies.
+
+    Returns:
+        list: One {'imdb_id', 'status'} dict per requested ID, where status is 'added',
+            'already in watchlist', 'not found' or 'failed'.
+
+    Raises:
+        ValueError: If user is not found.
+        ValueError: If no IDs or too many IDs are given, or an ID is not a string.
+    """
+    _validate_imdb_ids(imdb_ids)
+    user_id = resolve_user_id(username)
+    if not user_id:
         raise ValueError("User not found")
 
-    user_watchlist = Watchlist.query.filter_by(user_id=user.id).all()
-    if len(user_watchlist) == 0:
-        raise ValueError(f"No movies found in watchlist for {username}")
+    unique_ids = list(dict.fromkeys(imdb_ids))
+    existing = _existing_imdb_ids(user_id, unique_ids)
+    statuses = {imdb_id: 'already in watchlist' for imdb_id in existing}
+    candidates = [imdb_id for imdb_id in unique_ids if imdb_id not in existing]
+
+    catalogued = _catalogued_imdb_ids(candidates)
+
+    to_fetch = [imdb_id for imdb_id in candidates if imdb_id not in catalogued]
+    new_movies = []
+    for imdb_id, data in zip(to_fetch, fetch_movies_by_ids(to_fetch)):
+        if isinstance(data, Exception):
+            logger.error(f"Failed to fetch movie {imdb_id}: {data}")
+            statuses[imdb_id] = 'failed'
+        elif not data or data.get('Response') == 'False' or data.get('imdbID') != imdb_id:
+            statuses[imdb_id] = 'not found'
+        else:
+            new_movies.append(Movie.values_from_omdb(data))
+            catalogued.add(imdb_id)
+
+    new_entries = [{'user_id': user_id, 'imdb_id': imdb_id, 'watching_state': "To Watch"}
+                   for imdb_id in candidates if imdb_id in catalogued]
+    if new_movies:
+        db.session.execute(insert_ignoring_conflicts(Movie), new_movies)
+    added = set()
+    if new_entries:
+        inserted = db.session.execute(insert_ignoring_conflicts(Watchlist).returning(Watchlist.imdb_id), new_entries)
+        added.update(inserted.scalars())
+    db.session.commit()
+    for entry in new_entries:
+        statuses[entry['imdb_id']] = 'added' if entry['imdb_id'] in added else 'already in watchlist'
+
+    logger.info(f"Bulk added {len(added)} of {len(unique_ids)} movies to {username}'s watchlist.")
+    return [{'imdb_id': imdb_id, 'status': statuses[imdb_id]} for imdb_id in unique_ids]
+
+def bulk_update_movies_from_watchlist(username, updates):
+    """
+    Updates the watching state of many movies in user's watchlist with a single commit.
+    Movies updated to watched are deleted, as with update_movie_from_watchlist.
+
+    Arguments:
+        username (str): The username of user.
+        updates (list): Dicts with 'imdb_id' and 'watching_state'.
+
+    Returns:
+        list: One {'imdb_id', 'status'} dict per update, where status is 'updated',
+            'deleted', 'not found' or 'invalid state'.
+
+    Raises:
+        ValueError: If user is not found.
+        ValueError: If no updates or too many updates are given, an update has no imdb_id string,
+            or two updates have the same imdb_id.
+    """
+    _validate_bulk_items(updates)
+    if not all(isinstance(item, dict) and isinstance(item.get('imdb_id'), str) and item['imdb_id']
+               for item in updates):
+        raise ValueError("Every update must be an object with an imdb_id string")
+    # Results are matched to updates by position, so one movie may only be updated once.
+    if len({item['imdb_id'] for item in updates}) < len(updates):
+        raise ValueError("Each imdb_id may only be updated once per request")
+    user_id = resolve_user_id(username)
+    if not user_id:
+        raise ValueError("User not found")
+
+    new_states = {item['imdb_id']: item.get('watching_state') for item in updates}
+    existing = _existing_imdb_ids(user_id, list(new_states))
+
+    statuses = {}
+    by_state = {}
+    for imdb_id, state in new_states.items():
+        if imdb_id not in existing:
+            statuses[imdb_id] = 'not found'
+        elif state not in WATCHING_STATES:
+            statuses[imdb_id] = 'invalid state'
+        else:
+            by_state.setdefault(state, []).append(imdb_id)
+            statuses[imdb_id] = 'deleted' if state == "Watched" else 'updated'
+
+    for state, imdb_ids in by_state.items():
+        for chunk in _chunks(imdb_ids):
+            condition = (Watchlist.user_id == user_id) & Watchlist.imdb_id.in_(chunk)
+            if state == "Watched":
+                db.session.execute(delete(Watchlist).where(condition))
+            else:
+                db.session.execute(update(Watchlist).where(condition).values(watching_state=state))
+    db.session.commit()
+
+    logger.info(f"Bulk updated {sum(len(ids) for ids in by_state.values())} movies in {username}'s watchlist.")
+    return [{'imdb_id': imdb_id, 'status': status} for imdb_id, status in statuses.items()]
+
+def bulk_delete_movies_from_watchlist(username, imdb_ids):
+    """
+    Deletes many movies from user's watchlist with a single commit.
+
+    Arguments:
+        username (str): The username of user.
+        imdb_ids (list): The IMDb IDs of the movies.
+
+    Returns:
+        list: One {'imdb_id', 'status'} dict per requested ID, where status is 'deleted' or 'not found'.
+
+    Raises:
+        ValueError: If user is not found.
+        ValueError: If no IDs or too many IDs are given, or an ID is not a string.
+    """
+    _validate_imdb_ids(imdb_ids)
+    user_id = resolve_user_id(username)
+    if not user_id:
+        raise ValueError("User not found")
+
+    unique_ids = list(dict.fromkeys(imdb_ids))
+    existing = _existing_imdb_ids(user_id, unique_ids)
+    for chunk in _chunks([imdb_id for imdb_id in unique_ids if imdb_id in existing]):
+        db.session.execute(delete(Watchlist).where(
+            (Watchlist.user_id == user_id) & Watchlist.imdb_id.in_(chunk)))
+    db.session.commit()
 
-    user_watchlist_data = []
-    for movie in user_watchlist:
-        movie_data = {
-            'imdbID': movie.imdb_id,
-            'Title': movie.title,
-            'Year': movie.year,
-            'Rated': movie.rated,
-            'Runtime': movie.runtime,
-            'Plot': movie.plot,
-            'Genre': movie.genre,
-            'imdbRating': movie.imdb_rating,
-            'Type': movie.type,
-            'Watching State': movie.watching_state
-        }
-        user_watchlist_data.append(movie_data)
-
-    return user_watchlist_data
\ No newline at end of file
+    logger.info(f"Bulk deleted {len(existing)} movies from {username}'s watchlist.")
+    return [{'imdb_id': imdb_id, 'status': 'deleted' if imdb_id in existing else 'not found'}
+            for imdb_id in unique_ids]
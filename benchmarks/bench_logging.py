@@ -0,0 +1,81 @@
+# Description: Compare the cost of request logging before and after structured, background logging.
+#
+# Usage: python -m benchmarks.bench_logging [--records N]
+#
+# Each configuration logs N records from within a /search/search-by-keyword request
+# to a file. "payload" is the route as it was: the whole 10-result page logged in
+# plain text from the request thread. The other rows log the route's one-line
+# summary, in text or JSON, synchronously or through the background writer, and
+# sampled at 10%. "caller" is what the request thread pays per record; "total" also
+# waits for the writer to finish, so work moved to the background thread is not
+# hidden. Records beyond LOG_QUEUE_SIZE that the writer has not caught up with are
+# dropped and reported. Configurations take turns over three rounds and keep their
+# best round.
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+
+from app import create_app
+from app.utils.logger import _SAMPLED_KEY, logger, stop_logging
+from app.utils.metrics import metrics
+from benchmarks.stub_omdb import MOVIE
+
+RESULTS = [dict(MOVIE, Plot=" ".join([MOVIE["Plot"]] * 4), imdbID=f"tt{n:07d}") for n in range(10)]
+PATH = "/search/search-by-keyword?keyword=dream"
+
+CONFIGURATIONS = [
+    ("payload, text, sync", True, {"LOG_FORMAT": "text", "LOG_ASYNC": False, "LOG_MAX_LENGTH": 0}),
+    ("summary, text, sync", False, {"LOG_FORMAT": "text", "LOG_ASYNC": False}),
+    ("summary, json, sync", False, {"LOG_FORMAT": "json", "LOG_ASYNC": False}),
+    ("summary, json, background", False, {"LOG_FORMAT": "json", "LOG_ASYNC": True}),
+    ("summary, json, bg, 10%", False, {"LOG_FORMAT": "json", "LOG_ASYNC": True,
+                                       "LOG_SAMPLE_RATES": "/search/search-by-keyword=0.1"}),
+]
+
+
+def log_records(logger, environ, log_payload, records):
+    """Log as the keyword route does, once per simulated request."""
+    for _ in range(records):
+        # Each record stands for a new request, so it gets its own sampling decision.
+        environ.pop(_SAMPLED_KEY, None)
+        if log_payload:
+            logger.info(RESULTS)
+        else:
+            logger.info("Searched by keyword", extra={"keyword": "dream", "page": 1, "results": len(RESULTS)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Payload logging vs structured background logging")
+    parser.add_argument("--records", type=int, default=5000)
+    args = parser.parse_args()
+
+    best = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(3):
+            for name, log_payload, config in CONFIGURATIONS:
+                log_path = os.path.join(tmp, "app.log")
+                with open(log_path, "w") as log_file, contextlib.redirect_stderr(log_file):
+                    app = create_app(dict(config, SQLALCHEMY_DATABASE_URI="sqlite:///:memory:"))
+                    metrics.clear()
+                    size_before = log_file.tell()
+                    with app.test_request_context(PATH) as context:
+                        start = time.perf_counter()
+                        log_records(logger, context.request.environ, log_payload, args.records)
+                        caller = time.perf_counter() - start
+                    stop_logging()
+                    total = time.perf_counter() - start
+                size = (os.path.getsize(log_path) - size_before) / args.records
+                dropped = metrics.value("log_records_dropped_total")
+                result = (caller / args.records * 1e6, total / args.records * 1e6, size, dropped)
+                if name not in best or result[0] < best[name][0]:
+                    best[name] = result
+
+    for name, (caller, total, size, dropped) in best.items():
+        print(f"{name:<27} caller={caller:.1f}us total={total:.1f}us per record, "
+              f"log={size:.0f}B per record, dropped={dropped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Description: Measure what the request metrics cost, per recorded value and per request.
+#
+# Usage: python -m benchmarks.bench_metrics [--records N] [--threads T] [--requests N]
+#
+# Part one records N histogram values from 1 and from T threads, with the per-thread
+# registry and with a registry that takes one lock per value. Part two serves a
+# trivial route and a watchlist page through the test client with metrics on and off.
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from app import create_app
+from app.models.movie import Movie
+from app.models.user import User
+from app.models.watchlist import Watchlist
+from app.utils.db import db
+from app.utils.metrics import DEFAULT_BUCKETS, HISTOGRAM, Metrics
+
+ROUTES = [f"/route/{n}" for n in range(20)]
+
+
+class LockedMetrics:
+    """The straightforward alternative: one shared dict guarded by one lock."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, name, labels, seconds):
+        with self._lock:
+            series = self._histograms.setdefault((name, labels), [0] * (len(self.buckets) + 1) + [0.0])
+            series[bisect_left(self.buckets, seconds)] += 1
+            series[-1] += seconds
+
+
+def bench_records(registry, records, threads):
+    """Return nanoseconds per recorded value, with `records` values split over `threads` threads."""
+    per_thread = records // threads
+    labels = [("GET", ROUTES[n % len(ROUTES)]) for n in range(per_thread)]
+    start_line = threading.Barrier(threads + 1)
+
+    def record():
+        start_line.wait()
+        for n, label in enumerate(labels):
+            registry.observe("http_request_duration_seconds", label, (n % 1000) / 10000)
+
+    workers = [threading.Thread(target=record) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    start_line.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (per_thread * threads) * 1e9
+
+
+def bench_requests(app, path, total):
+    """Return microseconds per request through the test client."""
+    client = app.test_client()
+    for _ in range(100):
+        client.get(path)
+    start = time.perf_counter()
+    for _ in range(total):
+        client.get(path)
+    return (time.perf_counter() - start) / total * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-thread metrics vs a locked registry, and request overhead")
+    parser.add_argument("--records", type=int, default=800_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print(f"recording {args.records} histogram values")
+    for threads in (1, args.threads):
+        per_thread = Metrics()
+        per_thread.define("http_request_duration_seconds", HISTOGRAM, "", ("method", "route"))
+        for name, registry in (("per-thread", per_thread), ("single lock", LockedMetrics())):
+            print(f"  {name:<12} {threads} thread(s): {bench_records(registry, args.records, threads):.0f}ns per value")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'movie_app.db')}"
+        apps = {enabled: create_app({"SQLALCHEMY_DATABASE_URI": url, "METRICS_ENABLED": enabled})
+                for enabled in (False, True)}
+        with apps[False].app_context():
+            db.create_all()
+            db.session.add_all([User(id=1, username="alice", salt="s", hashed_password="h"),
+                                Movie(imdb_id="tt0319343", title="Elf")])
+            db.session.flush()
+            db.session.add(Watchlist(user_id=1, imdb_id="tt0319343", watching_state="To Watch"))
+            db.session.commit()
+
+        print(f"{args.requests} requests through the test client")
+        for path in ("/", "/watchlist/get-watchlist?username=alice"):
+            # Alternate and keep the best of three rounds, so that drift does not favour either side.
+            off = on = float("inf")
+            for _ in range(3):
+                off = min(off, bench_requests(apps[False], path, args.requests))
+                on = min(on, bench_requests(apps[True], path, args.requests))
+            print(f"  {path:<40} off={off:.1f}us on={on:.1f}us overhead={on - off:.1f}us ({(on - off) / off:.1%})")
+        for app in apps.values():
+            with app.app_context():
+                db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
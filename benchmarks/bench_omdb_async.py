@@ -0,0 +1,58 @@
+# Description: Compare batch OMDb lookups through the sync and async clients against a local stub server.
+#
+# Usage: python -m benchmarks.bench_omdb_async [--requests N] [--delay SECONDS]
+#
+# Fans N distinct lookups out from a single caller, as a bulk import does: the sync
+# client through its bounded thread pool, the async client on its event loop.
+import argparse
+import logging
+import time
+
+from app.utils.omdb import AsyncOMDbClient, OMDbClient
+from benchmarks.stub_omdb import start_stub_server
+
+
+def report(name, elapsed, requests_sent):
+    print(f"{name:<14} total={elapsed * 1000:.0f}ms throughput={requests_sent / elapsed:.0f}/s")
+
+
+def bench_fanout(base_url, total):
+    """Fetch `total` distinct IDs in one batch with each client, caches disabled."""
+    sync_client = OMDbClient(api_key="bench", base_url=base_url)
+    async_client = AsyncOMDbClient.from_env(OMDbClient(api_key="bench", base_url=base_url))
+    queries = [{"i": f"tt{n:07d}"} for n in range(total)]
+    try:
+        start = time.perf_counter()
+        results = sync_client.get_many(queries, timeout=60)
+        elapsed = time.perf_counter() - start
+        assert not [r for r in results if isinstance(r, Exception)]
+        print(f"fan-out of {total} lookups from one caller "
+              f"(sync pool: {sync_client.fanout_workers} threads, async pool: {async_client.pool_size} connections)")
+        report("sync", elapsed, total)
+
+        start = time.perf_counter()
+        results = async_client.run_many(queries, timeout=60)
+        elapsed = time.perf_counter() - start
+        assert not [r for r in results if isinstance(r, Exception)]
+        report("async", elapsed, total)
+    finally:
+        sync_client.close()
+        async_client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async OMDb batch lookups")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--delay", type=float, default=0.05, help="stub server latency in seconds")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    server, base_url = start_stub_server(delay=args.delay)
+    try:
+        bench_fanout(base_url, args.requests)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
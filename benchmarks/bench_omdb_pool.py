@@ -0,0 +1,57 @@
+# Description: Compare pooled and unpooled OMDb request latency against a local stub server.
+#
+# Usage: python -m benchmarks.bench_omdb_pool [--requests N]
+import argparse
+import statistics
+import time
+
+import requests
+
+from app.utils.omdb import OMDbClient
+from benchmarks.stub_omdb import start_stub_server
+
+
+def measure(call, count):
+    """Run call() count times and return per-call latencies in milliseconds."""
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{name:<10} p50={p50:.3f}ms p99={p99:.3f}ms mean={statistics.mean(latencies):.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pooled vs unpooled OMDb client benchmark")
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server()
+    try:
+        def unpooled():
+            response = requests.get(base_url, params={"apikey": "bench", "i": "tt1375666"}, timeout=10)
+            response.raise_for_status()
+            return response.json()
+
+        pooled_client = OMDbClient(api_key="bench", base_url=base_url)
+
+        def pooled():
+            return pooled_client.get(i="tt1375666")
+
+        unpooled()
+        pooled()
+        report("unpooled", measure(unpooled, args.requests))
+        report("pooled", measure(pooled, args.requests))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Description: Compare forwarding cached OMDb bodies as raw bytes with decoding and re-encoding them.
+#
+# Usage: python -m benchmarks.bench_passthrough [--requests N]
+#
+# Both views answer from the warm response cache. /search/search-by-id forwards the
+# cached bytes; the "jsonify" view below decodes and re-encodes the body as the search
+# routes used to. The "shared store" rows read the body from the SQLite cache store
+# on every call, as a worker does before the body is in its memory cache.
+import argparse
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from flask import jsonify
+
+from app.utils.cache_store import SQLiteCacheStore
+from benchmarks.stub_omdb import MOVIE
+
+# A plot=full response with ratings, about the size OMDb sends.
+FULL_MOVIE = dict(
+    MOVIE,
+    Plot=" ".join([MOVIE["Plot"]] * 8),
+    Actors="Leonardo DiCaprio, Joseph Gordon-Levitt, Elliot Page, Tom Hardy",
+    Ratings=[{"Source": "Internet Movie Database", "Value": "8.8/10"},
+             {"Source": "Rotten Tomatoes", "Value": "87%"},
+             {"Source": "Metacritic", "Value": "74/100"}],
+)
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{name:<28} p50={p50:.1f}us p99={p99:.1f}us")
+
+
+def measure(app, view, path, total):
+    """Time the view and the serialization of its response, without the WSGI round trip."""
+    latencies = []
+    with app.test_request_context(path):
+        for _ in range(total):
+            start = time.perf_counter()
+            response = app.make_response(view())
+            response.get_data()
+            latencies.append((time.perf_counter() - start) * 1e6)
+            assert response.status_code == 200
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raw pass-through vs decode/re-encode")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    import app.utils.omdb as omdb
+    from app import create_app
+
+    app = create_app()
+
+    def jsonify_by_id():
+        return jsonify(omdb.fetch_movie_by_id("tt1375666", "full")), 200
+
+    raw_by_id = app.view_functions["search.search_by_id"]
+    path = "/search/search-by-id?id=tt1375666&plot=full"
+    body = json.dumps(FULL_MOVIE).encode()
+    print(f"payload: {len(body)} bytes")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteCacheStore(os.path.join(tmp, "omdb_cache.db"))
+        store.set("i=tt1375666&plot=full", body, 3600)
+        omdb.client.store = store
+        try:
+            for name, view in (("raw, memory cache", raw_by_id), ("jsonify, memory cache", jsonify_by_id)):
+                omdb.client.cache.clear()
+                report(name, measure(app, view, path, args.requests))
+
+            # Without the in-memory cache every request reads and wraps the stored body again.
+            omdb.client.cache.maxsize = 0
+            omdb.client.cache.clear()
+            report("raw, shared store", measure(app, raw_by_id, path, args.requests))
+            report("jsonify, shared store", measure(app, jsonify_by_id, path, args.requests))
+        finally:
+            omdb.client.store = None
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Description: Measure PBKDF2 password hashes per second, per core, through the hashing executor.
+#
+# Usage: python -m benchmarks.bench_password_hashing [--hashes N] [--iterations N] [--algorithm NAME]
+import argparse
+import os
+import threading
+import time
+
+from app.utils.hashing import HashingExecutor, _pbkdf2
+
+
+def run(executor, callers, hashes, algorithm, iterations):
+    """Hash `hashes` passwords from `callers` threads and return hashes per second."""
+    salt = os.urandom(16)
+    per_caller = hashes // callers
+
+    def caller():
+        for _ in range(per_caller):
+            executor.run(_pbkdf2, algorithm, "benchmark-password", salt, iterations)
+
+    threads = [threading.Thread(target=caller) for _ in range(callers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return per_caller * callers / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Password hashing throughput benchmark")
+    parser.add_argument("--hashes", type=int, default=64)
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--algorithm", default="sha256")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    print(f"pbkdf2_{args.algorithm} {args.iterations} iterations, {cores} cores")
+    for workers in sorted({1, cores}):
+        executor = HashingExecutor(workers=workers, queue_size=args.hashes, timeout=600)
+        rate = run(executor, callers=workers * 4, hashes=args.hashes, algorithm=args.algorithm,
+                   iterations=args.iterations)
+        print(f"workers={workers:<3} {rate:8.1f} hashes/s  {rate / workers:8.1f} hashes/s per core")
+
+
+if __name__ == "__main__":
+    main()
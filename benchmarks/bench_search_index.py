@@ -0,0 +1,101 @@
+# Description: Measure local full-text search latency with a large index, compared to an OMDb round trip.
+#
+# Usage: python -m benchmarks.bench_search_index [--movies N] [--queries N] [--delay SECONDS]
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from itertools import accumulate
+
+from app.utils.omdb import OMDbClient
+from app.utils.search_index import MovieSearchIndex
+from benchmarks.stub_omdb import start_stub_server
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ra", "tu", "vel", "dor", "sha", "quin", "bri", "tem", "gal", "or", "us", "ex"]
+GENRES = ["Action", "Drama", "Comedy", "Sci-Fi", "Horror", "Romance", "Crime", "Animation"]
+
+
+def vocabulary(size, rng):
+    """Made-up words, so that the index holds a realistic number of distinct terms."""
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def fake_movies(count, words, rng):
+    # Zipf-distributed like natural text: a few words are in most plots, most words are rare.
+    cum_weights = list(accumulate(1 / rank for rank in range(1, len(words) + 1)))
+
+    def pick(k):
+        return rng.choices(words, cum_weights=cum_weights, k=k)
+
+    for n in range(count):
+        yield {
+            "imdbID": f"tt{n:07d}",
+            "Title": " ".join(word.title() for word in pick(rng.randint(1, 4))),
+            "Year": str(rng.randint(1950, 2024)),
+            "Type": "movie",
+            "Poster": "N/A",
+            "Plot": " ".join(pick(25)),
+            "Genre": ", ".join(rng.sample(GENRES, 2)),
+        }
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{name:<24} p50={p50:.3f}ms p99={p99:.3f}ms mean={statistics.mean(latencies):.3f}ms")
+
+
+def measure(call, keywords):
+    latencies = []
+    for keyword in keywords:
+        start = time.perf_counter()
+        call(keyword)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local FTS5 search vs OMDb search latency")
+    parser.add_argument("--movies", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--delay", type=float, default=0.05, help="stub OMDb latency in seconds")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = MovieSearchIndex(os.path.join(tmp, "movie_search.db"))
+        start = time.perf_counter()
+        movies = list(fake_movies(args.movies, vocabulary(20_000, rng), rng))
+        for offset in range(0, len(movies), 5000):
+            index.add_many(movies[offset:offset + 5000])
+        print(f"indexed {args.movies} movies in {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(index.path) / 1e6:.0f} MB)")
+
+        # Searches for words of titles that exist, like users looking up known movies.
+        titles = [rng.choice(movies)["Title"].split() for _ in range(args.queries)]
+        one_word = [rng.choice(title) for title in titles]
+        two_words = [" ".join(title[:2]) for title in titles]
+        prefixes = [rng.choice(title)[:4] + "*" for title in titles]
+        report("local, one word", measure(index.search, one_word))
+        report("local, two words", measure(index.search, two_words))
+        report("local, 4-letter prefix", measure(index.search, prefixes))
+        report("local, page 5", measure(lambda keyword: index.search(keyword, page=5), two_words))
+
+        server, base_url = start_stub_server(delay=args.delay)
+        try:
+            omdb_client = OMDbClient(api_key="bench", base_url=base_url)
+            report("OMDb stub round trip", measure(lambda keyword: omdb_client.get(s=keyword),
+                                                   two_words[:100]))
+        finally:
+            server.shutdown()
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# Description: Load-test the watchlist routes on the development server and on gunicorn, with and without the SQLite tuning.
+#
+# Usage: python -m benchmarks.bench_serving [--requests N] [--clients C] [--workers W] [--threads T]
+#
+# Each setup serves the app in a subprocess against its own fresh SQLite file and a
+# local stub OMDb server. C clients send N requests, half adding a new movie to a
+# user's watchlist (a catalog insert and a watchlist insert) and half reading a
+# page of a watchlist. Failed requests are mostly "database is locked" errors.
+import argparse
+import os
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from app import create_app
+from app.models.movie import Movie
+from app.models.user import User
+from app.models.watchlist import Watchlist
+from app.utils.db import db
+from benchmarks.stub_omdb import start_stub_server
+
+USERS = 200
+ENTRIES_PER_USER = 20
+
+# What the app ran with before the tuning: SQLite's defaults and SQLAlchemy's pool size.
+UNTUNED = {
+    "SQLITE_JOURNAL_MODE": "DELETE",
+    "SQLITE_SYNCHRONOUS": "FULL",
+    "SQLITE_BUSY_TIMEOUT": "",
+    "SQLITE_MMAP_SIZE": "",
+    "DB_POOL_SIZE": "5",
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def create_database(path, journal_mode):
+    """Create the schema and USERS users with ENTRIES_PER_USER watchlist entries each in a new SQLite file."""
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+    with app.app_context():
+        db.create_all()
+        users = [User(username=f"user{n}", salt="s", hashed_password="h") for n in range(USERS)]
+        movies = [Movie(imdb_id=f"tt9{n:06d}", title=f"Movie {n}", type="movie") for n in range(ENTRIES_PER_USER)]
+        db.session.add_all(users + movies)
+        db.session.flush()
+        db.session.add_all(Watchlist(user_id=user.id, imdb_id=movie.imdb_id, watching_state="To Watch")
+                           for user in users for movie in movies)
+        db.session.commit()
+        db.engine.dispose()
+    # The journal mode is stored in the file, so undo the WAL switch for untuned runs.
+    with sqlite3.connect(path) as conn:
+        conn.execute(f"PRAGMA journal_mode={journal_mode}")
+
+
+def start_server(command, env, port):
+    """Start a server subprocess and wait until it answers."""
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=5)
+            return process
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{command[0]} did not start")
+
+
+def run_load(base_url, total, clients):
+    """Send `total` requests from `clients` threads; return (elapsed, latencies, status counts)."""
+    local = threading.local()
+
+    def send(n):
+        session = getattr(local, "session", None) or setattr(local, "session", requests.Session()) or local.session
+        username = f"user{n % USERS}"
+        start = time.perf_counter()
+        try:
+            if n % 2:
+                response = session.get(f"{base_url}/watchlist/get-watchlist",
+                                       params={"username": username, "limit": 20}, timeout=30)
+            else:
+                response = session.post(f"{base_url}/watchlist/add-to-watchlist",
+                                        json={"username": username, "imdb_id": f"tt{n:07d}"}, timeout=30)
+            status = response.status_code
+        except requests.RequestException:
+            status = "error"
+        return (time.perf_counter() - start) * 1000, status
+
+    with ThreadPoolExecutor(clients) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(send, range(total)))
+        elapsed = time.perf_counter() - start
+    return elapsed, [latency for latency, _ in results], Counter(status for _, status in results)
+
+
+def report(name, elapsed, latencies, statuses):
+    latencies = sorted(latencies)
+    failed = sum(count for status, count in statuses.items() if status == "error" or status >= 500)
+    print(f"{name:<34} throughput={len(latencies) / elapsed:.0f}/s p50={statistics.median(latencies):.1f}ms "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1]:.1f}ms failed={failed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Development server vs gunicorn, untuned vs tuned SQLite")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.0, help="stub OMDb latency in seconds")
+    args = parser.parse_args()
+
+    stub, omdb_url = start_stub_server(delay=args.delay)
+    gunicorn = [sys.executable, "-m", "gunicorn", "wsgi:app", "--log-level", "warning"]
+    flask = [sys.executable, "-m", "flask", "--app", "wsgi", "run", "--no-reload"]
+    setups = [
+        ("development server, untuned SQLite", flask, UNTUNED),
+        ("gunicorn, untuned SQLite", gunicorn, UNTUNED),
+        ("gunicorn, tuned SQLite", gunicorn, {}),
+    ]
+    print(f"{args.requests} requests from {args.clients} clients; "
+          f"gunicorn with {args.workers} workers x {args.threads} threads")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for number, (name, command, settings) in enumerate(setups):
+                path = os.path.join(tmp, f"movie_app_{number}.db")
+                create_database(path, settings.get("SQLITE_JOURNAL_MODE", "WAL"))
+                port = free_port()
+                env = dict(os.environ, **settings, DATABASE_URL=f"sqlite:///{path}", OMDB_BASE_URL=omdb_url,
+                           OMDB_API_KEY="bench", BIND=f"127.0.0.1:{port}", FLASK_RUN_PORT=str(port),
+                           WEB_CONCURRENCY=str(args.workers), WEB_THREADS=str(args.threads))
+                process = start_server(command, env, port)
+                try:
+                    report(name, *run_load(f"http://127.0.0.1:{port}", args.requests, args.clients))
+                finally:
+                    process.terminate()
+                    try:
+                        process.wait(timeout=5)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+    finally:
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Description: Measure fuzzy title resolution latency against a large trigram index.
+#
+# Usage: python -m benchmarks.bench_title_index [--titles N] [--queries N]
+import argparse
+import random
+import statistics
+import time
+from itertools import accumulate
+
+from app.utils.title_index import TitleIndex
+
+# English letter frequencies, so that words share trigrams about as often as real ones.
+LETTERS = "etaoinshrdlcumwfgypbvkjxqz"
+LETTER_WEIGHTS = [12.7, 9.1, 8.2, 7.5, 7.0, 6.7, 6.3, 6.1, 6.0, 4.3, 4.0, 2.8, 2.8, 2.4, 2.4, 2.2, 2.0, 2.0,
+                  1.9, 1.5, 1.0, 0.8, 0.15, 0.15, 0.1, 0.07]
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(LETTERS, LETTER_WEIGHTS, k=rng.randint(3, 9))))
+    return sorted(words)
+
+
+def fake_titles(count, words, rng):
+    """Titles of one to four Zipf-distributed words."""
+    cum_weights = list(accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    for _ in range(count):
+        yield " ".join(word.title() for word in rng.choices(words, cum_weights=cum_weights, k=rng.randint(1, 4)))
+
+
+def misspell(title, rng):
+    """Replace, drop or double one letter of a random word, like a quick typist would."""
+    words = title.split()
+    n = rng.randrange(len(words))
+    word = words[n]
+    i = rng.randrange(len(word))
+    words[n] = rng.choice([word[:i] + "e" + word[i + 1:], word[:i] + word[i + 1:], word[:i] + word[i] + word[i:]])
+    return " ".join(words)
+
+
+def report(name, latencies, matched):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{name:<18} p50={p50:.1f}us p99={p99:.1f}us matched={matched}/{len(latencies)}")
+
+
+def measure(index, queries):
+    latencies, matched = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        matched += index.lookup(query) is not None
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies, matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trigram title index lookup latency")
+    parser.add_argument("--titles", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    words = vocabulary(20_000, rng)
+    titles = list(fake_titles(args.titles, words, rng))
+    index = TitleIndex(maxsize=args.titles)
+    start = time.perf_counter()
+    for n, title in enumerate(titles):
+        index.add(title, f"tt{n:07d}")
+    print(f"indexed {len(index)} titles in {time.perf_counter() - start:.1f}s")
+
+    # Multi-word titles: single short words with a typo are usually below the threshold.
+    sample = [title for title in rng.sample(titles, args.queries * 2) if " " in title][:args.queries]
+    report("exact title", *measure(index, sample))
+    report("one typo", *measure(index, [misspell(title, rng) for title in sample]))
+    report("unknown title", *measure(index, [" ".join(rng.sample(words, 3)) for _ in sample]))
+
+
+if __name__ == "__main__":
+    main()
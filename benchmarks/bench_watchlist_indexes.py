@@ -0,0 +1,85 @@
+# Description: Show that watchlist lookups stay flat as the table grows, with and without indexes.
+#
+# Usage: python -m benchmarks.bench_watchlist_indexes [--max-rows N] [--lookups N]
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.models.movie import Movie
+from app.models.user import User
+from app.models.watchlist import Watchlist
+
+MOVIES = 20000
+ENTRIES_PER_USER = 50
+
+LOOKUP = "SELECT id FROM watchlist WHERE user_id = ? AND imdb_id = ?"
+LISTING = "SELECT id FROM watchlist WHERE user_id = ? AND watching_state = ?"
+
+
+def create_schema(conn, indexes):
+    """Create the user, movie and watchlist tables from the models' DDL."""
+    dialect = create_engine("sqlite://").dialect
+    for model in (User, Movie, Watchlist):
+        conn.execute(str(CreateTable(model.__table__).compile(dialect=dialect)))
+    if indexes:
+        for index in Watchlist.__table__.indexes:
+            conn.execute(str(CreateIndex(index).compile(dialect=dialect)))
+
+
+def grow(conn, start, stop):
+    """Insert watchlist rows with ids in [start, stop), ENTRIES_PER_USER per user."""
+    states = ["To Watch", "Watch Next"]
+    conn.executemany(
+        "INSERT INTO watchlist (id, user_id, imdb_id, watching_state) VALUES (?, ?, ?, ?)",
+        # 7919 is coprime with MOVIES, so a user's consecutive entries never repeat a movie.
+        ((i, i // ENTRIES_PER_USER, f"tt{(i * 7919) % MOVIES:07d}", states[i % 2])
+         for i in range(start, stop)),
+    )
+    conn.commit()
+
+
+def time_queries(conn, rows, lookups):
+    """Return the mean latency in microseconds of the lookup and listing queries."""
+    users = rows // ENTRIES_PER_USER
+    samples = [(random.randrange(users), f"tt{random.randrange(MOVIES):07d}") for _ in range(lookups)]
+    results = []
+    for sql, params in ((LOOKUP, samples), (LISTING, [(user, "To Watch") for user, _ in samples])):
+        start = time.perf_counter()
+        for args in params:
+            conn.execute(sql, args).fetchall()
+        results.append((time.perf_counter() - start) / len(params) * 1e6)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watchlist index benchmark")
+    parser.add_argument("--max-rows", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    sizes = [size for size in (10_000, 100_000, 1_000_000, 10_000_000) if size <= args.max_rows]
+    with tempfile.TemporaryDirectory() as directory:
+        for indexes in (False, True):
+            conn = sqlite3.connect(os.path.join(directory, f"bench_{indexes}.db"))
+            create_schema(conn, indexes)
+            label = "indexed" if indexes else "no index"
+            rows = 0
+            for size in sizes:
+                grow(conn, rows, size)
+                rows = size
+                lookup_us, listing_us = time_queries(conn, rows, args.lookups)
+                print(f"{label:<9} rows={rows:>9,} (user_id, imdb_id)={lookup_us:9.1f}us "
+                      f"(user_id, watching_state)={listing_us:9.1f}us")
+            plan = conn.execute("EXPLAIN QUERY PLAN " + LOOKUP, (1, "tt0000001")).fetchall()
+            print(f"{label:<9} plan: {plan[0][-1]}")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Description: Local stub of the OMDb API used by the benchmarks.
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MOVIE = {
+    "Title": "Inception",
+    "Year": "2010",
+    "Rated": "PG-13",
+    "Runtime": "148 min",
+    "Genre": "Action, Adventure, Sci-Fi",
+    "Plot": "A thief who steals corporate secrets through the use of dream-sharing technology "
+            "is given the inverse task of planting an idea into the mind of a C.E.O.",
+    "imdbRating": "8.8",
+    "imdbID": "tt1375666",
+    "Type": "movie",
+    "Response": "True",
+}
+
+
+class StubOMDbHandler(BaseHTTPRequestHandler):
+    """Answers every OMDb query with a fixed movie after an optional delay."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay = 0.0
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        if self.delay:
+            time.sleep(self.delay)
+        if "s" in query:
+            payload = {"Search": [MOVIE] * 10, "totalResults": "10", "Response": "True"}
+        else:
+            payload = dict(MOVIE, Title=query.get("t", [MOVIE["Title"]])[0],
+                           imdbID=query.get("i", [MOVIE["imdbID"]])[0])
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(delay=0.0):
+    """
+    Start the stub server on a free local port in a background thread.
+
+    Returns:
+        tuple: The server and its base URL.
+    """
+    handler = type("DelayedStubOMDbHandler", (StubOMDbHandler,), {"delay": delay})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler, bind_and_activate=False)
+    server.request_queue_size = 1024
+    server.server_bind()
+    server.server_activate()
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}/"
@@ -0,0 +1,33 @@
+# Description: Gunicorn settings for production, read from the environment. Gunicorn loads this file from the working directory.
+#
+# Usage: gunicorn wsgi:app
+import multiprocessing
+import os
+import secrets
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8080')}")
+
+# Each worker is a process with its own OMDb connection pools, caches and database
+# connections. Threads let one worker overlap requests waiting on OMDb or on SQLite.
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+threads = int(os.getenv("WEB_THREADS", "4"))
+worker_class = os.getenv("WEB_WORKER_CLASS", "gthread")
+
+timeout = int(os.getenv("WEB_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+
+# Recycling workers bounds the growth of per-process caches; jitter keeps them from restarting together.
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "0"))
+
+# Login tokens are signed with SECRET_KEY. Without one, every worker would generate its
+# own and reject the tokens issued by the others, so the master picks one key that the
+# workers inherit when they are forked. Set SECRET_KEY for tokens that outlive a restart
+# or work across hosts.
+if not os.getenv("SECRET_KEY"):
+    os.environ["SECRET_KEY"] = secrets.token_hex(32)
+
+accesslog = os.getenv("WEB_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.getenv("WEB_LOG_LEVEL", "info")
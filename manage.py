@@ -1,6 +1,11 @@
 import os
+import requests
+from datetime import timedelta
+from sqlalchemy import inspect, text
 from app import create_app
 from app.utils.db import db
+from app.utils.omdb import client, fetch_movie_by_id, fetch_movie_by_title, random_titles
+from app.utils.rate_limiter import BACKGROUND
 
 app = create_app()
 
@@ -16,15 +21,180 @@ def drop_db():
         db.drop_all()
         print("Database tables dropped successfully.")
 
+def _delete_duplicate_watchlist_rows(conn):
+    """
+    Keep only the newest watchlist row of each (user_id, imdb_id) pair, so the unique
+    index can be built on databases written before it existed.
+
+    Returns:
+        int: The number of rows deleted.
+    """
+    return conn.execute(text(
+        "DELETE FROM watchlist WHERE id NOT IN (SELECT MAX(id) FROM watchlist GROUP BY user_id, imdb_id)"
+    )).rowcount
+
+def migrate_catalog():
+    """
+    Move movie details out of legacy watchlist rows into the shared movie catalog.
+
+    Each distinct imdb_id becomes one catalog row, and the watchlist table is rebuilt
+    with only its own columns. Duplicate entries of a movie for one user are dropped,
+    keeping the newest.
+    """
+    from app.models.movie import Movie, utcnow
+    from app.models.watchlist import Watchlist
+
+    with app.app_context():
+        columns = {column['name'] for column in inspect(db.engine).get_columns('watchlist')}
+        if 'title' not in columns:
+            print("Watchlist already uses the movie catalog.")
+            return
+
+        Movie.__table__.create(db.engine, checkfirst=True)
+        with db.engine.begin() as conn:
+            duplicates = _delete_duplicate_watchlist_rows(conn)
+            conn.execute(text(
+                "INSERT INTO movie (imdb_id, title, year, rated, runtime, plot, genre, imdb_rating, type, updated_at) "
+                "SELECT w.imdb_id, w.title, w.year, w.rated, w.runtime, w.plot, w.genre, w.imdb_rating, w.type, :now "
+                "FROM watchlist w "
+                "WHERE w.id IN (SELECT MAX(id) FROM watchlist GROUP BY imdb_id) "
+                "AND w.imdb_id NOT IN (SELECT imdb_id FROM movie)"
+            ), {"now": utcnow()})
+            conn.execute(text("ALTER TABLE watchlist RENAME TO watchlist_legacy"))
+            Watchlist.__table__.create(conn)
+            conn.execute(text(
+                "INSERT INTO watchlist (id, user_id, imdb_id, watching_state) "
+                "SELECT id, user_id, imdb_id, watching_state FROM watchlist_legacy"
+            ))
+            conn.execute(text("DROP TABLE watchlist_legacy"))
+        print(f"Movie catalog migrated: {Movie.query.count()} movies for {Watchlist.query.count()} watchlist entries "
+              f"({duplicates} duplicate entries removed).")
+
+def create_indexes():
+    """
+    Create any watchlist indexes missing from an existing database, first dropping
+    duplicate entries of a movie for one user, which the unique index forbids.
+    """
+    from app.models.watchlist import Watchlist
+
+    with app.app_context():
+        with db.engine.begin() as conn:
+            duplicates = _delete_duplicate_watchlist_rows(conn)
+            for index in Watchlist.__table__.indexes:
+                index.create(conn, checkfirst=True)
+        print(f"Watchlist indexes created successfully ({duplicates} duplicate entries removed).")
+
+def refresh_movies(max_age_hours=24):
+    """Re-fetch catalog entries from OMDb that are older than max_age_hours."""
+    from app.models.movie import Movie, utcnow
+
+    with app.app_context():
+        stale = Movie.query.filter(Movie.updated_at < utcnow() - timedelta(hours=max_age_hours)).all()
+        refreshed = 0
+        for movie in stale:
+            try:
+                data = fetch_movie_by_id(movie.imdb_id, allow_stale=False, priority=BACKGROUND)
+            except requests.RequestException as e:
+                print(f"Failed to refresh {movie.imdb_id}: {e}")
+                continue
+            if data.get('Response') != 'False':
+                movie.update_from_omdb(data)
+                refreshed += 1
+        db.session.commit()
+        print(f"Refreshed {refreshed} of {len(stale)} stale movies.")
+
+def export_watchlists(output, export_format="ndjson"):
+    """Stream every user's watchlist to a file, one line per entry, in constant memory."""
+    from app.utils.export_utils import export_chunks
+    from app.utils.watchlist_utils import WATCHLIST_FIELDS, iter_watchlist_entries
+
+    fieldnames = list(WATCHLIST_FIELDS) + ['username']
+    with app.app_context(), open(output, "w", newline="") as f:
+        for chunk in export_chunks(iter_watchlist_entries(), export_format, fieldnames):
+            f.write(chunk)
+    print(f"Watchlists exported to {output}.")
+
+def warm_cache():
+    """Fill the shared OMDb cache with the random titles and every movie in a watchlist."""
+    from app.models.watchlist import Watchlist
+
+    if client.store is None:
+        print("OMDb cache store is disabled. Set OMDB_CACHE_DB to enable it.")
+        return
+
+    with app.app_context():
+        imdb_ids = [imdb_id for (imdb_id,) in db.session.query(Watchlist.imdb_id).distinct()]
+
+    warmed = failed = 0
+    for fetch, arg in [(fetch_movie_by_title, title) for title in random_titles] + \
+                      [(fetch_movie_by_id, imdb_id) for imdb_id in imdb_ids]:
+        try:
+            fetch(arg, allow_stale=False, priority=BACKGROUND)
+            warmed += 1
+        except requests.RequestException as e:
+            failed += 1
+            print(f"Failed to warm {arg}: {e}")
+    print(f"OMDb cache warmed: {warmed} entries, {failed} failures.")
+
+def inspect_cache():
+    """Print the shared OMDb cache size and its most recent entries."""
+    if client.store is None:
+        print("OMDb cache store is disabled. Set OMDB_CACHE_DB to enable it.")
+        return
+
+    stats = client.store.stats()
+    print(f"{stats['path']}: {stats['live']} live, {stats['expired']} expired, {stats['payload_bytes']} payload bytes")
+    for key, ttl in client.store.entries():
+        print(f"  {key} (expires in {ttl}s)")
+
+def purge_cache(purge_all=False):
+    """Delete expired (or, with --all, every) entry from the shared OMDb cache."""
+    if client.store is None:
+        print("OMDb cache store is disabled. Set OMDB_CACHE_DB to enable it.")
+        return
+
+    deleted = client.store.purge(expired_only=not purge_all)
+    print(f"Purged {deleted} entries from the OMDb cache.")
+
+def build_search_index(batch_size=1000):
+    """Index every catalog movie for local keyword search; OMDb responses are indexed as they arrive."""
+    from app.models.movie import Movie
+
+    if client.index is None:
+        print("Movie search index is disabled. Set OMDB_SEARCH_INDEX to enable it.")
+        return
+
+    with app.app_context():
+        indexed = 0
+        batch = []
+        for movie in Movie.query.yield_per(batch_size):
+            batch.append(movie.to_omdb())
+            if len(batch) >= batch_size:
+                indexed += client.index.add_many(batch)
+                batch = []
+        indexed += client.index.add_many(batch)
+    print(f"Indexed {indexed} catalog movies; the index now holds {client.index.stats()['movies']}.")
+
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Database Management Script")
     parser.add_argument(
         "command",
-        choices=["init_db", "drop_db"],
-        help="Command to execute: init_db (initialize the database), drop_db (drop all tables)."
+        choices=["init_db", "drop_db", "migrate_catalog", "create_indexes", "refresh_movies", "export_watchlists", "warm_cache", "inspect_cache", "purge_cache", "build_search_index"],
+        help="Command to execute: init_db (initialize the database), drop_db (drop all tables), "
+             "migrate_catalog (de-duplicate legacy watchlist rows into the movie catalog), "
+             "create_indexes (add missing watchlist indexes), "
+             "refresh_movies (re-fetch stale catalog entries from OMDb), "
+             "export_watchlists (dump every user's watchlist to --output), "
+             "warm_cache (prefetch hot movies into the shared OMDb cache), inspect_cache (show cache contents), "
+             "purge_cache (delete expired cache entries), "
+             "build_search_index (add every catalog movie to the local search index)."
     )
+    parser.add_argument("--all", action="store_true", help="With purge_cache, delete live entries too.")
+    parser.add_argument("--output", default="watchlists.ndjson", help="With export_watchlists, the file to write.")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson", help="With export_watchlists, the file format.")
+    parser.add_argument("--max-age-hours", type=int, default=24, help="With refresh_movies, refresh entries older than this.")
 
     args = parser.parse_args()
 
@@ -32,3 +202,19 @@ if __name__ == "__main__":
         init_db()
     elif args.command == "drop_db":
         drop_db()
+    elif args.command == "migrate_catalog":
+        migrate_catalog()
+    elif args.command == "create_indexes":
+        create_indexes()
+    elif args.command == "refresh_movies":
+        refresh_movies(max_age_hours=args.max_age_hours)
+    elif args.command == "export_watchlists":
+        export_watchlists(args.output, export_format=args.format)
+    elif args.command == "warm_cache":
+        warm_cache()
+    elif args.command == "inspect_cache":
+        inspect_cache()
+    elif args.command == "purge_cache":
+        purge_cache(purge_all=args.all)
+    elif args.command == "build_search_index":
+        build_search_index()
@@ -0,0 +1,54 @@
+import json
+import pytest
+from unittest.mock import patch
+from app.utils.cache import TTLCache
+from app.utils.cache_store import SQLiteCacheStore
+from app.utils.omdb import OMDbClient
+
+@pytest.fixture
+def store(tmp_path):
+    """Create a cache store in a temporary directory."""
+    store = SQLiteCacheStore(str(tmp_path / "omdb_cache.db"))
+    yield store
+    store.close()
+
+def test_store_set_and_get(store):
+    """Test that stored payloads are returned with their expiry."""
+    store.set("i=tt1375666&plot=short", '{"Title": "Inception"}', ttl=60)
+
+    payload, expires_at = store.get("i=tt1375666&plot=short")
+    assert json.loads(payload) == {"Title": "Inception"}
+    assert store.get("i=tt0000000&plot=short") is None
+
+def test_store_uses_wal_mode(store):
+    """Test that the store opens its database in WAL mode."""
+    store.get("missing")
+    assert store._connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+def test_store_ignores_and_purges_expired_entries(store):
+    """Test that expired entries are not returned and are removed by purge."""
+    store.set("live", "{}", ttl=60)
+    with patch("app.utils.cache_store.time.time", return_value=0):
+        store.set("expired", "{}", ttl=1)
+
+    assert store.get("expired") is None
+    assert store.get_stale("expired") == "{}"
+    assert store.stats()["expired"] == 1
+    assert store.purge() == 1
+    assert store.stats()["live"] == 1
+    assert store.purge(expired_only=False) == 1
+
+def test_client_reads_store_after_restart(store):
+    """
+    Test that a new client (e.g. a restarted worker) is served from the shared store
+    instead of calling OMDb again.
+    """
+    with patch("app.utils.omdb.requests.Session.get") as mock_get:
+        mock_get.return_value.content = json.dumps({"Title": "Inception", "Response": "True"}).encode()
+        OMDbClient(api_key="key", cache=TTLCache(), store=store).get(i="tt1375666")
+
+        restarted = OMDbClient(api_key="key", cache=TTLCache(), store=store)
+        assert restarted.get(i="tt1375666") == {"Title": "Inception", "Response": "True"}
+        assert restarted.cache.get("i=tt1375666&plot=short")[0]
+
+    assert mock_get.call_count == 1
@@ -0,0 +1,147 @@
+import pytest
+from unittest.mock import Mock
+import threading
+from app.utils.cache import RefreshingPool, RefreshingValue, TTLCache
+
+class FakeClock:
+    """Manually advanced clock for expiry tests."""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def test_cache_hit_and_miss(clock):
+    """Test that stored values are returned and missing keys are counted as misses."""
+    cache = TTLCache(maxsize=2, clock=clock)
+    cache.set("a", 1, ttl=10)
+
+    assert cache.get("a") == (True, 1)
+    assert cache.get("b") == (False, None)
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_cache_expires_entries(clock):
+    """Test that entries are dropped once their TTL has passed."""
+    cache = TTLCache(maxsize=2, clock=clock)
+    cache.set("a", 1, ttl=10)
+
+    clock.now = 10
+    assert cache.get("a") == (False, None)
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 0
+
+def test_cache_evicts_least_recently_used(clock):
+    """Test that the least recently used entry is evicted when the cache is full."""
+    cache = TTLCache(maxsize=2, clock=clock)
+    cache.set("a", 1, ttl=10)
+    cache.set("b", 2, ttl=10)
+    cache.get("a")
+    cache.set("c", 3, ttl=10)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+    assert cache.stats()["evictions"] == 1
+
+def test_cache_disabled_when_size_is_zero(clock):
+    """Test that a zero-sized cache never stores anything."""
+    cache = TTLCache(maxsize=0, clock=clock)
+    cache.set("a", 1, ttl=10)
+
+    assert cache.get("a") == (False, None)
+
+def test_refreshing_value_serves_from_memory(clock):
+    """Test that the value is loaded once and served from memory while fresh."""
+    loader = Mock(return_value=[1, 2])
+    value = RefreshingValue(loader, interval=60, clock=clock)
+
+    assert value.get() == [1, 2]
+    assert value.get() == [1, 2]
+    assert loader.call_count == 1
+
+def test_refreshing_value_refreshes_in_background(clock):
+    """Test that a stale value is still served while a background refresh replaces it."""
+    gate = threading.Event()
+    def loader():
+        loader.calls += 1
+        if loader.calls > 1:
+            gate.wait(2)
+        return loader.calls
+    loader.calls = 0
+    value = RefreshingValue(loader, interval=60, clock=clock)
+
+    assert value.get() == 1
+    clock.now = 61
+    assert value.get() == 1
+    assert value.get() == 1
+    gate.set()
+    for _ in range(100):
+        if value.get() == 2:
+            break
+        threading.Event().wait(0.01)
+    assert value.get() == 2
+    assert loader.calls == 2
+
+def test_refreshing_value_keeps_value_when_refresh_fails(clock):
+    """Test that a failed background refresh keeps the last good value."""
+    loader = Mock(side_effect=[[1], RuntimeError("down")])
+    value = RefreshingValue(loader, interval=60, retry_interval=5, clock=clock)
+
+    value.get()
+    clock.now = 61
+    assert value.get() == [1]
+    for _ in range(100):
+        if not value._refreshing:
+            break
+        threading.Event().wait(0.01)
+    assert value.get() == [1]
+    assert loader.call_count == 2
+
+def wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return True
+        threading.Event().wait(0.01)
+    return False
+
+def test_refreshing_pool_fills_in_background_and_samples_from_memory(clock):
+    """Test that the first sample starts a background fill and later samples come from memory."""
+    gate = threading.Event()
+    def load(key, items):
+        gate.wait(2)
+        return [f"{item}-{key}" for item in items]
+    loader = Mock(side_effect=load)
+    pool = RefreshingPool(loader, ["a", "b"], keys=(None, "full"), ttl=60, clock=clock)
+
+    assert pool.sample("full") is None
+    assert pool.sample("full") is None
+    gate.set()
+    assert wait_for(lambda: pool.sample("full") is not None)
+    assert {pool.sample("full") for _ in range(50)} == {"a-full", "b-full"}
+    assert pool.sample("other") is None
+    assert pool.stats() == {"None": 0, "full": 2}
+    assert loader.call_count == 1
+
+def test_refreshing_pool_reloads_expired_items_and_keeps_failed_ones(clock):
+    """Test that missing and expired values are reloaded in the background and kept when reloading fails."""
+    loader = Mock(side_effect=[["a1", None], [RuntimeError("down")], [None, "b3"]])
+    pool = RefreshingPool(loader, ["a", "b"], keys=(None,), ttl=60, retry_interval=5, clock=clock)
+
+    pool.sample()
+    assert wait_for(lambda: pool.stats() == {"None": 1})
+
+    clock.now = 6
+    pool.sample()
+    assert wait_for(lambda: loader.call_count == 2 and not pool._refreshing)
+    assert loader.call_args[0] == (None, ["b"])
+
+    clock.now = 61
+    pool.sample()
+    assert wait_for(lambda: loader.call_count == 3 and not pool._refreshing)
+    assert loader.call_args[0] == (None, ["a", "b"])
+    assert {pool.sample() for _ in range(50)} == {"a1", "b3"}
@@ -0,0 +1,63 @@
+import pytest
+from app.utils.circuit_breaker import CircuitBreaker
+
+class FakeClock:
+    """Manually advanced clock for open-duration tests."""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(window=4, min_calls=4, failure_rate=0.5, slow_call_seconds=1.0,
+                          open_seconds=30, half_open_calls=1, clock=clock)
+
+def test_breaker_opens_on_error_rate(breaker):
+    """Test that the breaker opens once enough of the window has failed, and then rejects calls."""
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+
+def test_breaker_counts_slow_calls_as_failures(breaker):
+    """Test that calls slower than the threshold open the breaker like errors."""
+    for _ in range(4):
+        assert breaker.allow()
+        breaker.record_success(2.0)
+    assert breaker.state == "open"
+
+def test_breaker_needs_min_calls(breaker):
+    """Test that a few early failures do not open the breaker."""
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+def test_breaker_half_open_trial_closes_or_reopens(breaker, clock):
+    """Test that after the open period one trial call decides whether the breaker closes."""
+    for _ in range(4):
+        breaker.record_failure()
+
+    clock.now = 30
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.stats()["times_opened"] == 2
+
+    clock.now = 60
+    assert breaker.allow()
+    breaker.record_success(0.1)
+    assert breaker.state == "closed"
+    assert breaker.stats()["calls_in_window"] == 0
@@ -1,5 +1,19 @@
+import hashlib
+import os
+import threading
 import pytest
-from app.utils.hashing import hash_password, verify_password
+from unittest.mock import patch
+from app.utils.hashing import (
+    HASH_ALGORITHM,
+    HASH_ITERATIONS,
+    HashingBusyError,
+    HashingExecutor,
+    default_queue_size,
+    hashing_executor,
+    hash_password,
+    needs_rehash,
+    verify_password,
+)
 
 def test_hash_password():
     """Test the hash_password function."""
@@ -42,3 +56,54 @@ def test_hashing_is_unique():
     # Assertions
     assert salt1 != salt2, "Salts should be unique"
     assert hashed_password1 != hashed_password2, "Hashed passwords should be unique even for the same input"
+
+def test_hash_records_parameters():
+    """Test that the stored hash records its algorithm and iteration count."""
+    salt, hashed_password = hash_password("securepassword")
+
+    assert hashed_password.startswith(f"pbkdf2_{HASH_ALGORITHM}${HASH_ITERATIONS}$")
+    assert not needs_rehash(hashed_password)
+
+def test_verify_legacy_hash():
+    """Test that hashes stored without parameters still verify and are flagged for rehash."""
+    salt = os.urandom(16)
+    legacy_hash = hashlib.pbkdf2_hmac('sha256', b"securepassword", salt, 100000).hex()
+
+    assert verify_password(salt.hex(), legacy_hash, "securepassword")
+    assert not verify_password(salt.hex(), legacy_hash, "wrongpassword")
+    assert needs_rehash(legacy_hash)
+
+def test_needs_rehash_when_iterations_change():
+    """Test that a hash made with another iteration count verifies but needs a rehash."""
+    salt, hashed_password = hash_password("securepassword")
+
+    with patch("app.utils.hashing.HASH_ITERATIONS", HASH_ITERATIONS * 2):
+        assert needs_rehash(hashed_password)
+        assert verify_password(salt, hashed_password, "securepassword")
+
+def test_hashing_executor_rejects_when_full():
+    """Test that the executor rejects work beyond its queue size instead of queueing forever."""
+    executor = HashingExecutor(workers=1, queue_size=1, timeout=5)
+    release = threading.Event()
+    started = threading.Event()
+    def slow_hash():
+        started.set()
+        release.wait(5)
+        return b"done"
+
+    worker = threading.Thread(target=executor.run, args=(slow_hash,))
+    worker.start()
+    started.wait(5)
+    with pytest.raises(HashingBusyError):
+        executor.run(lambda: b"rejected")
+    release.set()
+    worker.join()
+
+    assert executor.run(lambda: b"accepted") == b"accepted"
+
+def test_default_queue_size_leaves_a_request_thread_free():
+    """Test that by default fewer hashes may be in flight than there are request threads."""
+    assert default_queue_size(4) == 3
+    assert default_queue_size(1) == 1
+    if not os.getenv("PASSWORD_HASH_QUEUE_SIZE"):
+        assert hashing_executor.queue_size < int(os.getenv("WEB_THREADS", "4"))
@@ -0,0 +1,103 @@
+import json
+import logging
+import queue
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from app import create_app
+from app.utils.logger import BackgroundListener, BackgroundQueueHandler, logger, parse_sample_rates, stop_logging
+from app.utils.omdb import RawResponse
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    """Fixture to stop the background writer a test started."""
+    yield
+    stop_logging()
+
+def json_app(tmp_path):
+    """
+    Create an application that writes JSON lines from a background thread, sampling
+    health checks out. Called within the test, so that its log stream is the one capfd captures.
+    """
+    return create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'movie_app.db'}",
+                       'LOG_FORMAT': 'json', 'LOG_ASYNC': True, 'LOG_MAX_LENGTH': 40,
+                       'LOG_SAMPLE_RATES': '/api/health=0'})
+
+def written_entries(capfd):
+    """Write out the queued records and return the JSON lines printed to stderr."""
+    stop_logging()
+    return [json.loads(line) for line in capfd.readouterr().err.splitlines() if line.startswith("{")]
+
+def test_json_lines_carry_request_fields(tmp_path, capfd):
+    """Test that search routes log a summary with the route and extra fields, not the OMDb payload."""
+    body = json.dumps({"Title": "Inception", "Plot": "A thief who steals corporate secrets. " * 20}).encode()
+    with patch("app.routes.search_routes.fetch_movie_by_id", return_value=RawResponse(body)):
+        assert json_app(tmp_path).test_client().get("/search/search-by-id?id=tt1375666").status_code == 200
+
+    entry = next(entry for entry in written_entries(capfd) if entry["message"] == "Searched by ID")
+    assert entry["level"] == "INFO"
+    assert entry["method"] == "GET"
+    assert entry["route"] == "/search/search-by-id"
+    assert entry["imdb_id"] == "tt1375666"
+    assert entry["response_bytes"] == len(body)
+    assert "Plot" not in json.dumps(entry)
+
+def test_long_messages_and_fields_are_truncated(tmp_path, capfd):
+    """Test that messages and string fields beyond LOG_MAX_LENGTH are cut, saying how long they were."""
+    json_app(tmp_path)
+    logger.info("x" * 100, extra={"plot": "y" * 50})
+
+    entry = next(entry for entry in written_entries(capfd) if entry["message"].startswith("x"))
+    assert entry["message"] == "x" * 40 + "... [100 chars]"
+    assert entry["plot"] == "y" * 40 + "... [50 chars]"
+
+def test_sampled_routes_keep_warnings(tmp_path, capfd):
+    """Test that a route sampled at 0 logs no INFO records but still logs warnings."""
+    app = json_app(tmp_path)
+    assert app.test_client().get("/api/health").status_code == 200
+    with app.test_request_context("/api/health"):
+        logger.warning("OMDb is slow")
+
+    messages = [entry["message"] for entry in written_entries(capfd)]
+    assert "Health check" not in messages
+    assert "OMDb is slow" in messages
+
+def test_full_queue_drops_records():
+    """Test that records are dropped and counted, rather than waited on, when the queue is full."""
+    handler = BackgroundQueueHandler(queue.Queue(maxsize=1))
+    for message in ("first", "second"):
+        handler.handle(logging.makeLogRecord({"msg": message, "levelno": logging.INFO}))
+
+    assert handler.dropped == 1
+    assert handler.queue.get_nowait().msg == "first"
+
+def test_listener_stops_with_a_full_queue():
+    """Test that stopping the writer waits for room in a full queue and writes every queued record."""
+    written, release = [], threading.Event()
+    handler = logging.Handler()
+    handler.emit = lambda record: release.wait(5) and written.append(record.msg)
+    log_queue = queue.Queue(maxsize=2)
+    listener = BackgroundListener(log_queue, handler)
+    listener.start()
+    log_queue.put(logging.makeLogRecord({"msg": "first"}))
+    while not log_queue.empty():
+        time.sleep(0.001)
+    for message in ("second", "third"):
+        log_queue.put(logging.makeLogRecord({"msg": message}))
+
+    threading.Timer(0.05, release.set).start()
+    listener.stop()
+
+    assert written == ["first", "second", "third"]
+
+def test_parse_sample_rates():
+    """Test that sample rates are read per route and that invalid rates are rejected."""
+    assert parse_sample_rates("/api/health=0, /search/search-by-id=0.25,") == {
+        "/api/health": 0.0, "/search/search-by-id": 0.25,
+    }
+    assert parse_sample_rates("") == {}
+    with pytest.raises(ValueError):
+        parse_sample_rates("/api/health")
+    with pytest.raises(ValueError):
+        parse_sample_rates("/api/health=2")
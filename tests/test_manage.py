@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import text
+import manage
+from app import create_app
+from app.models.movie import Movie
+from app.models.user import User
+from app.utils.db import db
+
+LEGACY_WATCHLIST = (
+    "CREATE TABLE watchlist (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, imdb_id VARCHAR(20) NOT NULL,"
+    " watching_state VARCHAR(20), title VARCHAR(200), year VARCHAR(16), rated VARCHAR(10), runtime VARCHAR(20),"
+    " plot TEXT, genre VARCHAR(255), imdb_rating VARCHAR(10), type VARCHAR(20))"
+)
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Create an application backed by a SQLite file in a temporary directory and run manage.py against it."""
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'movie_app.db'}"})
+    monkeypatch.setattr(manage, "app", app)
+    with app.app_context():
+        User.__table__.create(db.engine)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+def watchlist_rows(app):
+    with app.app_context(), db.engine.connect() as conn:
+        return conn.execute(text("SELECT id, user_id, imdb_id, watching_state FROM watchlist ORDER BY id")).all()
+
+def test_migrate_catalog_drops_duplicate_entries(app):
+    """Test that migrating a legacy table keeps the newest of duplicate entries instead of failing."""
+    with app.app_context(), db.engine.begin() as conn:
+        conn.execute(text(LEGACY_WATCHLIST))
+        # What the old check-then-insert race left behind: one movie twice for one user.
+        conn.execute(text("INSERT INTO watchlist (id, user_id, imdb_id, watching_state, title) VALUES"
+                          " (1, 1, 'tt1375666', 'To Watch', 'Inception'), (2, 1, 'tt1375666', 'Watched', 'Inception'),"
+                          " (3, 2, 'tt1375666', 'To Watch', 'Inception')"))
+
+    manage.migrate_catalog()
+
+    assert watchlist_rows(app) == [(2, 1, "tt1375666", "Watched"), (3, 2, "tt1375666", "To Watch")]
+    with app.app_context():
+        assert Movie.query.count() == 1
+
+def test_create_indexes_drops_duplicate_entries(app):
+    """Test that the unique index is created on a table holding duplicate entries."""
+    with app.app_context(), db.engine.begin() as conn:
+        Movie.__table__.create(conn)
+        conn.execute(text("CREATE TABLE watchlist (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL,"
+                          " imdb_id VARCHAR(20) NOT NULL, watching_state VARCHAR(20))"))
+        conn.execute(text("INSERT INTO watchlist (id, user_id, imdb_id, watching_state) VALUES"
+                          " (1, 1, 'tt1375666', 'To Watch'), (2, 1, 'tt1375666', 'Watched'),"
+                          " (3, 2, 'tt1375666', 'To Watch')"))
+
+    manage.create_indexes()
+
+    assert watchlist_rows(app) == [(2, 1, "tt1375666", "Watched"), (3, 2, "tt1375666", "To Watch")]
+    with app.app_context(), db.engine.connect() as conn:
+        indexes = {row[1]: row[2] for row in conn.execute(text("PRAGMA index_list(watchlist)"))}
+    assert indexes["ix_watchlist_user_imdb"] == 1
@@ -0,0 +1,98 @@
+import json
+import threading
+import pytest
+from unittest.mock import patch
+from app import create_app
+from app.utils.db import db
+from app.utils.metrics import COUNTER, HISTOGRAM, Metrics, metrics
+from app.utils.omdb import OMDbClient
+
+@pytest.fixture
+def app(tmp_path):
+    """Create an application backed by a SQLite file in a temporary directory, with empty metrics."""
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'movie_app.db'}"})
+    with app.app_context():
+        db.create_all()
+    metrics.clear()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+def test_histogram_buckets_are_cumulative():
+    """Test that observations land in the right buckets and render with cumulative counts, sum and count."""
+    registry = Metrics(buckets=(0.1, 1.0))
+    registry.define("latency_seconds", HISTOGRAM, "Latency.", ("route",))
+    for seconds in (0.05, 0.1, 0.5, 2.0):
+        registry.observe("latency_seconds", ("/a",), seconds)
+
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/a"} 2.65' in lines
+    assert 'latency_seconds_count{route="/a"} 4' in lines
+
+def test_counts_from_all_threads_are_merged():
+    """Test that counts recorded by many threads, including finished ones, add up."""
+    registry = Metrics()
+    registry.define("events_total", COUNTER, "Events.", ("kind",))
+
+    def record():
+        for _ in range(10000):
+            registry.inc("events_total", ("a",))
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    record()
+
+    assert registry.value("events_total", ("a",)) == 90000
+    # Finished threads are folded together, and their counts survive later collections.
+    assert len(registry._shards) == 1
+    assert registry.value("events_total", ("a",)) == 90000
+
+def test_label_values_are_escaped():
+    """Test that quotes, backslashes and newlines in label values cannot break the format."""
+    registry = Metrics()
+    registry.define("events_total", COUNTER, "Events.", ("kind",))
+    registry.inc("events_total", ('say "hi"\\\n',))
+
+    assert 'events_total{kind="say \\"hi\\"\\\\\\n"} 1' in registry.render().splitlines()
+
+def test_metrics_route_reports_requests(app):
+    """Test that requests are counted per route and status, and unmatched paths share one label."""
+    client = app.test_client()
+    client.get("/api/health")
+    client.get("/api/health")
+    client.get("/no-such-page")
+
+    response = client.get("/api/metrics")
+    lines = response.get_data(as_text=True).splitlines()
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert 'http_requests_total{method="GET",route="/api/health",status="200"} 2' in lines
+    assert 'http_requests_total{method="GET",route="<unmatched>",status="404"} 1' in lines
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/health"} 2' in lines
+    # The metrics request itself is the one in flight.
+    assert "http_requests_in_flight 1" in lines
+
+def test_sql_statements_are_timed(app):
+    """Test that statements run by a request are timed by database and operation."""
+    app.test_client().get("/watchlist/get-watchlist", json={"username": "nobody"})
+
+    count, total = metrics.histogram("db_query_duration_seconds", ("primary", "select"))
+    assert count >= 1
+    assert total > 0
+
+def test_omdb_requests_are_timed():
+    """Test that OMDb requests are timed by client and outcome."""
+    omdb_client = OMDbClient(api_key="test", breaker=None)
+    before, _ = metrics.histogram("omdb_request_duration_seconds", ("sync", "ok"))
+    with patch("app.utils.omdb.requests.Session.get") as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps({"Title": "Inception"}).encode()
+        omdb_client.get(i="tt1375666")
+
+    assert metrics.histogram("omdb_request_duration_seconds", ("sync", "ok"))[0] == before + 1
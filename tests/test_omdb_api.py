@@ -1,17 +1,53 @@
+import asyncio
+import json
+import os
+import threading
+import time
 import pytest
-from unittest.mock import patch
+import aiohttp
+import requests
+from unittest.mock import AsyncMock, Mock, patch
+from app import create_app
+from app.utils.cache import TTLCache
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
 from app.utils.omdb import (
+    AsyncOMDbClient,
+    OMDbClient,
+    async_client,
+    client,
     fetch_movie_by_title,
     fetch_movie_by_id,
     search_movies_by_keyword,
     fetch_random_movie,
     fetch_top_rated_movies,
+    fetch_movies_by_ids,
+    random_movies,
+    random_titles,
 )
 
+@pytest.fixture(autouse=True)
+def clear_omdb_cache():
+    """Fixture to start every test with an empty OMDb response cache and title index, and a closed breaker."""
+    client.cache.clear()
+    client.stale.clear()
+    client.titles.clear()
+    client.breaker.reset()
+    yield
+    client.cache.clear()
+    client.stale.clear()
+    client.titles.clear()
+    client.breaker.reset()
+
+@pytest.fixture
+def mock_async_send():
+    """Fixture to mock the async client's pooled request, which returns (status, body)."""
+    with patch("app.utils.omdb.AsyncOMDbClient._send", new_callable=AsyncMock) as mock_get:
+        yield mock_get
+
 @pytest.fixture
 def mock_requests_get():
-    """Fixture to mock the requests.get method."""
-    with patch("app.utils.omdb.requests.get") as mock_get:
+    """Fixture to mock the pooled session's get method."""
+    with patch("app.utils.omdb.requests.Session.get") as mock_get:
         yield mock_get
 
 def test_fetch_movie_by_title(mock_requests_get):
@@ -21,7 +57,7 @@ def test_fetch_movie_by_title(mock_requests_get):
     Test that the function returns the movie title, when given a valid title.
     """
     mock_requests_get.return_value.status_code = 200
-    mock_requests_get.return_value.json.return_value = {"Title": "Inception"}
+    mock_requests_get.return_value.content = json.dumps({"Title": "Inception"}).encode()
     
     result = fetch_movie_by_title("Inception")
     assert result["Title"] == "Inception"
@@ -41,7 +77,7 @@ def test_fetch_movie_by_id(mock_requests_get):
     Test that the function returns the movie title, when given a valid IMDb ID.
     """
     mock_requests_get.return_value.status_code = 200
-    mock_requests_get.return_value.json.return_value = {"Title": "Inception"}
+    mock_requests_get.return_value.content = json.dumps({"Title": "Inception"}).encode()
     
     result = fetch_movie_by_id("tt1375666")
     assert result["Title"] == "Inception"
@@ -61,7 +97,7 @@ def test_search_movies_by_keyword(mock_requests_get):
     Test that the function returns the movie title, when given a valid keyword.
     """
     mock_requests_get.return_value.status_code = 200
-    mock_requests_get.return_value.json.return_value = {"Search": [{"Title": "Inception"}]}
+    mock_requests_get.return_value.content = json.dumps({"Search": [{"Title": "Inception"}]}).encode()
     
     result = search_movies_by_keyword("Inception")
     assert result[0]["Title"] == "Inception"
@@ -81,7 +117,7 @@ def test_fetch_random_movie(mock_requests_get):
     Test that the function returns the movie title when given a list of valid titles.
     """
     mock_requests_get.return_value.status_code = 200
-    mock_requests_get.return_value.json.return_value = {"Title": "Inception"}
+    mock_requests_get.return_value.content = json.dumps({"Title": "Inception"}).encode()
     
     result = fetch_random_movie(["Inception", "Avatar"])
     assert result["Title"] == "Inception"
@@ -101,7 +137,7 @@ def test_fetch_top_rated_movies(mock_requests_get):
     Test that the function returns the top rated movies when given a list of valid titles.
     """
     mock_requests_get.return_value.status_code = 200
-    mock_requests_get.return_value.json.return_value = {"Title": "The Godfather"}
+    mock_requests_get.return_value.content = json.dumps({"Title": "The Godfather"}).encode()
     
     result = fetch_top_rated_movies(["The Godfather"])
     assert result[0]["Title"] == "The Godfather"
@@ -112,4 +148,369 @@ def test_fetch_top_rated_movies_empty_list():
     when given an empty list of top rated movies.
     """
     with pytest.raises(ValueError, match="No top-rated movies available."):
-        fetch_top_rated_movies([])
\ No newline at end of file
+        fetch_top_rated_movies([])
+
+def test_client_sends_params_and_timeout(mock_requests_get):
+    """
+    Test that the client sends query parameters and the configured timeout,
+    dropping parameters that were not given.
+    """
+    mock_requests_get.return_value.content = json.dumps({"Title": "Inception"}).encode()
+
+    fetch_movie_by_title("Inception", plot="full")
+
+    _, kwargs = mock_requests_get.call_args
+    assert kwargs["timeout"] == client.timeout
+    assert kwargs["params"]["t"] == "Inception"
+    assert kwargs["params"]["plot"] == "full"
+    assert "y" not in kwargs["params"]
+
+def test_client_reuses_session():
+    """
+    Test that the client keeps one session per process and re-creates it after a fork.
+    """
+    omdb_client = OMDbClient(api_key="key", pool_size=4)
+    session = omdb_client.session
+    assert omdb_client.session is session
+    assert session.get_adapter("http://www.omdbapi.com/")._pool_maxsize == 4
+
+    with patch("app.utils.omdb.os.getpid", return_value=os.getpid() + 1):
+        assert omdb_client.session is not session
+
+def test_fetch_top_rated_movies_skips_failed_titles(mock_requests_get):
+    """
+    Test that fetch_top_rated_movies skips titles whose request returned an error status.
+    """
+    def fake_get(url, params, timeout):
+        response = Mock()
+        if params["t"] == "Broken":
+            response.raise_for_status.side_effect = requests.HTTPError("503")
+        response.content = json.dumps({"Title": params["t"]}).encode()
+        return response
+    mock_requests_get.side_effect = fake_get
+
+    result = fetch_top_rated_movies(["Broken", "The Godfather"])
+    assert result == [{"Title": "The Godfather"}]
+
+def test_fetch_top_rated_movies_keeps_order_and_drops_slow_titles(mock_requests_get):
+    """
+    Test that titles are fetched concurrently, results keep the original order
+    and titles that miss the timeout are left out.
+    """
+    release = threading.Event()
+    def fake_get(url, params, timeout):
+        if params["t"] == "Slow":
+            release.wait(5)
+        elif params["t"] == "First":
+            time.sleep(0.05)
+        response = Mock()
+        response.content = json.dumps({"Title": params["t"]}).encode()
+        return response
+    mock_requests_get.side_effect = fake_get
+
+    try:
+        result = fetch_top_rated_movies(["First", "Slow", "Second"], timeout=0.5)
+    finally:
+        release.set()
+    assert result == [{"Title": "First"}, {"Title": "Second"}]
+
+def test_get_many_times_out_each_query_not_the_batch(mock_requests_get):
+    """Test that a batch larger than the worker pool gets the timeout per query, however many rounds it takes."""
+    def fake_get(url, params, timeout):
+        time.sleep(0.1)
+        response = Mock()
+        response.content = json.dumps({"imdbID": params["i"]}).encode()
+        return response
+    mock_requests_get.side_effect = fake_get
+    omdb_client = OMDbClient(api_key="test", fanout_workers=2, breaker=None)
+
+    results = omdb_client.get_many([{"i": f"tt{n}"} for n in range(8)], timeout=0.3)
+
+    assert results == [{"imdbID": f"tt{n}"} for n in range(8)]
+
+def test_fetch_top_rated_movies_raises_when_all_fail_with_error_statuses(mock_requests_get):
+    """
+    Test that an error status is raised when every title failed, rather than an empty list being returned.
+    """
+    mock_requests_get.return_value.raise_for_status.side_effect = requests.HTTPError("503")
+
+    with pytest.raises(requests.HTTPError):
+        fetch_top_rated_movies(["The Godfather", "Pulp Fiction"])
+
+def test_fetch_top_rated_movies_raises_when_all_fail(mock_requests_get):
+    """
+    Test that a connection error is raised when no title could be fetched.
+    """
+    mock_requests_get.side_effect = requests.ConnectionError("down")
+
+    with pytest.raises(requests.ConnectionError):
+        fetch_top_rated_movies(["The Godfather"])
+
+def test_fetch_movie_by_id_uses_cache(mock_requests_get):
+    """
+    Test that repeated lookups for the same normalized query hit OMDb only once.
+    """
+    mock_requests_get.return_value.content = json.dumps({"Title": "Inception", "Response": "True"}).encode()
+
+    fetch_movie_by_id("tt1375666")
+    fetch_movie_by_id(" TT1375666 ", plot="short")
+    fetch_movie_by_title("Inception")
+    fetch_movie_by_title("  inception ")
+
+    assert mock_requests_get.call_count == 2
+    assert client.cache.stats()["hits"] == 2
+
+def test_cache_distinguishes_plot_and_year(mock_requests_get):
+    """
+    Test that the plot type and year are part of the cache key.
+    """
+    mock_requests_get.return_value.content = json.dumps({"Title": "Inception", "Response": "True"}).encode()
+
+    fetch_movie_by_title("Inception")
+    fetch_movie_by_title("Inception", plot="full")
+    fetch_movie_by_title("Inception", year=2010)
+
+    assert mock_requests_get.call_count == 3
+
+def test_cache_uses_negative_and_error_ttls(mock_requests_get):
+    """
+    Test that "Response: False" results and request errors are cached with their own TTLs.
+    """
+    with patch.object(client.cache, "set", wraps=client.cache.set) as mock_set:
+        mock_requests_get.return_value.content = json.dumps({"Response": "False", "Error": "Movie not found!"}).encode()
+        fetch_movie_by_title("Shawshenk Redemption")
+        assert mock_set.call_args[0][2] == client.negative_ttl
+
+        mock_requests_get.return_value.raise_for_status.side_effect = requests.HTTPError("503")
+        with pytest.raises(requests.HTTPError):
+            fetch_movie_by_id("tt0000001")
+        assert mock_set.call_args[0][2] == client.error_ttl
+
+    with pytest.raises(requests.HTTPError):
+        fetch_movie_by_id("tt0000001")
+    assert mock_requests_get.call_count == 2
+
+def test_concurrent_title_lookups_are_coalesced(mock_requests_get):
+    """
+    Test that concurrent lookups for the same normalized title share one upstream request.
+    """
+    release = threading.Event()
+    def fake_get(url, params, timeout):
+        release.wait(5)
+        response = Mock()
+        response.content = json.dumps({"Title": "Inception", "Response": "True"}).encode()
+        return response
+    mock_requests_get.side_effect = fake_get
+    coalesced_before = client.flights.coalesced
+
+    threads = [threading.Thread(target=fetch_movie_by_title, args=(title,))
+               for title in ["Inception", "inception", " INCEPTION "]]
+    for thread in threads:
+        thread.start()
+    for _ in range(500):
+        if client.flights.coalesced - coalesced_before >= 2:
+            break
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert mock_requests_get.call_count == 1
+    assert client.flights.coalesced - coalesced_before == 2
+
+def test_fetch_movies_by_ids_shares_cache(mock_async_send, mock_requests_get):
+    """
+    Test that batch lookups go over the async client's pool and fill the cache the sync client reads.
+    """
+    mock_async_send.return_value = (200, json.dumps({"Title": "Inception", "Response": "True"}).encode())
+
+    [result] = fetch_movies_by_ids(["tt1375666"], plot="full")
+
+    assert result["Title"] == "Inception"
+    params = mock_async_send.call_args[0][0]
+    assert (params["i"], params["plot"]) == ("tt1375666", "full")
+    assert fetch_movie_by_id("tt1375666", plot="full")["Title"] == "Inception"
+    mock_requests_get.assert_not_called()
+
+def test_async_client_retries_and_maps_errors(mock_async_send):
+    """
+    Test that retryable statuses are retried and failures surface as requests exceptions.
+    """
+    mock_async_send.side_effect = [(503, None), (200, json.dumps({"Title": "Inception"}).encode())]
+    assert fetch_movies_by_ids(["tt1375666"])[0]["Title"] == "Inception"
+
+    mock_async_send.reset_mock()
+    mock_async_send.side_effect = aiohttp.ClientConnectionError("down")
+    assert isinstance(fetch_movies_by_ids(["tt0000001"])[0], requests.ConnectionError)
+    assert mock_async_send.call_count == client.max_retries + 1
+
+    mock_async_send.reset_mock()
+    mock_async_send.side_effect = None
+    mock_async_send.return_value = (404, None)
+    assert isinstance(fetch_movies_by_ids(["tt0000002"])[0], requests.HTTPError)
+    assert mock_async_send.call_count == 1
+
+def test_async_lookups_are_coalesced_and_run_concurrently(mock_async_send):
+    """
+    Test that identical async lookups share one request while distinct ones overlap.
+    """
+    async def slow_send(params):
+        await asyncio.sleep(0.2)
+        return 200, json.dumps({"imdbID": params["i"], "Response": "True"}).encode()
+    mock_async_send.side_effect = slow_send
+    coalesced_before = async_client.coalesced
+
+    async def lookups():
+        return await async_client.get_many([{"i": f"tt{n}"} for n in range(20)] + [{"i": "tt0"}, {"i": "TT0"}])
+
+    start = time.perf_counter()
+    results = asyncio.run(lookups())
+    elapsed = time.perf_counter() - start
+
+    assert [result["imdbID"] for result in results[:20]] == [f"tt{n}" for n in range(20)]
+    assert mock_async_send.call_count == 20
+    assert async_client.coalesced - coalesced_before == 2
+    assert elapsed < 1.0
+
+def test_async_get_many_times_out_each_query_not_the_batch(mock_async_send):
+    """Test that a batch larger than the async pool gets the timeout per query, however many rounds it takes."""
+    async def slow_send(params):
+        await asyncio.sleep(0.1)
+        return 200, json.dumps({"imdbID": params["i"]}).encode()
+    mock_async_send.side_effect = slow_send
+    small_client = AsyncOMDbClient(client, pool_size=2)
+    try:
+        results = small_client.run_many([{"i": f"tt{n}"} for n in range(8)], timeout=0.3)
+    finally:
+        small_client.close()
+
+    assert results == [{"imdbID": f"tt{n}"} for n in range(8)]
+
+def test_async_store_reads_do_not_block_the_loop(mock_async_send):
+    """Test that slow reads from the shared store run in worker threads instead of serialising lookups on the loop."""
+    def slow_get(key):
+        time.sleep(0.2)
+        return None
+    mock_async_send.return_value = (200, json.dumps({"Title": "Inception"}).encode())
+    omdb_client = OMDbClient(api_key="key", cache=TTLCache(), store=Mock(get=Mock(side_effect=slow_get)))
+    store_client = AsyncOMDbClient(omdb_client)
+    try:
+        start = time.perf_counter()
+        results = store_client.run_many([{"i": f"tt{n}"} for n in range(5)])
+        elapsed = time.perf_counter() - start
+    finally:
+        store_client.close()
+
+    assert results == [{"Title": "Inception"}] * 5
+    assert omdb_client.store.get.call_count == 5
+    assert elapsed < 0.6
+
+def test_open_breaker_fails_fast_and_serves_stale_movies(mock_requests_get):
+    """
+    Test that failures open the breaker, after which OMDb is not called: movie lookups
+    get their last known response and other queries fail fast.
+    """
+    omdb_client = OMDbClient(api_key="key", cache=TTLCache(), error_ttl=0,
+                             breaker=CircuitBreaker(window=4, min_calls=3, open_seconds=60))
+    mock_requests_get.return_value.content = json.dumps({"Title": "Inception", "Response": "True"}).encode()
+    omdb_client.get(i="tt1375666")
+    omdb_client.cache.clear()
+
+    mock_requests_get.side_effect = requests.ConnectionError("down")
+    assert omdb_client.get(allow_stale=True, i="tt1375666")["Title"] == "Inception"
+    with pytest.raises(requests.ConnectionError):
+        omdb_client.get(s="Inception")
+    assert omdb_client.breaker.state == "open"
+
+    calls = mock_requests_get.call_count
+    assert omdb_client.get(allow_stale=True, i="tt1375666")["Title"] == "Inception"
+    with pytest.raises(CircuitOpenError):
+        omdb_client.get(s="Inception")
+    assert mock_requests_get.call_count == calls
+    assert omdb_client.stats()["stale_served"] == 2
+
+def test_client_errors_do_not_open_breaker(mock_requests_get):
+    """
+    Test that 4xx responses other than 429 are not counted against OMDb's health.
+    """
+    omdb_client = OMDbClient(api_key="key", breaker=CircuitBreaker(window=4, min_calls=2))
+    response = requests.Response()
+    response.status_code = 401
+    mock_requests_get.return_value.raise_for_status.side_effect = requests.HTTPError("401", response=response)
+
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            omdb_client.get(i="tt1375666")
+    assert omdb_client.breaker.state == "closed"
+
+def test_health_reports_breaker_state():
+    """
+    Test that /api/health exposes the OMDb circuit breaker state.
+    """
+    app = create_app()
+    app.config['TESTING'] = True
+
+    client.breaker.record_failure()
+    response = app.test_client().get('/api/health')
+
+    assert response.status_code == 200
+    assert response.get_json()["omdb"]["state"] == "closed"
+    assert response.get_json()["omdb"]["calls_in_window"] == 1
+
+def test_random_movie_route_answers_from_pool(mock_requests_get):
+    """
+    Test that the random movie route fetches one movie live while the pool fills,
+    then answers from memory without calling OMDb.
+    """
+    mock_requests_get.return_value.content = json.dumps({"Title": "Inception", "Response": "True"}).encode()
+    app = create_app()
+    app.config['TESTING'] = True
+    try:
+        response = app.test_client().get('/search/search-random-movie?plot=full')
+        assert response.status_code == 200
+        for _ in range(200):
+            if random_movies.stats()["full"] == len(random_titles) and not random_movies._refreshing:
+                break
+            time.sleep(0.01)
+        calls = mock_requests_get.call_count
+
+        for _ in range(5):
+            response = app.test_client().get('/search/search-random-movie?plot=full')
+            assert response.get_json()["Title"] == "Inception"
+        assert mock_requests_get.call_count == calls
+        assert random_movies.stats()["short"] == 0
+    finally:
+        random_movies.clear()
+
+def test_search_routes_forward_raw_bodies(mock_requests_get):
+    """
+    Test that title and ID lookups are forwarded byte for byte, and that cache hits
+    are served without decoding the body again.
+    """
+    body = b'{"Title":"Inception","imdbID":"tt1375666","Response":"True"}'
+    mock_requests_get.return_value.content = body
+    app = create_app()
+    app.config['TESTING'] = True
+
+    response = app.test_client().get('/search/search-by-id?id=tt1375666')
+    assert response.status_code == 200
+    assert response.data == body
+    assert response.content_type == "application/json; charset=utf-8"
+
+    with patch("app.utils.omdb.json.loads") as mock_loads:
+        response = app.test_client().get('/search/search-by-id?id=tt1375666')
+    assert response.data == body
+    mock_loads.assert_not_called()
+    assert mock_requests_get.call_count == 1
+
+def test_invalid_json_body_is_an_upstream_error(mock_requests_get):
+    """Test that a body that is not JSON fails the lookup instead of being forwarded."""
+    mock_requests_get.return_value.content = b"<html>Service Unavailable</html>"
+    app = create_app()
+    app.config['TESTING'] = True
+
+    response = app.test_client().get('/search/search-by-id?id=tt1375666')
+
+    assert response.status_code == 500
+    with pytest.raises(requests.exceptions.InvalidJSONError):
+        fetch_movie_by_id("tt1375666")
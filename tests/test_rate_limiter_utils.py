@@ -0,0 +1,111 @@
+import pytest
+import requests
+from unittest.mock import patch
+from app import create_app
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.omdb import OMDbClient
+from app.utils.rate_limiter import BACKGROUND, INTERACTIVE, RateLimitedError, SQLiteTokenBucket
+
+class FakeClock:
+    """Manually advanced wall clock for refill tests."""
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def bucket_path(tmp_path):
+    return str(tmp_path / "omdb_rate_limit.db")
+
+def test_bucket_drains_and_refills(bucket_path, clock):
+    """Test that the burst is used up and tokens come back at the configured rate."""
+    bucket = SQLiteTokenBucket(bucket_path, rate=2.0, burst=3, clock=clock)
+
+    assert [bucket.try_acquire()[0] for _ in range(4)] == [True, True, True, False]
+    assert bucket.try_acquire() == (False, 0.5)
+
+    clock.now += 0.5
+    assert bucket.try_acquire()[0]
+
+def test_bucket_is_shared_between_processes(bucket_path, clock):
+    """Test that two limiters on the same file (e.g. two workers) draw from one budget."""
+    worker_a = SQLiteTokenBucket(bucket_path, rate=1.0, burst=2, clock=clock)
+    worker_b = SQLiteTokenBucket(bucket_path, rate=1.0, burst=2, clock=clock)
+
+    assert worker_a.try_acquire()[0]
+    assert worker_b.try_acquire()[0]
+    assert not worker_a.try_acquire()[0]
+    assert worker_b.stats()["tokens"] == 0
+
+def test_background_requests_leave_a_reserve(bucket_path, clock):
+    """Test that background requests stop at the reserve while interactive ones may use it."""
+    bucket = SQLiteTokenBucket(bucket_path, rate=1.0, burst=4, daily_limit=100,
+                               background_reserve=0.5, clock=clock)
+
+    assert [bucket.try_acquire(BACKGROUND)[0] for _ in range(3)] == [True, True, False]
+    assert [bucket.try_acquire(INTERACTIVE)[0] for _ in range(3)] == [True, True, False]
+
+def test_daily_limit_resets_next_day(bucket_path, clock):
+    """Test that the daily quota refuses requests without a retry hint until the UTC day changes."""
+    bucket = SQLiteTokenBucket(bucket_path, rate=0, daily_limit=2, clock=clock)
+
+    assert bucket.try_acquire()[0]
+    assert bucket.try_acquire()[0]
+    assert bucket.try_acquire() == (False, None)
+    assert bucket.stats()["daily_remaining"] == 0
+
+    clock.now += 86400
+    assert bucket.try_acquire()[0]
+
+def test_acquire_waits_for_a_token_or_gives_up(bucket_path):
+    """Test that acquire waits briefly for a refill and raises once it would wait too long."""
+    bucket = SQLiteTokenBucket(bucket_path, rate=50.0, burst=1, max_wait=0.5)
+    bucket.acquire()
+    bucket.acquire()
+    assert bucket.stats()["granted"][INTERACTIVE] == 2
+
+    slow_bucket = SQLiteTokenBucket(bucket_path, rate=0.1, burst=1, max_wait=0.1)
+    with pytest.raises(RateLimitedError) as excinfo:
+        slow_bucket.acquire()
+    assert excinfo.value.retry_after > 0.1
+    assert slow_bucket.stats()["rejected"][INTERACTIVE] == 1
+
+def test_client_does_not_call_omdb_without_budget(bucket_path, clock):
+    """
+    Test that a refused token stops the request before OMDb and before the breaker's trial is used.
+    """
+    breaker = CircuitBreaker(window=2, min_calls=1, open_seconds=0)
+    omdb_client = OMDbClient(api_key="key", breaker=breaker,
+                             limiter=SQLiteTokenBucket(bucket_path, rate=1.0, burst=1, max_wait=0, clock=clock))
+
+    with patch("app.utils.omdb.requests.Session.get") as mock_get:
+        mock_get.side_effect = requests.ConnectionError("down")
+        with pytest.raises(requests.ConnectionError):
+            omdb_client.get(i="tt1375666")
+        assert breaker.state == "half_open"
+
+        with pytest.raises(RateLimitedError):
+            omdb_client.get(i="tt0068646")
+        assert mock_get.call_count == 1
+        assert breaker.allow()
+
+def test_rate_limit_route_reports_budget(bucket_path):
+    """Test that /api/rate-limit reports the remaining budget, or that the limiter is disabled."""
+    app = create_app()
+    app.config['TESTING'] = True
+
+    response = app.test_client().get('/api/rate-limit')
+    assert response.get_json() == {"enabled": False}
+
+    limiter = SQLiteTokenBucket(bucket_path, rate=1.0, burst=5, daily_limit=1000)
+    limiter.acquire()
+    with patch("app.routes.api_routes.client.limiter", limiter):
+        response = app.test_client().get('/api/rate-limit')
+    assert response.get_json()["enabled"] is True
+    assert response.get_json()["daily_remaining"] == 999
+    assert response.get_json()["granted"] == {"interactive": 1, "background": 0}
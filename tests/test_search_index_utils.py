@@ -0,0 +1,88 @@
+import json
+import pytest
+from unittest.mock import patch
+from app.utils.cache import TTLCache
+from app.utils.omdb import OMDbClient, search_movies_by_keyword
+from app.utils.search_index import MovieSearchIndex, match_expression
+
+@pytest.fixture
+def index(tmp_path):
+    """Create a search index in a temporary directory."""
+    index = MovieSearchIndex(str(tmp_path / "movie_search.db"))
+    yield index
+    index.close()
+
+def movie(imdb_id, title, year="2010", plot=None, genre=None, type_="movie"):
+    return {"imdbID": imdb_id, "Title": title, "Year": year, "Type": type_, "Plot": plot, "Genre": genre,
+            "Poster": "N/A", "Response": "True"}
+
+def test_match_expression_quotes_words():
+    """Test that keywords become quoted terms and FTS5 syntax is not interpreted."""
+    assert match_expression("Dark Knight") == '"Dark" "Knight"'
+    assert match_expression("dark kni*") == '"dark" "kni"*'
+    assert match_expression('star OR "wars" -NEAR') == '"star" "OR" "wars" "NEAR"'
+    assert match_expression("  ?! ") is None
+
+def test_search_ranks_title_matches_first(index):
+    """Test that title matches outrank plot matches and results look like OMDb search results."""
+    index.add_many([
+        movie("tt0000001", "A Quiet Film", plot="Features a knight in the dark."),
+        movie("tt0468569", "The Dark Knight", plot="Batman fights the Joker.", genre="Action, Crime"),
+    ])
+
+    results, total = index.search("dark knight")
+
+    assert total == 2
+    assert results[0] == {"Title": "The Dark Knight", "Year": "2010", "imdbID": "tt0468569",
+                          "Type": "movie", "Poster": "N/A"}
+
+def test_search_ranks_every_match(index):
+    """Test that the best match is found and pages do not overlap when there are more matches than are counted."""
+    index.add_many([movie(f"tt{n:07d}", f"Movie {n}", plot="A story of love.") for n in range(1500)]
+                   + [movie("tt0314331", "Love Actually", plot="Eight couples in London.")])
+
+    results, total = index.search("love")
+    assert total == 1000
+    assert results[0]["Title"] == "Love Actually"
+    first, second = (set(movie["imdbID"] for movie in index.search("love", page=page)[0]) for page in (1, 2))
+    assert len(first | second) == 20
+
+def test_search_filters_and_pages(index):
+    """Test year/type filters, prefix matching and pagination."""
+    index.add_many([movie(f"tt{n:07d}", f"Star Voyage {n}", year=str(2000 + n % 2)) for n in range(25)]
+                   + [movie("tt9999999", "Star Voyage: The Series", year="2001–2003", type_="series")])
+
+    assert index.search("star voy*", page=3)[0][-1]["Title"].startswith("Star Voyage")
+    assert len(index.search("star", page=3)[0]) == 6
+    assert index.search("star", year=2001)[1] == 13
+    assert index.search("star", content_type="series")[1] == 1
+    assert index.search("crime") == ([], 0)
+
+def test_search_results_do_not_erase_plots(index):
+    """Test that re-indexing a movie from a search result keeps its plot and genre searchable."""
+    index.add_response(movie("tt1375666", "Inception", plot="A thief plants an idea.", genre="Sci-Fi"))
+    index.add_response({"Search": [{"Title": "Inception", "Year": "2010", "imdbID": "tt1375666", "Type": "movie"}],
+                        "Response": "True"})
+    index.add_response({"Response": "False", "Error": "Movie not found!"})
+
+    assert index.search("thief")[1] == 1
+    assert index.stats()["movies"] == 1
+
+def test_client_indexes_responses_and_answers_locally(index):
+    """
+    Test that movies returned by OMDb are indexed, and that local-first searches
+    use the index once it has enough matches and OMDb otherwise.
+    """
+    omdb_client = OMDbClient(api_key="key", cache=TTLCache(), index=index)
+    with patch("app.utils.omdb.client", omdb_client), \
+            patch("app.utils.omdb.LOCAL_SEARCH_MIN_HITS", 2), \
+            patch("app.utils.omdb.requests.Session.get") as mock_get:
+        mock_get.return_value.content = json.dumps({
+            "Search": [movie("tt0000001", "Alien"), movie("tt0000002", "Alien: Romulus")], "Response": "True"}).encode()
+
+        assert len(search_movies_by_keyword("alien", local_first=True)) == 2
+        assert mock_get.call_count == 1
+
+        assert [m["Title"] for m in search_movies_by_keyword("alien", page=1, local_first=True)] == ["Alien", "Alien: Romulus"]
+        assert search_movies_by_keyword("aliens", year=1986, local_first=True)
+        assert mock_get.call_count == 2
@@ -0,0 +1,68 @@
+import threading
+from app.utils.singleflight import SingleFlight
+
+def run_concurrently(flights, key, fn, count):
+    """Call flights.do(key, fn) from count threads and collect results and errors."""
+    results, errors = [], []
+    def worker():
+        try:
+            results.append(flights.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+def wait_for_waiters(flights, count):
+    """Wait until count callers have joined the in-flight call."""
+    for _ in range(500):
+        if flights.coalesced >= count:
+            return
+        threading.Event().wait(0.01)
+
+def test_concurrent_calls_share_one_result():
+    """Test that concurrent callers with the same key run the function once."""
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return {"Title": "Inception"}
+
+    threads, results, errors = run_concurrently(flights, "t=inception", fn, 10)
+    wait_for_waiters(flights, 9)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"Title": "Inception"}] * 10
+    assert flights.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 9}
+
+def test_concurrent_calls_share_one_error():
+    """Test that every waiting caller receives the error raised by the shared call."""
+    flights = SingleFlight()
+    release = threading.Event()
+    def fn():
+        release.wait(5)
+        raise ValueError("upstream failed")
+
+    threads, results, errors = run_concurrently(flights, "t=inception", fn, 5)
+    wait_for_waiters(flights, 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == []
+    assert len(errors) == 5
+    assert all(str(e) == "upstream failed" for e in errors)
+
+def test_sequential_calls_are_not_coalesced():
+    """Test that a finished call does not answer later calls."""
+    flights = SingleFlight()
+
+    assert flights.do("key", lambda: 1) == 1
+    assert flights.do("key", lambda: 2) == 2
+    assert flights.coalesced == 0
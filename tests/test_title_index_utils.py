@@ -0,0 +1,117 @@
+import json
+import threading
+import pytest
+from unittest.mock import patch
+from app.utils.omdb import client, fetch_movie_by_title
+from app.utils.title_index import TitleIndex, normalize_title
+
+@pytest.fixture
+def titles():
+    """Create a title index with a few known movies."""
+    index = TitleIndex(threshold=0.8)
+    index.add("The Shawshank Redemption", "tt0111161", "1994")
+    index.add("Jurassic Park", "tt0107290", "1993")
+    index.add("Jurassic Park", "tt9999999", "2031")
+    index.add("Interstellar")
+    return index
+
+def test_normalize_title():
+    """Test that case, accents, punctuation and a leading article are ignored."""
+    assert normalize_title("  The Amélie: Le Fabuleux-Destin! ") == "amelie le fabuleux destin"
+    assert normalize_title("The") == "the"
+
+def test_lookup_resolves_typos(titles):
+    """Test that misspelled titles resolve to the known movie and unrelated titles do not."""
+    match = titles.lookup("shawshenk redemption")
+    assert (match["imdb_id"], match["title"]) == ("tt0111161", "The Shawshank Redemption")
+    assert 0.8 <= match["score"] < 1.0
+    assert titles.lookup("Interstelar") == {"title": "Interstellar", "imdb_id": None, "year": None, "score": 0.88}
+    assert titles.lookup("Star Wars") is None
+    assert titles.stats()["fuzzy_matches"] == 2
+    assert titles.stats()["misses"] == 1
+
+def test_lookup_filters_by_year(titles):
+    """Test that a year picks between movies with the same title and excludes others."""
+    assert titles.lookup("jurasic park", year=1993)["imdb_id"] == "tt0107290"
+    assert titles.lookup("Jurassic Park", year=2031)["imdb_id"] == "tt9999999"
+    assert titles.lookup("Jurassic Park", year=2000) is None
+
+def test_lookup_keeps_sequel_numbers(titles):
+    """Test that a sequel is not taken for a typo of the original, in digits or roman numerals."""
+    titles.add("Toy Story", "tt0114709", "1995")
+    titles.add("Frozen", "tt2294629", "2013")
+    titles.add("The Godfather Part II", "tt0071562", "1974")
+    assert titles.lookup("Toy Story 3") is None
+    assert titles.lookup("Frozen II") is None
+    assert titles.lookup("The Godfather Part") is None
+    assert titles.lookup("The Godfather Part III") is None
+    assert titles.lookup("The Godfater Part II")["imdb_id"] == "tt0071562"
+
+def test_lookup_does_not_guess_between_movies_with_one_title(titles):
+    """Test that a title shared by several movies only resolves to an IMDb ID when the year picks one."""
+    assert titles.lookup("Jurassic Park") == {"title": "Jurassic Park", "imdb_id": None, "year": None, "score": 1.0}
+    assert titles.lookup("Jurasic Park")["imdb_id"] is None
+    assert titles.lookup("Jurassic Park", year=1993)["imdb_id"] == "tt0107290"
+
+def test_add_gives_known_titles_ids():
+    """Test that responses give seeded titles their IMDb ID instead of adding duplicates."""
+    index = TitleIndex(seed=lambda: [("Inception", None, None)])
+    assert index.add_response({"Title": "Inception", "Year": "2010", "imdbID": "tt1375666", "Response": "True"})
+    assert index.add_response({"Response": "False", "Error": "Movie not found!"}) == 0
+    assert len(index) == 1
+    assert index.lookup("inception")["imdb_id"] == "tt1375666"
+
+def test_lookups_wait_for_the_whole_seed():
+    """Test that a lookup racing the one that loads the seed waits for it instead of seeing part of it."""
+    loading, release = threading.Event(), threading.Event()
+    def seed():
+        yield "Inception", "tt1375666", "2010"
+        loading.set()
+        release.wait(5)
+        yield "Interstellar", "tt0816692", "2014"
+    index = TitleIndex(seed=seed)
+    results = {}
+    def look_up(title):
+        results[title] = index.lookup(title)
+
+    first = threading.Thread(target=look_up, args=("Inception",))
+    first.start()
+    loading.wait(5)
+    second = threading.Thread(target=look_up, args=("Interstelar",))
+    second.start()
+    second.join(0.2)
+    release.set()
+    for thread in (first, second):
+        thread.join()
+
+    assert results["Inception"]["imdb_id"] == "tt1375666"
+    assert results["Interstelar"]["imdb_id"] == "tt0816692"
+
+def test_index_evicts_least_recently_used_titles():
+    """Test that the index stays within maxsize, dropping the title added or matched longest ago and its words."""
+    index = TitleIndex(maxsize=2)
+    index.add("The Shawshank Redemption", "tt0111161", "1994")
+    index.add("Jurassic Park", "tt0107290", "1993")
+    assert index.lookup("shawshenk redemption")["imdb_id"] == "tt0111161"
+    index.add("Interstellar", "tt0816692", "2014")
+
+    assert len(index) == 2
+    assert index.lookup("Jurassic Park") is None
+    assert index.lookup("shawshank redemption")["imdb_id"] == "tt0111161"
+    assert index.stats()["evictions"] == 1
+    assert index.stats()["words"] == 3
+
+def test_fetch_movie_by_title_looks_up_known_typos_by_id():
+    """Test that once OMDb has returned a movie, a misspelled title is fetched by its IMDb ID."""
+    with patch("app.utils.omdb.requests.Session.get") as mock_get:
+        mock_get.return_value.content = json.dumps({
+            "Title": "The Shawshank Redemption", "Year": "1994", "imdbID": "tt0111161", "Response": "True"}).encode()
+        try:
+            fetch_movie_by_title("The Shawshank Redemption")
+            assert fetch_movie_by_title("Shawshenk Redemption")["imdbID"] == "tt0111161"
+        finally:
+            client.cache.clear()
+            client.stale.clear()
+            client.titles.clear()
+
+    assert [call.kwargs["params"].get("i") for call in mock_get.call_args_list] == [None, "tt0111161"]
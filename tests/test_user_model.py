@@ -1,16 +1,21 @@
+import os
 import pytest
 from app import create_app
-from app.utils.db import db
+from app.utils.db import database_url, db
 from app.models.user import User
 from app.utils.hashing import hash_password, verify_password
 
 @pytest.fixture
-def app():
-    """Create a Flask application for testing."""
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'  # In-memory database for testing
-    return app
+def app(tmp_path):
+    """
+    Create a Flask application for testing, backed by DATABASE_URL when it is set
+    (see test_matrix.sh) and by a SQLite file in a temporary directory otherwise.
+    """
+    url = os.getenv('DATABASE_URL') or f"sqlite:///{tmp_path / 'movie_app.db'}"
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': database_url(url)})
+    yield app
+    with app.app_context():
+        db.engine.dispose()
 
 @pytest.fixture
 def client(app):
@@ -0,0 +1,154 @@
+import hashlib
+import os
+import runpy
+import pytest
+from unittest.mock import patch
+from sqlalchemy import event
+from app import create_app
+from app.utils.db import database_url, db
+from app.models.user import User
+from app.utils.auth import issue_token, verify_token
+from app.utils.hashing import HashingBusyError, hash_password
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    Create a Flask application for testing, backed by DATABASE_URL when it is set
+    (see test_matrix.sh) and by a SQLite file in a temporary directory otherwise.
+    """
+    url = os.getenv('DATABASE_URL') or f"sqlite:///{tmp_path / 'movie_app.db'}"
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': database_url(url)})
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    """Create a test client for the application."""
+    return app.test_client()
+
+@pytest.fixture
+def init_db(app):
+    """Initialize the database."""
+    with app.app_context():
+        db.create_all()
+    yield
+    with app.app_context():
+        db.drop_all()
+
+def test_login_rehashes_legacy_password(app, client, init_db):
+    """Test that logging in upgrades a hash stored without parameters."""
+    salt = os.urandom(16)
+    legacy_hash = hashlib.pbkdf2_hmac('sha256', b"testpassword", salt, 100000).hex()
+    with app.app_context():
+        db.session.add(User(username="testuser", salt=salt.hex(), hashed_password=legacy_hash))
+        db.session.commit()
+
+    response = client.post('/user/login', json={'username': 'testuser', 'password': 'testpassword'})
+
+    assert response.status_code == 200
+    with app.app_context():
+        user = User.query.filter_by(username="testuser").first()
+        assert user.hashed_password.startswith("pbkdf2_")
+    assert client.post('/user/login', json={'username': 'testuser', 'password': 'testpassword'}).status_code == 200
+
+def test_login_returns_503_when_hashing_is_busy(app, client, init_db):
+    """Test that a saturated hashing pool answers 503 with Retry-After instead of blocking."""
+    salt, hashed_password = hash_password("testpassword")
+    with app.app_context():
+        db.session.add(User(username="testuser", salt=salt, hashed_password=hashed_password))
+        db.session.commit()
+
+    with patch("app.routes.user_routes.verify_password", side_effect=HashingBusyError("busy")):
+        response = client.post('/user/login', json={'username': 'testuser', 'password': 'testpassword'})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+@pytest.fixture
+def user(app, init_db):
+    """Create a user with password 'testpassword'."""
+    salt, hashed_password = hash_password("testpassword")
+    with app.app_context():
+        db.session.add(User(username="testuser", salt=salt, hashed_password=hashed_password))
+        db.session.commit()
+
+def login(client):
+    response = client.post('/user/login', json={'username': 'testuser', 'password': 'testpassword'})
+    return response.get_json()['token']
+
+def test_login_returns_token(client, user):
+    """Test that a successful login issues a token that verifies to the user."""
+    response = client.post('/user/login', json={'username': 'testuser', 'password': 'testpassword'})
+
+    assert response.status_code == 200
+    assert response.get_json()['expires_in'] > 0
+    with client.application.test_request_context():
+        assert verify_token(response.get_json()['token'])['usr'] == 'testuser'
+
+def test_token_authenticates_watchlist_requests_without_password_hashing(client, user):
+    """Test that a bearer token stands in for the username and needs no hashing or user query."""
+    token = login(client)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with client.application.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with patch("app.utils.hashing.hashlib.pbkdf2_hmac") as mock_pbkdf2:
+            response = client.get('/watchlist/get-watchlist', headers={'Authorization': f'Bearer {token}'})
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200  # authenticated; the watchlist is empty
+    mock_pbkdf2.assert_not_called()
+    assert not [s for s in statements if 'FROM user' in s]
+
+def test_invalid_token_is_rejected(client, user):
+    """Test that a tampered token is rejected with 401."""
+    token = login(client)
+
+    response = client.get('/watchlist/get-watchlist', headers={'Authorization': f'Bearer {token}x'})
+
+    assert response.status_code == 401
+    assert response.get_json()['error'] == 'Invalid token'
+
+def test_expired_token_is_rejected(client, user):
+    """Test that a token older than its max age is rejected with 401."""
+    token = login(client)
+
+    with patch("app.utils.auth.AUTH_TOKEN_MAX_AGE", -1):
+        response = client.get('/watchlist/get-watchlist', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 401
+    assert response.get_json()['error'] == 'Token expired'
+
+def test_token_for_another_user_is_forbidden(client, user):
+    """Test that a token cannot act on another user's watchlist."""
+    token = login(client)
+
+    response = client.get('/watchlist/get-watchlist', json={'username': 'someoneelse'},
+                          headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 403
+
+def test_gunicorn_workers_share_a_generated_secret_key(monkeypatch):
+    """Test that without SECRET_KEY, the gunicorn config picks one key that every worker accepts tokens with."""
+    monkeypatch.setenv("SECRET_KEY", "")  # restored after the test, with the key the config sets
+    runpy.run_path(os.path.join(os.path.dirname(__file__), "..", "gunicorn.conf.py"))
+    workers = [create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'}) for _ in range(2)]
+
+    with workers[0].app_context():
+        token = issue_token(User(id=1, username="testuser"))
+    with workers[1].app_context():
+        assert verify_token(token)["usr"] == "testuser"
+
+def test_token_required_when_configured(client, user):
+    """Test that REQUIRE_AUTH_TOKEN rejects requests without a token."""
+    with patch("app.utils.auth.REQUIRE_AUTH_TOKEN", True):
+        response = client.get('/watchlist/get-watchlist', json={'username': 'testuser'})
+
+    assert response.status_code == 401
@@ -1,7 +1,11 @@
+import os
 import pytest
 from app import create_app
-from app.utils.db import db
+from app.utils.db import database_url, db
+from app.models.movie import Movie
 from unittest.mock import Mock
+from sqlalchemy.exc import IntegrityError
+from app.utils.user_lookup import user_id_cache
 from app.utils.watchlist_utils import (
     add_movie_to_watchlist,
     delete_movie_from_watchlist,
@@ -10,12 +14,16 @@ from app.utils.watchlist_utils import (
 )
 
 @pytest.fixture
-def app():
-    """Create a Flask application for testing."""
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'  # In-memory database for testing
-    return app
+def app(tmp_path):
+    """
+    Create a Flask application for testing, backed by DATABASE_URL when it is set
+    (see test_matrix.sh) and by a SQLite file in a temporary directory otherwise.
+    """
+    url = os.getenv('DATABASE_URL') or f"sqlite:///{tmp_path / 'movie_app.db'}"
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': database_url(url)})
+    yield app
+    with app.app_context():
+        db.engine.dispose()
 
 @pytest.fixture
 def client(app):
@@ -30,6 +38,13 @@ def init_db(app):
         yield
         db.drop_all()
 
+#Start every test with an empty username cache
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    user_id_cache.clear()
+    yield
+    user_id_cache.clear()
+
 #Mock user query
 @pytest.fixture
 def mock_user_query(mocker, app):
@@ -49,6 +64,15 @@ def mock_watchlist_query(mocker, app):
         mocker.patch("app.models.watchlist.Watchlist.query", mock_watchlist_query)
         return mock_watchlist_query
 
+#Mock movie catalog query
+@pytest.fixture
+def mock_movie_query(mocker, app):
+    with app.app_context():
+        mock_movie_query = Mock()
+        mock_movie_query.filter_by.return_value.first.return_value = None
+        mocker.patch("app.models.movie.Movie.query", mock_movie_query)
+        return mock_movie_query
+
 #Mock movie by id
 @pytest.fixture
 def mock_fetch_movie_by_id(mocker, app):
@@ -77,7 +101,7 @@ def mock_db_session(mocker, app):
         return mock_db_session
 
 #Test if adding was successful
-def test_add_movie_to_watchlist_successful(mock_db_session, mock_user_query, mock_watchlist_query, mock_fetch_movie_by_id):
+def test_add_movie_to_watchlist_successful(mocker, mock_db_session, mock_user_query, mock_watchlist_query, mock_movie_query, mock_fetch_movie_by_id):
     mock_watchlist_query.filter_by.return_value.first.return_value = None
     mock_user = mock_user_query.filter_by.return_value.first.return_value
     username = mock_user.username     
@@ -98,22 +122,31 @@ def test_add_movie_to_watchlist_successful(mock_db_session, mock_user_query, moc
     assert username == "test_user"
     assert imdb_id == "tt0319343"
 
+    # The catalog row is inserted, skipping it if another request inserted it first, then read back.
+    mock_insert = mocker.patch("app.utils.watchlist_utils.insert_ignoring_conflicts")
+    mock_movie_query.filter_by.return_value.first.side_effect = [None, Movie(imdb_id=imdb_id, title="Elf")]
+
     add_movie_to_watchlist(username, imdb_id)
     
+    mock_insert.assert_called_once_with(Movie)
+    [inserted_movie] = mock_db_session.execute.call_args[0][1]
+    assert inserted_movie["imdb_id"] == imdb_id
+    assert inserted_movie["title"] == "Elf"
     mock_db_session.add.assert_called_once()
     mock_db_session.commit.assert_called_once()
     added_watchlist_item = mock_db_session.add.call_args[0][0]
     assert added_watchlist_item.user_id == mock_user.id 
     assert added_watchlist_item.imdb_id == imdb_id 
+    assert added_watchlist_item.title == "Elf"
 
 #Test if adding was unsuccessful because user not found
-def test_add_movie_to_watchlist_user_not_found(mock_db_session, mock_user_query, mock_watchlist_query, mock_fetch_movie_by_id):
+def test_add_movie_to_watchlist_user_not_found(mock_db_session, mock_user_query, mock_watchlist_query, mock_movie_query, mock_fetch_movie_by_id):
     mock_user_query.filter_by.return_value.first.return_value = None
     with pytest.raises(ValueError, match="User not found"):
         add_movie_to_watchlist("non_existent_user", "tt1234567")
 
 #Test if adding was unsuccessful because movie not found
-def test_add_movie_to_watchlist_movie_not_found(mock_db_session, mock_user_query, mock_watchlist_query, mock_fetch_movie_by_id):
+def test_add_movie_to_watchlist_movie_not_found(mock_db_session, mock_user_query, mock_watchlist_query, mock_movie_query, mock_fetch_movie_by_id):
     mock_fetch_movie_by_id.return_value = None
 
     mock_user_query.filter_by.return_value.first.return_value = Mock(id=1, username="test_user")
@@ -121,7 +154,7 @@ def test_add_movie_to_watchlist_movie_not_found(mock_db_session, mock_user_query
             add_movie_to_watchlist("test_user", "tt1234567")
 
 #Test add duplicates
-def test_add_movie_already_in_watchlist(mock_db_session, mock_user_query, mock_watchlist_query, mock_fetch_movie_by_id):
+def test_add_movie_already_in_watchlist(mocker, mock_db_session, mock_user_query, mock_watchlist_query, mock_movie_query, mock_fetch_movie_by_id):
     mock_user = mock_user_query.filter_by.return_value.first.return_value
     username = mock_user.username     
     mock_fetch_movie_by_id.return_value = {
@@ -138,10 +171,14 @@ def test_add_movie_already_in_watchlist(mock_db_session, mock_user_query, mock_w
     movie_data = mock_fetch_movie_by_id.return_value
     imdb_id = movie_data["imdbID"]
 
+    mocker.patch("app.utils.watchlist_utils.insert_ignoring_conflicts")
+    mock_movie_query.filter_by.return_value.first.side_effect = [None, Movie(imdb_id=imdb_id, title="Elf")]
+    mock_db_session.commit.side_effect = IntegrityError("INSERT", {}, Exception("UNIQUE constraint failed"))
     mock_watchlist_query.filter_by.return_value.first.return_value = Mock(imdb_id=imdb_id)  # Movie exists
 
     with pytest.raises(ValueError, match="Movie 'Elf' is already in test_user's watchlist."):
         add_movie_to_watchlist(username, imdb_id)
+    mock_db_session.rollback.assert_called_once()
 
 #Test if deleting was successful
 def test_delete_movie_from_watchlist_successful(mock_db_session, mock_user_query, mock_watchlist_query, mock_fetch_movie_by_id):
@@ -222,6 +259,17 @@ def test_update_movie_from_watchlist_successful(mock_db_session, mock_user_query
     assert mock_watchlist_entry.imdb_id == imdb_id
     assert mock_watchlist_entry.user_id == mock_user.id
    
+#Test that updating to watched deletes the loaded entry with one lookup and one commit
+def test_update_movie_from_watchlist_watched_deletes_entry(mock_db_session, mock_user_query, mock_watchlist_query, mock_fetch_movie_by_id):
+    mock_watchlist_entry = Mock(user_id=1, imdb_id="tt0319343", watching_state="To Watch")
+    mock_watchlist_query.filter_by.return_value.first.return_value = mock_watchlist_entry
+
+    update_movie_from_watchlist("test_user", "tt0319343", "Watched")
+
+    mock_db_session.delete.assert_called_once_with(mock_watchlist_entry)
+    mock_db_session.commit.assert_called_once()
+    mock_watchlist_query.filter_by.assert_called_once_with(user_id=1, imdb_id="tt0319343")
+
 #Test if updating was unsuccessful because user not found
 def test_update_movie_from_watchlist_user_not_found(mock_db_session, mock_user_query, mock_watchlist_query, mock_fetch_movie_by_id):
     mock_user_query.filter_by.return_value.first.return_value = None
@@ -261,10 +309,10 @@ def test_update_movie_from_watchlist_invalid_watching_state(mock_db_session, moc
         update_movie_from_watchlist(username, imdb_id, new_state)
 
 #Test if getting user watchlist was successful
-def test_get_watchlist_successful(mock_db_session, mock_user_query, mock_watchlist_query, mock_fetch_movie_by_id):
-    mock_user = Mock(id=1, username="test_user")
-    mock_user_query.filter_by.return_value.first.return_value = mock_user
-    username = mock_user.username
+def test_get_watchlist_successful(app, init_db):
+    from app.models.user import User
+    from app.models.movie import Movie
+    from app.models.watchlist import Watchlist
 
     movie_data = {   
         "title": "Elf",
@@ -277,34 +325,19 @@ def test_get_watchlist_successful(mock_db_session, mock_user_query, mock_watchli
         "imdb_rating": "7.1",
         "type": "movie"
         }
-    
-    mock_fetch_movie_by_id.return_value = movie_data
-    imdb_id = movie_data["imdb_id"]
-    title = movie_data["title"]
-    year = movie_data["year"]
-    rated = movie_data["rated"]
-    runtime = movie_data["runtime"]
-    plot = movie_data["plot"]
-    genre = movie_data["genre"]
-    imdb_rating = movie_data["imdb_rating"]
-    type = movie_data["type"]
 
-    mock_watchlist_entry1 = Mock(user_id=mock_user.id, title=title, year=year, rated=rated, runtime=runtime, plot=plot, genre=genre, imdb_rating=imdb_rating, type=type, imdb_id=imdb_id, watching_state="To Watch")
-    mock_watchlist_entry2 = Mock(user_id=2, title=title, year=year, rated=rated, runtime=runtime, plot=plot, genre=genre, imdb_rating=imdb_rating, type=type, imdb_id=imdb_id, watching_state="To Watch")
-
-    filtered_entries = []
-    for entry in [mock_watchlist_entry1, mock_watchlist_entry2]:
-        if entry.user_id == mock_user.id:
-            filtered_entries.append(entry)
-
-    mock_watchlist_query.filter_by.return_value.all = Mock(return_value=filtered_entries)
+    with app.app_context():
+        db.session.add_all([User(id=1, username="test_user", salt="s", hashed_password="h"),
+                            User(id=2, username="other_user", salt="s", hashed_password="h"),
+                            Movie(**movie_data)])
+        db.session.add_all([Watchlist(user_id=1, imdb_id=movie_data["imdb_id"], watching_state="To Watch"),
+                            Watchlist(user_id=2, imdb_id=movie_data["imdb_id"], watching_state="To Watch")])
+        db.session.commit()
 
-    assert username == "test_user"
-    assert imdb_id == "tt0319343"
-    user_watchlist = get_user_watchlist(username)
+        user_watchlist = get_user_watchlist("test_user")
 
     expected_user_watchlist = [{
-        'imdbID': mock_watchlist_entry1.imdb_id,
+        'imdbID': movie_data["imdb_id"],
         'Title': movie_data['title'],
         'Year': movie_data["year"],
         'Rated': movie_data["rated"],  
@@ -313,7 +346,7 @@ def test_get_watchlist_successful(mock_db_session, mock_user_query, mock_watchli
         'Genre': movie_data["genre"],  
         'imdbRating': movie_data["imdb_rating"], 
         'Type': movie_data["type"],  
-        'Watching State': mock_watchlist_entry1.watching_state
+        'Watching State': "To Watch"
     }]
 
     assert user_watchlist == expected_user_watchlist
@@ -325,9 +358,51 @@ def test_get_watchlist_user_not_found(mock_db_session, mock_user_query, mock_wat
         get_user_watchlist("non_existent_user")
 
 #Test if getting watchlist was unsuccessful because watchlist has no movies
-def test_get_watchlist_no_movies(mock_db_session, mock_user_query, mock_watchlist_query, mock_fetch_movie_by_id):
-    mock_watchlist_query.filter_by.return_value.all = Mock(return_value=[])
-    with pytest.raises(ValueError, match="No movies found in watchlist for test_user"):
-        get_user_watchlist("test_user")
+def test_get_watchlist_no_movies(app, init_db):
+    from app.models.user import User
+
+    with app.app_context():
+        db.session.add(User(username="test_user", salt="s", hashed_password="h"))
+        db.session.commit()
+
+        with pytest.raises(ValueError, match="No movies found in watchlist for test_user"):
+            get_user_watchlist("test_user")
+
+#Test that the catalog stores a movie once for every watchlist that references it
+def test_watchlists_share_movie_catalog(app, init_db, mocker, mock_fetch_movie_by_id):
+    from app.models.user import User
+    from app.models.movie import Movie
+    from app.models.watchlist import Watchlist
+
+    with app.app_context():
+        db.session.add_all([User(username="alice", salt="s", hashed_password="h"),
+                            User(username="bob", salt="s", hashed_password="h")])
+        db.session.commit()
+
+        add_movie_to_watchlist("alice", "tt0319343")
+        add_movie_to_watchlist("bob", "tt0319343")
+        update_movie_from_watchlist("bob", "tt0319343", "Watch Next")
+
+        assert mock_fetch_movie_by_id.call_count == 1
+        assert Movie.query.count() == 1
+        assert Watchlist.query.count() == 2
+
+        db.session.expunge_all()
+        watchlist = get_user_watchlist("bob")
+        assert watchlist[0]["Title"] == "Elf"
+        assert watchlist[0]["Watching State"] == "Watch Next"
+
+#Test that the unique index rejects a duplicate entry in the database
+def test_add_duplicate_movie_rejected_by_unique_index(app, init_db, mock_fetch_movie_by_id):
+    from app.models.user import User
+    from app.models.watchlist import Watchlist
+
+    with app.app_context():
+        db.session.add(User(username="alice", salt="s", hashed_password="h"))
+        db.session.commit()
 
+        add_movie_to_watchlist("alice", "tt0319343")
+        with pytest.raises(ValueError, match="Movie 'Elf' is already in alice's watchlist."):
+            add_movie_to_watchlist("alice", "tt0319343")
 
+        assert Watchlist.query.count() == 1
@@ -0,0 +1,333 @@
+import json
+import os
+import pytest
+import requests
+from sqlalchemy import event
+from app import create_app
+from app.utils.db import database_url, db
+from app.models.user import User
+from app.models.watchlist import Watchlist
+from app.utils.export_utils import export_chunks
+from app.utils.user_lookup import resolve_user_id, user_id_cache
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    Create a Flask application for testing, backed by DATABASE_URL when it is set
+    (see test_matrix.sh) and by a SQLite file in a temporary directory otherwise.
+    """
+    url = os.getenv('DATABASE_URL') or f"sqlite:///{tmp_path / 'movie_app.db'}"
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': database_url(url)})
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    """Create a test client for the application."""
+    return app.test_client()
+
+@pytest.fixture
+def init_db(app):
+    """
+    Initialize the database with one user.
+
+    No app context is held while the test runs, so every request gets its own, as in production.
+    """
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username="alice", salt="s", hashed_password="h"))
+        db.session.commit()
+    yield
+    with app.app_context():
+        db.drop_all()
+    user_id_cache.clear()
+
+@pytest.fixture
+def mock_fetch_movie_by_id(mocker):
+    return mocker.patch("app.utils.watchlist_utils.fetch_movie_by_id", return_value={
+        "Title": "Elf",
+        "imdbID": "tt0319343",
+        "Year": "2003",
+        "Rated": "PG",
+        "Runtime": "97 min",
+        "Plot": "Buddy travels from the North Pole to New York City.",
+        "Genre": "Adventure, Comedy, Family",
+        "imdbRating": "7.1",
+        "Type": "movie"
+    })
+
+@pytest.fixture
+def user_queries(app, init_db):
+    """Count the SQL statements that read the user table."""
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # "user" is a reserved word on PostgreSQL, so it may be quoted
+        if statement.lstrip().startswith("SELECT") and "FROM user" in statement.replace('"', ''):
+            statements.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+#Test that each watchlist request looks the user up at most once, even when the utils and nested calls resolve it again
+@pytest.mark.parametrize("method, path, body", [
+    ("post", "/watchlist/add-to-watchlist", {"imdb_id": "tt0319343"}),
+    ("put", "/watchlist/update-watchlist", {"imdb_id": "tt0319343", "watching_state": "Watch Next"}),
+    ("get", "/watchlist/get-watchlist", {}),
+    ("put", "/watchlist/update-watchlist", {"imdb_id": "tt0319343", "watching_state": "Watched"}),
+])
+def test_watchlist_requests_query_user_once(client, user_queries, mock_fetch_movie_by_id, method, path, body):
+    if path != "/watchlist/add-to-watchlist":
+        client.post("/watchlist/add-to-watchlist", json={"username": "alice", "imdb_id": "tt0319343"})
+    user_id_cache.clear()
+    user_queries.clear()
+
+    response = getattr(client, method)(path, json=dict(body, username="alice"))
+
+    assert response.status_code in (200, 201)
+    assert len(user_queries) == 1
+
+#Test that a cached username answers later requests without a query
+def test_user_id_cached_across_requests(client, user_queries, mock_fetch_movie_by_id):
+    client.post("/watchlist/add-to-watchlist", json={"username": "alice", "imdb_id": "tt0319343"})
+    user_queries.clear()
+
+    response = client.get("/watchlist/get-watchlist", json={"username": "alice"})
+
+    assert response.status_code == 200
+    assert user_queries == []
+
+#Test that deleting a user drops it from the cache
+def test_deleted_user_is_invalidated(app, init_db):
+    with app.app_context():
+        assert resolve_user_id("alice") == 1
+        db.session.delete(User.query.filter_by(username="alice").first())
+        db.session.commit()
+
+    with app.app_context():
+        assert resolve_user_id("alice") is None
+
+#Test that unknown users get a 404 without being cached
+def test_unknown_user_not_found(client, init_db):
+    response = client.get("/watchlist/get-watchlist", json={"username": "bob"})
+
+    assert response.status_code == 404
+    assert user_id_cache.get("bob") == (False, None)
+
+#Test that series years and long genre lists fit the catalog columns, which server databases enforce
+def test_add_series_with_long_fields(client, init_db, mocker):
+    genre = "Animation, Action, Adventure, Comedy, Crime, Drama, Family, Fantasy, Mystery, Sci-Fi, Thriller"
+    mocker.patch("app.utils.watchlist_utils.fetch_movie_by_id", return_value={
+        "Title": "Breaking Bad", "imdbID": "tt0903747", "Year": "2008–2013", "Genre": genre, "Type": "series"
+    })
+
+    response = client.post("/watchlist/add-to-watchlist", json={"username": "alice", "imdb_id": "tt0903747"})
+    assert response.status_code == 201
+
+    entry = client.get("/watchlist/get-watchlist?fields=Year,Genre", json={"username": "alice"}).json["watchlist"][0]
+    assert entry == {"Year": "2008–2013", "Genre": genre}
+
+#Test that adding a movie another request catalogs at the same time reuses its catalog entry
+def test_add_movie_catalogued_concurrently(app, client, init_db, mocker):
+    from app.models.movie import Movie
+    data = omdb_movie("tt0319343", "Elf")
+    def fetch_while_another_request_catalogs(imdb_id):
+        with app.app_context():
+            db.session.add(Movie.from_omdb(data))
+            db.session.commit()
+        return data
+    mocker.patch("app.utils.watchlist_utils.fetch_movie_by_id", side_effect=fetch_while_another_request_catalogs)
+
+    response = client.post("/watchlist/add-to-watchlist", json={"username": "alice", "imdb_id": "tt0319343"})
+
+    assert response.status_code == 201
+    assert client.get("/watchlist/get-watchlist?username=alice").get_json()["watchlist"][0]["Title"] == "Elf"
+
+def omdb_movie(imdb_id, title):
+    return {"Title": title, "imdbID": imdb_id, "Year": "2003", "Type": "movie", "Response": "True"}
+
+#Test bulk add fetches only uncatalogued movies, inserts in bulk and reports every item
+def test_bulk_add_to_watchlist(client, init_db, mocker, mock_fetch_movie_by_id):
+    client.post("/watchlist/add-to-watchlist", json={"username": "alice", "imdb_id": "tt0319343"})
+    mock_fetch_many = mocker.patch("app.utils.watchlist_utils.fetch_movies_by_ids", return_value=[
+        omdb_movie("tt1049413", "Up"),
+        {"Response": "False", "Error": "Incorrect IMDb ID."},
+        requests.ConnectionError("down"),
+    ])
+
+    response = client.post("/watchlist/bulk-add-to-watchlist", json={
+        "username": "alice",
+        "imdb_ids": ["tt0319343", "tt1049413", "tt0000000", "tt9999999", "tt1049413"],
+    })
+
+    assert response.status_code == 200
+    assert response.get_json()["results"] == [
+        {"imdb_id": "tt0319343", "status": "already in watchlist"},
+        {"imdb_id": "tt1049413", "status": "added"},
+        {"imdb_id": "tt0000000", "status": "not found"},
+        {"imdb_id": "tt9999999", "status": "failed"},
+    ]
+    mock_fetch_many.assert_called_once_with(["tt1049413", "tt0000000", "tt9999999"])
+    watchlist = client.get("/watchlist/get-watchlist", json={"username": "alice"}).get_json()["watchlist"]
+    assert sorted(movie["Title"] for movie in watchlist) == ["Elf", "Up"]
+
+#Test bulk update sets states, deletes watched movies and reports unknown entries
+def test_bulk_update_watchlist(client, init_db, mocker):
+    mocker.patch("app.utils.watchlist_utils.fetch_movies_by_ids", return_value=[
+        omdb_movie("tt0319343", "Elf"), omdb_movie("tt1049413", "Up")])
+    client.post("/watchlist/bulk-add-to-watchlist", json={"username": "alice", "imdb_ids": ["tt0319343", "tt1049413"]})
+
+    response = client.put("/watchlist/bulk-update-watchlist", json={"username": "alice", "updates": [
+        {"imdb_id": "tt0319343", "watching_state": "Watch Next"},
+        {"imdb_id": "tt1049413", "watching_state": "Watched"},
+        {"imdb_id": "tt0000000", "watching_state": "Watched"},
+    ]})
+
+    assert response.status_code == 200
+    assert response.get_json()["results"] == [
+        {"imdb_id": "tt0319343", "status": "updated"},
+        {"imdb_id": "tt1049413", "status": "deleted"},
+        {"imdb_id": "tt0000000", "status": "not found"},
+    ]
+    watchlist = client.get("/watchlist/get-watchlist", json={"username": "alice"}).get_json()["watchlist"]
+    assert [(movie["Title"], movie["Watching State"]) for movie in watchlist] == [("Elf", "Watch Next")]
+
+#Test bulk delete removes entries with one statement and reports unknown entries
+def test_bulk_delete_from_watchlist(app, client, init_db, mocker):
+    mocker.patch("app.utils.watchlist_utils.fetch_movies_by_ids", return_value=[
+        omdb_movie("tt0319343", "Elf"), omdb_movie("tt1049413", "Up")])
+    client.post("/watchlist/bulk-add-to-watchlist", json={"username": "alice", "imdb_ids": ["tt0319343", "tt1049413"]})
+
+    response = client.delete("/watchlist/bulk-delete-from-watchlist", json={
+        "username": "alice", "imdb_ids": ["tt0319343", "tt1049413", "tt0000000"]})
+
+    assert response.status_code == 200
+    assert [item["status"] for item in response.get_json()["results"]] == ["deleted", "deleted", "not found"]
+    with app.app_context():
+        assert Watchlist.query.count() == 0
+
+#Test bulk endpoints reject malformed input
+def test_bulk_add_invalid_input(client, init_db):
+    response = client.post("/watchlist/bulk-add-to-watchlist", json={"username": "alice", "imdb_ids": "tt0319343"})
+    assert response.status_code == 400
+    for imdb_ids in ([{"id": "tt0319343"}], [["tt0319343"]], [7], [""]):
+        response = client.post("/watchlist/bulk-add-to-watchlist", json={"username": "alice", "imdb_ids": imdb_ids})
+        assert response.status_code == 400
+        response = client.delete("/watchlist/bulk-delete-from-watchlist", json={"username": "alice", "imdb_ids": imdb_ids})
+        assert response.status_code == 400
+    for imdb_id in ({"id": "tt0319343"}, ["tt0319343"], None):
+        response = client.put("/watchlist/bulk-update-watchlist", json={"username": "alice", "updates": [
+            {"imdb_id": imdb_id, "watching_state": "Watched"}]})
+        assert response.status_code == 400
+    response = client.put("/watchlist/bulk-update-watchlist", json={"username": "alice", "updates": [
+        {"imdb_id": "tt0319343", "watching_state": "Watch Next"}, {"imdb_id": "tt0319343", "watching_state": "Watched"}]})
+    assert response.status_code == 400
+
+#Test bulk add skips movies and entries another request inserted after they were looked up
+def test_bulk_add_skips_concurrent_inserts(client, init_db, mocker, mock_fetch_movie_by_id):
+    client.post("/watchlist/add-to-watchlist", json={"username": "alice", "imdb_id": "tt0319343"})
+    mocker.patch("app.utils.watchlist_utils._existing_imdb_ids", return_value=set())
+    mocker.patch("app.utils.watchlist_utils._catalogued_imdb_ids", return_value=set())
+    mocker.patch("app.utils.watchlist_utils.fetch_movies_by_ids", return_value=[
+        omdb_movie("tt0319343", "Elf"), omdb_movie("tt1049413", "Up")])
+
+    response = client.post("/watchlist/bulk-add-to-watchlist", json={
+        "username": "alice", "imdb_ids": ["tt0319343", "tt1049413"]})
+
+    assert response.status_code == 200
+    assert response.get_json()["results"] == [
+        {"imdb_id": "tt0319343", "status": "already in watchlist"},
+        {"imdb_id": "tt1049413", "status": "added"},
+    ]
+
+#Test that get-watchlist pages with a cursor, filters and leaves out the plot unless asked for
+def test_get_watchlist_pagination_and_projection(client, init_db, mocker):
+    mocker.patch("app.utils.watchlist_utils.fetch_movies_by_ids", return_value=[
+        omdb_movie("tt0000001", "One"), omdb_movie("tt0000002", "Two"), omdb_movie("tt0000003", "Three")])
+    client.post("/watchlist/bulk-add-to-watchlist", json={
+        "username": "alice", "imdb_ids": ["tt0000001", "tt0000002", "tt0000003"]})
+    client.put("/watchlist/update-watchlist", json={
+        "username": "alice", "imdb_id": "tt0000002", "watching_state": "Watch Next"})
+
+    first = client.get("/watchlist/get-watchlist?limit=2", json={"username": "alice"}).get_json()
+    assert [movie["Title"] for movie in first["watchlist"]] == ["One", "Two"]
+    assert "Plot" not in first["watchlist"][0]
+
+    second = client.get(f"/watchlist/get-watchlist?limit=2&cursor={first['next_cursor']}",
+                        json={"username": "alice"}).get_json()
+    assert [movie["Title"] for movie in second["watchlist"]] == ["Three"]
+    assert second["next_cursor"] is None
+
+    filtered = client.get("/watchlist/get-watchlist?username=alice&watching_state=Watch%20Next&fields=title,plot").get_json()
+    assert filtered["watchlist"] == [{"Title": "Two", "Plot": None}]
+
+#Test that a filter without matches, or an empty watchlist, returns an empty page
+def test_get_watchlist_empty_page(client, init_db, mocker):
+    assert client.get("/watchlist/get-watchlist?username=alice").get_json()["watchlist"] == []
+    mocker.patch("app.utils.watchlist_utils.fetch_movies_by_ids", return_value=[omdb_movie("tt0000001", "One")])
+    client.post("/watchlist/bulk-add-to-watchlist", json={"username": "alice", "imdb_ids": ["tt0000001"]})
+
+    for query in ("watching_state=Watch%20Next", "type=series"):
+        response = client.get(f"/watchlist/get-watchlist?username=alice&{query}")
+        assert response.status_code == 200
+        assert response.get_json()["watchlist"] == []
+        assert response.get_json()["next_cursor"] is None
+
+#Test that get-watchlist only selects the requested columns and skips the catalog join when it is not needed
+def test_get_watchlist_loads_only_requested_columns(app, client, init_db, mocker):
+    mocker.patch("app.utils.watchlist_utils.fetch_movies_by_ids", return_value=[omdb_movie("tt0000001", "One")])
+    client.post("/watchlist/bulk-add-to-watchlist", json={"username": "alice", "imdb_ids": ["tt0000001"]})
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.get("/watchlist/get-watchlist?fields=imdbID,watching_state", json={"username": "alice"})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert response.get_json()["watchlist"] == [{"imdbID": "tt0000001", "Watching State": "To Watch"}]
+    watchlist_select = [statement for statement in statements if "FROM watchlist" in statement][0]
+    assert "movie" not in watchlist_select
+    assert "plot" not in watchlist_select
+
+#Test that unknown fields are rejected
+def test_get_watchlist_unknown_field(client, init_db):
+    response = client.get("/watchlist/get-watchlist?fields=poster", json={"username": "alice"})
+    assert response.status_code == 400
+
+#Test that export-watchlist streams one NDJSON line per entry
+def test_export_watchlist_ndjson(client, init_db, mocker):
+    mocker.patch("app.utils.watchlist_utils.fetch_movies_by_ids", return_value=[
+        omdb_movie("tt0000001", "One"), omdb_movie("tt0000002", "Two")])
+    client.post("/watchlist/bulk-add-to-watchlist", json={"username": "alice", "imdb_ids": ["tt0000001", "tt0000002"]})
+
+    response = client.get("/watchlist/export-watchlist?username=alice&fields=imdbID,title")
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines == [{"imdbID": "tt0000001", "Title": "One"}, {"imdbID": "tt0000002", "Title": "Two"}]
+
+#Test that export-watchlist can stream CSV
+def test_export_watchlist_csv(client, init_db, mocker):
+    mocker.patch("app.utils.watchlist_utils.fetch_movies_by_ids", return_value=[omdb_movie("tt0000001", "One")])
+    client.post("/watchlist/bulk-add-to-watchlist", json={"username": "alice", "imdb_ids": ["tt0000001"]})
+
+    response = client.get("/watchlist/export-watchlist?username=alice&format=csv&fields=title,watching_state")
+
+    assert response.mimetype == "text/csv"
+    assert response.get_data(as_text=True).splitlines() == ["Title,Watching State", "One,To Watch"]
+
+#Test that the export yields its first chunk before all rows have been read
+def test_export_chunks_are_lazy():
+    def entries():
+        yield {"Title": "One"}
+        raise AssertionError("read past the first chunk")
+
+    chunks = export_chunks(entries(), "ndjson", ["Title"], lines_per_chunk=1)
+    assert next(chunks) == '{"Title": "One"}\n'
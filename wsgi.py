@@ -0,0 +1,4 @@
+# Description: WSGI entry point for production servers, e.g. `gunicorn wsgi:app` (see gunicorn.conf.py).
+from app import create_app
+
+app = create_app()